@@ -22,9 +22,14 @@ setup_page()
 load_css()
 
 def load_modules():
-    return E26Processor(), SocialSentinel(), TargetingBrain(), AutomatedSurveyHandler()
+    return E26Processor(), SocialSentinel(), AutomatedSurveyHandler()
 
-e26_mod, social_mod, brain_mod, survey_mod = load_modules()
+e26_mod, social_mod, survey_mod = load_modules()
+
+# TargetingBrain lives in Session State so its memoized Fx graph survives reruns
+if 'brain_mod' not in st.session_state:
+    st.session_state.brain_mod = TargetingBrain()
+brain_mod = st.session_state.brain_mod
 
 # Initialize AdEngine in Session State
 if 'ad_engine' not in st.session_state:
@@ -65,7 +70,6 @@ with col_roster:
 
 # --- DATA PROCESSING ---
 import os
-import pandas as pd
 
 # Use candidate_options directly to maintain stable order. 
 # Ensure selected_candidate is included if it somehow isn't (unlikely with current logic).
@@ -75,21 +79,12 @@ if st.session_state.selected_candidate not in specific_targets:
 
 
 # Check for Real Data
-real_files = ["resultado ANDERSON DUQUE.csv", "resultado carlos humberto garcía .csv"]
-found_real_data = False
-raw_df = pd.DataFrame()
-
-dfs = []
-for f in real_files:
-    if os.path.exists(f):
-        print(f"Loading real data: {f}")
-        df_part = e26_mod.load_raw_e26(f)
-        if not df_part.empty:
-            dfs.append(df_part)
-            found_real_data = True
-
-if found_real_data:
-    raw_df = pd.concat(dfs, ignore_index=True)
+real_files = [f for f in E26Processor.DEFAULT_RAW_FILES if os.path.exists(f)]
+raw_df, ingest_errors = e26_mod.load_raw_many(real_files)
+for f, err in ingest_errors.items():
+    st.warning(f"No se pudo cargar {f}: {err}")
+
+if not raw_df.empty:
     st.session_state.is_demo = False
 else:
     # Load Demo Data
@@ -98,12 +93,20 @@ else:
 
 df_history = e26_mod.process_data(raw_df, specific_targets)
 df_social = social_mod.generate_verified_feed()
-synthesized_data = brain_mod.synthesize(df_history, df_social)
-synthesized_data = brain_mod.calculate_elasticity(synthesized_data)
-synthesized_data = brain_mod.calculate_sentiment_correlation(synthesized_data, df_social)
+target_col = f"Votos_{st.session_state.selected_candidate.replace(' ', '_')}"
+# Multi-election panel for swing / elasticity (rebuilt only when the targets change)
+if st.session_state.get('panel_targets') != specific_targets:
+    st.session_state.election_panel = e26_mod.build_panel(specific_targets)
+    st.session_state.panel_targets = list(specific_targets)
+brain_mod.fit_cannibalization(raw_df)
+brain_mod.simulate_seats(raw_df, n_sims=2000, seed=42)
+synthesized_data = brain_mod.run_pipeline(
+    df_history, stages=['synthesize', 'calculate_elasticity', 'calculate_sentiment_correlation', 'analyze_cannibalization'],
+    social_df=df_social, matrix=brain_mod.cannibalization, candidate=st.session_state.selected_candidate,
+    panel=st.session_state.election_panel, candidate_col=target_col
+)
 
 # Metrics Calculation
-target_col = f"Votos_{st.session_state.selected_candidate.replace(' ', '_')}"
 total_votes = int(df_history[target_col].sum()) if target_col in df_history.columns else 0
 social_vol = len(df_social)
 growth_zones = len(synthesized_data[synthesized_data['growth_potential'] > 0.7]) if 'growth_potential' in synthesized_data.columns else 0
@@ -27,11 +27,27 @@ def render_map_tab(synthesized_data, specific_targets, brain_mod):
             "Mapa Calor Sentimiento (Social)",
             "Ruta Logística (TSP)",
             "Mapa Calor Crisis (Fx 16)",
-            "Propensión Donantes (Fx 29)"
+            "Propensión Donantes (Fx 29)",
+            "Puntos Calientes (Gi*)"
         ], label_visibility="collapsed")
         
         st.markdown("---")
+
+        # Route planner controls
+        route_params = st.session_state.get('route_params')
+        if layer_select == "Ruta Logística (TSP)":
+            n_teams = st.slider("EQUIPOS", 1, 8, 1)
+            max_stops = st.slider("PARADAS", 5, 200, 25, step=5)
+            workday_h = st.slider("JORNADA (HORAS, 0 = SIN LÍMITE)", 0, 12, 0)
+            route_params = (n_teams, max_stops, workday_h)
         
+        # Variable tested for spatial clusters
+        hotspot_labels = {'historical_strength': 'FUERZA HISTÓRICA', 'growth_potential': 'POTENCIAL CRECIMIENTO',
+                          'crisis_risk': 'RIESGO CRISIS'}
+        hotspot_col = 'historical_strength'
+        if layer_select == "Puntos Calientes (Gi*)":
+            hotspot_col = st.selectbox("VARIABLE", list(hotspot_labels), format_func=hotspot_labels.get)
+
         # Sub-selector for Vote Density
         density_target = st.session_state.selected_candidate
         if layer_select == "Densidad de Votos (Consolidación)":
@@ -143,11 +159,18 @@ def render_map_tab(synthesized_data, specific_targets, brain_mod):
             elif layer_select == "Elasticidad Votante (Zonas Swing)":
                 # Purple Heatmap
                 if 'elasticity' in synthesized_data.columns:
-                    elasticity_data = synthesized_data[['lat', 'lon', 'elasticity']].values.tolist()
+                    # Heat weight = how strongly the station amplifies city-wide swings (no negative weights)
+                    elasticity_data = synthesized_data[['lat', 'lon']].assign(
+                        elasticity=synthesized_data['elasticity'].clip(lower=0)).values.tolist()
                     HeatMap(elasticity_data, radius=30, blur=20, gradient={0.4: '#581c87', 0.7: '#a855f7', 1.0: '#e9d5ff'}, name="Elasticidad").add_to(m)
 
             elif layer_select == "Mapa Calor Sentimiento (Social)":
-                # Green/Red Heatmap
+                # Green/Red density surface (raster from calculate_sentiment_correlation)
+                surface = getattr(brain_mod, 'sentiment_surface', None)
+                if surface is not None:
+                    folium.raster_layers.ImageOverlay(
+                        image=surface.to_rgba(), bounds=surface.bounds, name="Sentimiento"
+                    ).add_to(m)
                 if 'sentiment_score' in synthesized_data.columns:
                     for _, row in synthesized_data.iterrows():
                         if row['sentiment_score'] != 0:
@@ -158,37 +181,71 @@ def render_map_tab(synthesized_data, specific_targets, brain_mod):
                                 color=color,
                                 fill=True,
                                 fill_opacity=0.5,
-                                popup=f"Puntaje Sentimiento: {row['sentiment_score']}"
+                                popup=f"Puntaje Sentimiento: {row['sentiment_score']:.2f}"
                             ).add_to(m)
                             
             elif layer_select == "Ruta Logística (TSP)":
-                # Function 8: Draw Route
-                if not st.session_state.logistics_route:
-                    st.session_state.logistics_route = brain_mod.calculate_optimal_route(synthesized_data)
+                # Function 8: Draw Route (one optimized polyline per team)
+                if not st.session_state.logistics_route or st.session_state.get('route_params') != route_params:
+                    n_teams, max_stops, workday_h = route_params
+                    st.session_state.logistics_route = brain_mod.calculate_optimal_route(
+                        synthesized_data, max_stops=max_stops, n_teams=n_teams,
+                        max_minutes=workday_h * 60 if workday_h else None
+                    )
+                    st.session_state.route_params = route_params
                 logistics_route = st.session_state.logistics_route
 
                 if logistics_route:
-                    points = [[p['lat'], p['lon']] for p in logistics_route]
-                    folium.PolyLine(points, color="#00f2ff", weight=5, opacity=0.9, dash_array='10').add_to(m)
+                    team_colors = ['#00f2ff', '#f59e0b', '#22c55e', '#ef4444', '#a855f7', '#facc15', '#3b82f6', '#ec4899']
+                    depot = list(brain_mod.DEPOT)
+                    teams = sorted({p.get('team', 1) for p in logistics_route})
+                    for team in teams:
+                        stops = [p for p in logistics_route if p.get('team', 1) == team]
+                        color = team_colors[(team - 1) % len(team_colors)]
+                        points = [depot] + [[p['lat'], p['lon']] for p in stops] + [depot]
+                        folium.PolyLine(points, color=color, weight=5, opacity=0.9, dash_array='10',
+                                        tooltip=f"EQUIPO {team}").add_to(m)
+                    folium.Marker(depot, tooltip="BASE", icon=folium.Icon(color='black', icon='home', prefix='fa')).add_to(m)
                     for p in logistics_route:
                         folium.Marker(
                             [p['lat'], p['lon']], 
-                            popup=f"PARADA {p['order']}: {p['location']}", 
+                            popup=(f"EQUIPO {p.get('team', 1)} · PARADA {p['order']}: {p['location']}"
+                                   f"<br>Llegada: +{p.get('eta_min', 0)} min"),
                             icon=folium.Icon(color='blue', icon='road', prefix='fa')
                         ).add_to(m)
             
             elif layer_select == "Mapa Calor Crisis (Fx 16)":
                 # Orange Heatmap
-                synthesized_data = brain_mod.generate_crisis_heatmap(synthesized_data)
+                synthesized_data = brain_mod.run_pipeline(synthesized_data, stages=['generate_crisis_heatmap'])
                 crisis_data = synthesized_data[['lat', 'lon', 'crisis_risk']].values.tolist()
                 HeatMap(crisis_data, radius=30, blur=20, gradient={0.4: '#f97316', 0.7: '#ea580c', 1.0: '#c2410c'}, name="Crisis").add_to(m)
 
             elif layer_select == "Propensión Donantes (Fx 29)":
                 # Gold Heatmap
-                synthesized_data = brain_mod.map_donor_propensity(synthesized_data)
+                synthesized_data = brain_mod.run_pipeline(synthesized_data, stages=['map_donor_propensity'])
                 donor_data = synthesized_data[['lat', 'lon', 'donor_score']].values.tolist()
                 HeatMap(donor_data, radius=25, blur=15, gradient={0.4: '#facc15', 0.7: '#eab308', 1.0: '#ca8a04'}, name="Donantes").add_to(m)
 
+            elif layer_select == "Puntos Calientes (Gi*)":
+                # Significant Gi* clusters only (red = hot, blue = cold); LISA quadrant in the popup
+                synthesized_data = brain_mod.run_pipeline(
+                    synthesized_data, stages=['generate_crisis_heatmap', 'detect_hotspots'])
+                label_col = f"{hotspot_col}_hotspot"
+                if label_col in synthesized_data.columns:
+                    spots = synthesized_data[synthesized_data[label_col] != 'NS']
+                    for _, row in spots.iterrows():
+                        hot = row[label_col] == 'HOT'
+                        folium.CircleMarker(
+                            location=[row['lat'], row['lon']],
+                            radius=8,
+                            color='#dc2626' if hot else '#2563eb',
+                            fill=True,
+                            fill_opacity=0.7,
+                            popup=f"<b>{row['Puesto']}</b><br>{'PUNTO CALIENTE' if hot else 'PUNTO FRÍO'} "
+                                  f"(z = {row[f'{hotspot_col}_gi_z']:.2f}, p = {row[f'{hotspot_col}_gi_p']:.3f})"
+                                  f"<br>LISA: {row[f'{hotspot_col}_lisa']}"
+                        ).add_to(m)
+
             # Strategic Points (Always Visible)
             if st.session_state.strategic_points:
                 for point in st.session_state.strategic_points:
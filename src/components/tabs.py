@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 
 def render_simulation_tab(synthesized_data, brain_mod):
     sim_col1, sim_col2 = st.columns(2)
@@ -12,7 +13,11 @@ def render_simulation_tab(synthesized_data, brain_mod):
             </div>
             <div class="panel-content">
         """, unsafe_allow_html=True)
-        synthesized_data = brain_mod.calculate_comparative_growth(synthesized_data)
+        target_col = f"Votos_{st.session_state.selected_candidate.replace(' ', '_')}"
+        synthesized_data = brain_mod.run_pipeline(
+            synthesized_data, stages=['calculate_comparative_growth'],
+            panel=st.session_state.get('election_panel'), candidate_col=target_col
+        )
         st.line_chart(synthesized_data.set_index('Puesto')['growth_velocity'].head(20))
         st.markdown("</div></div>", unsafe_allow_html=True)
         
@@ -24,7 +29,18 @@ def render_simulation_tab(synthesized_data, brain_mod):
             </div>
             <div class="panel-content">
         """, unsafe_allow_html=True)
-        synthesized_data = brain_mod.run_digital_twin(synthesized_data)
+        synthesized_data = brain_mod.run_pipeline(
+            synthesized_data, stages=['run_digital_twin'], n_sims=2000, seed=42, candidate_col=target_col
+        )
+        twin = brain_mod.last_twin
+        if twin is not None:
+            names = twin['candidates']
+            idx = names.index(st.session_state.selected_candidate) if st.session_state.selected_candidate in names else 0
+            low, high = twin['stations_won_ci'][idx]
+            t_col1, t_col2 = st.columns(2)
+            t_col1.metric("Prob. Victoria", f"{twin['win_probability'][idx] * 100:.1f}%")
+            t_col2.metric("Puestos Ganados", f"{twin['stations_won_mean'][idx]:.0f}",
+                          f"IC 90%: {low:.0f}-{high:.0f}", delta_color="off")
         st.bar_chart(synthesized_data['win_probability'].head(10))
         st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -37,9 +53,34 @@ def render_simulation_tab(synthesized_data, brain_mod):
             </div>
             <div class="panel-content">
         """, unsafe_allow_html=True)
-        synthesized_data = brain_mod.build_coalition(synthesized_data)
+        synthesized_data = brain_mod.run_pipeline(synthesized_data, stages=['build_coalition'])
         st.metric("Impulso Coalición", "+15%", "Votos")
         st.markdown("</div></div>", unsafe_allow_html=True)
+
+        st.markdown("""
+        <div class="panel-container" style="margin-top: 20px;">
+            <div class="panel-header">
+                <span>SIMULADOR DE PARTICIPACIÓN</span>
+                <span>Fx 5</span>
+            </div>
+            <div class="panel-content">
+        """, unsafe_allow_html=True)
+        # Sliders are answered from the model's precomputed comuna statistics (no frame rescan)
+        turnout_col = f"Votos_{st.session_state.selected_candidate.replace(' ', '_')}"
+        model = brain_mod.turnout_model(synthesized_data, turnout_col)
+        factor = st.slider("PARTICIPACIÓN ESPERADA", 0.5, 1.5, 1.0, 0.05)
+        comuna_sigma = st.slider("VOLATILIDAD POR COMUNA", 0.0, 0.3, 0.05, 0.01)
+        station_sigma = st.slider("VOLATILIDAD POR PUESTO", 0.0, 0.3, 0.03, 0.01)
+        turnout = model.quick(factor, comuna_sigma, station_sigma)
+        low, high = turnout['margin_ci']
+        p_col1, p_col2, p_col3 = st.columns(3)
+        p_col1.metric("Votos Proyectados", f"{turnout['totals_mean']:,.0f}")
+        p_col2.metric("Participación Candidato", f"{turnout['share_mean'] * 100:.1f}%")
+        p_col3.metric("Prob. Liderar", f"{turnout['p_lead'] * 100:.0f}%")
+        st.caption(f"Margen vs. principal rival (IC 90%): {low:,.0f} a {high:,.0f}")
+        counts, edges = np.histogram(turnout['margin'], bins=30)
+        st.bar_chart(pd.DataFrame({'Simulaciones': counts}, index=np.round((edges[:-1] + edges[1:]) / 2)))
+        st.markdown("</div></div>", unsafe_allow_html=True)
         
         st.markdown("""
         <div class="panel-container" style="margin-top: 20px;">
@@ -50,6 +91,9 @@ def render_simulation_tab(synthesized_data, brain_mod):
             <div class="panel-content">
         """, unsafe_allow_html=True)
         victory_path = brain_mod.generate_victory_path(synthesized_data)
+        if brain_mod.last_seats is not None:
+            st.caption(f"Cifra repartidora: {brain_mod.last_seats['cifra']:,.0f} votos "
+                       f"({brain_mod.last_seats['n_sims']} escenarios)")
         st.dataframe(victory_path, use_container_width=True)
         st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -128,3 +172,7 @@ def render_control_tab(synthesized_data, brain_mod):
             <div class="panel-content">
         """, unsafe_allow_html=True)
         weather = brain_mod.correlate_weather()
+
+    # Memoized Fx graph: per-stage cache hits / misses
+    with st.expander("CACHÉ GRAFO Fx"):
+        st.dataframe(brain_mod.pipeline.stats(), use_container_width=True)
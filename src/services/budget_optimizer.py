@@ -0,0 +1,171 @@
+import pandas as pd
+import numpy as np
+
+
+class BudgetOptimizer:
+    """
+    Module 4a: Budget-Constrained Resource Optimizer.
+    Allocates whole units of several action types across stations under a total budget
+    and optional per-zone spending caps. Every unit beyond the first of an action at a
+    station yields less (geometric decay), so returns are concave.
+
+    With concave returns and nested (zone inside total) budget caps, the LP relaxation is
+    solved exactly by spending in decreasing votes-per-peso order. The ordering and the
+    cumulative spend are budget independent: they are prepared once, and solve(budget)
+    is a binary search plus a small fill pass, so budget changes re-solve incrementally.
+    The integer plan takes every fully funded unit of the LP prefix, then fills the leftover
+    with the best units that still fit. The LP optimum is reported as an upper bound.
+    """
+    # name: (cost per unit in COP, expected votes per growth point, max units per station, decay per extra unit)
+    DEFAULT_ACTIONS = {
+        'ACTIVAR EQUIPO': (5000000, 10.0, 3, 0.6),
+        'EVENTO': (12000000, 30.0, 2, 0.5),
+        'PAUTA DIGITAL': (2000000, 3.0, 5, 0.7),
+    }
+
+    def __init__(self, stations_df, actions=None, zone_caps=None, gain_col='growth_potential'):
+        """
+        stations_df: one row per station with 'Puesto', 'gain_col' and (for zone caps) 'Zona'.
+        actions: {name: (cost, yield, max_units, decay)} (defaults to DEFAULT_ACTIONS).
+        zone_caps: {zona: max spend} for the zones that are capped.
+        """
+        self.stations = stations_df.reset_index(drop=True)
+        self.actions = dict(actions or self.DEFAULT_ACTIONS)
+        self.zone_caps = dict(zone_caps or {})
+        self._prepare(self.stations[gain_col].to_numpy(dtype=float) if gain_col in self.stations.columns
+                      else np.zeros(len(self.stations)))
+
+    def _prepare(self, station_gain):
+        """Builds every (station, action, unit) increment and the budget-independent LP ordering."""
+        n = len(station_gain)
+        station, action, unit, cost, gain = [], [], [], [], []
+        for a, (unit_cost, yield_, max_units, decay) in enumerate(self.actions.values()):
+            k = np.arange(max_units)
+            station.append(np.repeat(np.arange(n), max_units))
+            action.append(np.full(n * max_units, a))
+            unit.append(np.tile(k, n))
+            cost.append(np.full(n * max_units, float(unit_cost)))
+            gain.append((station_gain[:, None] * yield_ * decay ** k[None, :]).ravel())
+
+        station, action, unit, cost, gain = (np.concatenate(x) if x else np.zeros(0) for x in
+                                             (station, action, unit, cost, gain))
+        keep = (gain > 0) & (cost > 0)
+        station, action, unit, cost, gain = (x[keep] for x in (station, action, unit, cost, gain))
+
+        # Decreasing votes per peso; earlier units of the same (station, action) first on ties
+        density = gain / cost if len(gain) else np.zeros(0)
+        order = np.lexsort((unit, -density))
+        self._station = station[order].astype(np.int64)
+        self._action = action[order].astype(np.int64)
+        self._unit = unit[order].astype(np.int64)
+        self._cost = cost[order]
+        self._gain = gain[order]
+        self._density = density[order]
+
+        # Zone caps: the spend a unit may receive given the better units of its zone
+        self._zone = np.full(len(self._cost), -1, dtype=np.int64)
+        allowed = self._cost.copy()
+        if self.zone_caps and 'Zona' in self.stations.columns:
+            zonas = self.stations['Zona'].to_numpy()[self._station]
+            caps = pd.Series(zonas).map(self.zone_caps).to_numpy(dtype=float)
+            capped = np.isfinite(caps)
+            self._zone = pd.factorize(pd.Series(zonas))[0].astype(np.int64)
+            self._zone[~capped] = -1
+            spent_before = pd.Series(self._cost).groupby(self._zone).cumsum().to_numpy() - self._cost
+            allowed = np.where(capped, np.clip(caps - spent_before, 0, self._cost), self._cost)
+            self._zone_cap = {z: cap for z, cap in zip(self._zone[capped], caps[capped])}
+        else:
+            self._zone_cap = {}
+
+        # LP prefix: units with allowed spend, in order, and their cumulative spend / gain
+        self._lp_items = np.flatnonzero(allowed > 0)
+        self._lp_spend = allowed[self._lp_items]
+        self._lp_cum_spend = np.cumsum(self._lp_spend)
+        self._lp_cum_gain = np.cumsum(self._lp_spend * self._density[self._lp_items])
+
+    def _lp_cut(self, budget):
+        """Number of LP units funded in full within 'budget'."""
+        return int(np.searchsorted(self._lp_cum_spend, budget, side='right'))
+
+    def lp_value(self, budget):
+        """Optimal LP objective (expected votes) for 'budget': an upper bound for any plan."""
+        cut = self._lp_cut(budget)
+        value = self._lp_cum_gain[cut - 1] if cut else 0.0
+        if cut < len(self._lp_items):
+            spent = self._lp_cum_spend[cut - 1] if cut else 0.0
+            value += (budget - spent) * self._density[self._lp_items[cut]]
+        return float(value)
+
+    def marginal_value(self, budget):
+        """
+        Expected votes of one more peso at 'budget' (the budget's LP shadow price):
+        the votes-per-peso of the unit where the money runs out, 0 if the budget doesn't bind.
+        """
+        cut = self._lp_cut(budget)
+        if cut >= len(self._lp_items):
+            return 0.0
+        return float(self._density[self._lp_items[cut]])
+
+    def solve(self, budget):
+        """
+        Integer allocation for 'budget'. Returns one row per (station, action) with
+        Units, Cost and Expected_Gain; attrs carry the budget, spend, LP bound and marginal value.
+        """
+        cut = self._lp_cut(budget)
+        prefix = self._lp_items[:cut]
+        taken = np.zeros(len(self._cost), dtype=bool)
+        taken[prefix[self._lp_spend[:cut] == self._cost[prefix]]] = True
+        left = budget - self._cost[taken].sum()
+
+        # Fill the leftover with the best remaining units that fit (budget, zone cap, unit order)
+        fill = np.flatnonzero(~taken & (self._cost <= left))
+        if len(fill):
+            n_actions = max(len(self.actions), 1)
+            pair = self._station * n_actions + self._action
+            next_unit = dict(zip(*np.unique(pair[taken], return_counts=True)))
+            zone_spent = pd.Series(self._cost[taken]).groupby(self._zone[taken]).sum().to_dict()
+            for j in fill.tolist():
+                c = self._cost[j]
+                if c > left or next_unit.get(pair[j], 0) != self._unit[j]:
+                    continue
+                z = self._zone[j]
+                if z >= 0 and zone_spent.get(z, 0) + c > self._zone_cap[z]:
+                    continue
+                taken[j] = True
+                left -= c
+                next_unit[pair[j]] = self._unit[j] + 1
+                if z >= 0:
+                    zone_spent[z] = zone_spent.get(z, 0) + c
+
+        plan = self._plan_frame(taken)
+        plan.attrs.update({
+            'budget': budget,
+            'spent': float(plan['Cost'].sum()) if not plan.empty else 0.0,
+            'expected_gain': float(plan['Expected_Gain'].sum()) if not plan.empty else 0.0,
+            'lp_bound': self.lp_value(budget),
+            'marginal_value': self.marginal_value(budget),
+        })
+        return plan
+
+    def _plan_frame(self, taken):
+        columns = ['Puesto', 'Action', 'Units', 'Cost', 'Expected_Gain']
+        if not taken.any():
+            return pd.DataFrame(columns=columns)
+        chosen = pd.DataFrame({
+            'station': self._station[taken], 'action': self._action[taken],
+            'Cost': self._cost[taken], 'Expected_Gain': self._gain[taken],
+        })
+        plan = chosen.groupby(['station', 'action'], sort=False).agg(
+            Units=('Cost', 'size'), Cost=('Cost', 'sum'), Expected_Gain=('Expected_Gain', 'sum')
+        ).reset_index()
+        names = np.array(list(self.actions), dtype=object)
+        if 'Puesto' in self.stations.columns:
+            plan['Puesto'] = self.stations['Puesto'].to_numpy()[plan['station']]
+        else:
+            plan['Puesto'] = plan['station']
+        if 'Zona' in self.stations.columns:
+            plan['Zona'] = self.stations['Zona'].to_numpy()[plan['station']]
+            columns = ['Zona'] + columns
+        plan['Action'] = names[plan['action']]
+        plan = plan.sort_values('Expected_Gain', ascending=False, kind='stable').reset_index(drop=True)
+        return plan[columns]
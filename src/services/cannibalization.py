@@ -0,0 +1,188 @@
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from src.services.compute_graph import fingerprint
+
+
+class CannibalizationMatrix:
+    """
+    Module 4g: Candidate Co-occurrence & Cannibalization Matrix.
+    Built from the mesa-level E-26 rows: a sparse stations x candidates vote matrix (one
+    nonzero per candidate present in a station), and from it, through sparse products,
+    - overlap: cosine similarity of candidates' station vote vectors (shared electorate),
+    - correlation: Pearson correlation of candidates' station vote shares,
+    computed per party list (block-diagonal, so hundreds of Concejo candidates per list
+    stay cheap), plus the list x list matrices over the list totals.
+    Candidates and lists are kept per race when the rows carry CORPORACION (a party runs one
+    list per corporation): lists are labelled '<CORPORACION> | <PARTIDO>' and vote shares are
+    taken over the station total of the candidate's own race.
+    risk() turns it into a per-station score of how much of a candidate's list vote goes
+    to same-list rivals who draw on the same electorate.
+    """
+    STATION_KEYS = ['ZONA', 'PUESTO']
+    RACE_KEY = 'CORPORACION'
+    RISK_LEVELS = [(0.5, 'HIGH'), (0.25, 'MEDIUM')]
+
+    def __init__(self, raw_df):
+        df = raw_df
+        self.key = self.content_key(df)
+        keys = [c for c in self.STATION_KEYS if c in df.columns]
+        station_codes, self.stations = self._factorize([df[c] for c in keys], keys)
+        races = df[self.RACE_KEY].astype(str).to_numpy() if self.RACE_KEY in df.columns else np.full(len(df), '')
+        cand_codes, cand_index = self._factorize([races, df['CANDIDATO']], [self.RACE_KEY, 'CANDIDATO'])
+        self.candidates = cand_index.get_level_values(1) if len(cand_index) else pd.Index([])
+        self.race = np.asarray(cand_index.get_level_values(0) if len(cand_index) else [], dtype=object)
+
+        votes = pd.to_numeric(df['VOTOS'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)
+        # Duplicate (station, candidate) pairs are summed by the COO -> CSR conversion
+        self.votes = sparse.coo_matrix(
+            (votes, (station_codes, cand_codes)), shape=(len(self.stations), len(self.candidates))
+        ).tocsr()
+        self.votes.eliminate_zeros()
+
+        # Shares over the station total of each candidate's race (races are not summed together)
+        race_codes, race_index = pd.factorize(self.race)
+        nz = self.votes.tocoo()
+        race_totals = sparse.coo_matrix(
+            (nz.data, (nz.row, race_codes[nz.col])), shape=(len(self.stations), len(race_index))
+        ).toarray()
+        self.shares = sparse.csr_matrix(
+            (nz.data / race_totals[nz.row, race_codes[nz.col]], (nz.row, nz.col)), shape=self.votes.shape
+        )
+
+        # Candidate -> party list (the list a candidate got most of its votes under)
+        if 'PARTIDO' in df.columns:
+            pairs = pd.DataFrame({'c': cand_codes, 'p': df['PARTIDO'].astype(str).to_numpy(), 'v': votes})
+            best = pairs.groupby(['c', 'p'], observed=True)['v'].sum().reset_index()
+            best = best.sort_values('v', ascending=False, kind='stable').drop_duplicates('c').set_index('c')['p']
+            self.party = best.reindex(np.arange(len(self.candidates))).fillna('N/A').to_numpy()
+        else:
+            self.party = np.full(len(self.candidates), 'N/A', dtype=object)
+        if self.RACE_KEY in df.columns:
+            self.party = np.asarray(self.race + ' | ' + self.party.astype(object), dtype=object)
+        self.lists = pd.Index(pd.unique(self.party))
+        self.list_codes = self.lists.get_indexer(self.party)
+
+        # Station x list votes (sparse product with the candidate -> list incidence)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(self.candidates)), (np.arange(len(self.candidates)), self.list_codes)),
+            shape=(len(self.candidates), len(self.lists))
+        )
+        self.list_votes = self.votes @ incidence
+        self._blocks = {}
+
+    @classmethod
+    def content_key(cls, raw_df):
+        """Fingerprint of the columns the matrices are built from."""
+        columns = cls.STATION_KEYS + [cls.RACE_KEY, 'CANDIDATO', 'PARTIDO', 'VOTOS']
+        return fingerprint(raw_df[[c for c in columns if c in raw_df.columns]])
+
+    def __repr__(self):
+        # Content-based, so the Fx graph can key stages on the matrix itself
+        return f"CannibalizationMatrix({self.key})"
+
+    @staticmethod
+    def _factorize(columns, names):
+        frame = pd.DataFrame({n: np.asarray(c) for n, c in zip(names, columns)})
+        codes, uniques = pd.MultiIndex.from_frame(frame).factorize()
+        return codes, uniques.set_names(names)
+
+    # --- MATRICES ---
+
+    @staticmethod
+    def overlap_of(matrix):
+        """Cosine similarity between the columns of a sparse matrix (dense result)."""
+        gram = (matrix.T @ matrix).toarray()
+        norms = np.sqrt(np.diag(gram))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = gram / np.outer(norms, norms)
+        return np.nan_to_num(out)
+
+    @staticmethod
+    def correlation_of(matrix):
+        """Pearson correlation between the columns of a sparse matrix, from sparse moments."""
+        n = matrix.shape[0]
+        mean = np.asarray(matrix.mean(axis=0)).ravel()
+        cov = (matrix.T @ matrix).toarray() / n - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = cov / np.outer(std, std)
+        return np.nan_to_num(out)
+
+    def list_block(self, party):
+        """(candidates, overlap, correlation) for one party list (cached)."""
+        if party not in self._blocks:
+            cols = np.flatnonzero(self.party == party)
+            names = self.candidates[cols]
+            self._blocks[party] = (
+                names,
+                pd.DataFrame(self.overlap_of(self.votes[:, cols]), index=names, columns=names),
+                pd.DataFrame(self.correlation_of(self.shares[:, cols]), index=names, columns=names),
+            )
+        return self._blocks[party]
+
+    def blocks(self):
+        """{party list: (candidates, overlap, correlation)} for every list in the data."""
+        return {party: self.list_block(party) for party in self.lists}
+
+    def list_matrices(self):
+        """(overlap, correlation) between party lists over their station vote totals."""
+        totals = np.asarray(self.list_votes.sum(axis=1)).ravel()
+        with np.errstate(divide='ignore'):
+            inv = np.where(totals > 0, 1.0 / totals, 0.0)
+        shares = sparse.diags(inv) @ self.list_votes
+        return (pd.DataFrame(self.overlap_of(self.list_votes), index=self.lists, columns=self.lists),
+                pd.DataFrame(self.correlation_of(shares), index=self.lists, columns=self.lists))
+
+    # --- RISK ---
+
+    def resolve(self, name):
+        """Column of the candidate whose name contains 'name' (the most voted one if several)."""
+        names = pd.Series(np.asarray(self.candidates, dtype=object)).astype(str)
+        hits = np.flatnonzero(names.str.contains(str(name).upper(), na=False).to_numpy())
+        if not len(hits):
+            return None
+        totals = np.asarray(self.votes[:, hits].sum(axis=0)).ravel()
+        return int(hits[np.argmax(totals)])
+
+    def risk(self, candidate):
+        """
+        Per-station cannibalization of 'candidate' by same-list rivals:
+        score = sum over rivals of overlap(candidate, rival) * rival votes / list votes,
+        only where the candidate has votes. Returns a frame with the station keys,
+        'cannibalization_score' (0-1), 'cannibalization_risk' (HIGH / MEDIUM / LOW) and the top rival.
+        """
+        out = self.stations.to_frame(index=False)
+        col = self.resolve(candidate)
+        if col is None:
+            out['cannibalization_score'] = 0.0
+            out['cannibalization_risk'] = 'LOW'
+            out['top_rival'] = None
+            return out
+
+        party = self.party[col]
+        names, overlap, _ = self.list_block(party)
+        cols = np.flatnonzero(self.party == party)
+        weights = overlap.to_numpy()[list(cols).index(col)].copy()
+        weights[list(cols).index(col)] = 0.0
+
+        block = self.votes[:, cols]
+        rival_votes = block @ weights
+        list_totals = np.asarray(block.sum(axis=1)).ravel()
+        own = self.votes[:, col].toarray().ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where((own > 0) & (list_totals > 0), rival_votes / list_totals, 0.0)
+
+        # Rival taking the most overlap-weighted votes in each station
+        weighted = block.multiply(weights[None, :]).tocsr()
+        top = np.asarray(weighted.argmax(axis=1)).ravel()
+        has_rival = np.asarray(weighted.max(axis=1).toarray()).ravel() > 0
+
+        out['cannibalization_score'] = score
+        out['cannibalization_risk'] = self.risk_level(score)
+        out['top_rival'] = np.where(has_rival & (score > 0), np.asarray(names, dtype=object)[top], None)
+        return out
+
+    @classmethod
+    def risk_level(cls, score):
+        return np.select([score > t for t, _ in cls.RISK_LEVELS], [label for _, label in cls.RISK_LEVELS], default='LOW')
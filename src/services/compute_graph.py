@@ -0,0 +1,150 @@
+import time
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+from src.services.feature_store import StationFeatureStore
+
+
+def fingerprint(value):
+    """Content fingerprint (hex) of a Series / DataFrame / array / plain value."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        h.update(pd.util.hash_pandas_object(value.index).to_numpy().tobytes())
+        for col in value.columns:
+            h.update(fingerprint(value[col]).encode())
+    elif isinstance(value, pd.Series):
+        h.update(str(len(value)).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Unhashable cells (lists, dicts): fall back to their text
+            h.update('\x1f'.join(map(str, value.tolist())).encode())
+    elif isinstance(value, np.ndarray):
+        h.update(str((value.shape, value.dtype.str)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(repr(sorted((k, fingerprint(v)) for k, v in value.items())).encode())
+    else:
+        h.update(repr(value).encode())
+    return h.hexdigest()
+
+
+class Stage:
+    """One Fx of the graph: the columns it reads / writes, its parameters and owner state it sets."""
+
+    def __init__(self, name, func, reads, writes, params=(), state=()):
+        self.name = name
+        self.func = func
+        self.reads = list(reads)
+        self.writes = list(writes)
+        self.params = list(params)
+        self.state = list(state)
+
+    def read_columns(self, columns):
+        """Declared reads resolved against the frame ('Votos_*' = every column with that prefix)."""
+        resolved = []
+        for col in self.reads:
+            if col.endswith('*'):
+                resolved += [c for c in columns if c.startswith(col[:-1])]
+            elif col in columns:
+                resolved.append(col)
+        return resolved
+
+
+class ComputeGraph:
+    """
+    Module 4d: Memoized Fx Dependency Graph.
+    Stages run in registration order; each one sees only its declared input columns and
+    parameters. A stage's output is memoized under the fingerprints of exactly those inputs,
+    and the fingerprints of its outputs are stored with it, so unchanged upstream results
+    keep every downstream stage a cache hit and only what depends on a changed column or
+    parameter recomputes. Per-stage hit / miss counts and timings are kept in stats().
+    """
+    MAX_ENTRIES = 256
+
+    def __init__(self, owner=None, max_entries=MAX_ENTRIES):
+        self.owner = owner
+        self.max_entries = max_entries
+        self.stages = OrderedDict()
+        self._cache = OrderedDict()
+        self._stats = {}
+
+    def add(self, name, func, reads, writes, params=(), state=()):
+        self.stages[name] = Stage(name, func, reads, writes, params, state)
+        self._stats[name] = {'hits': 0, 'misses': 0, 'compute_ms': 0.0, 'last': None}
+        return self
+
+    def run(self, df, stages=None, **params):
+        """
+        Runs the named 'stages' (all by default) over 'df' (a DataFrame or a StationFeatureStore)
+        and returns a frame of read-only columns with their outputs appended (nothing is copied
+        but the new columns). 'params' are routed to the stages that declare them.
+        """
+        if len(df) == 0:
+            return pd.DataFrame()
+        # Stages read read-only views and append their outputs to a private branch of the store
+        store = df.branch() if isinstance(df, StationFeatureStore) else StationFeatureStore.from_frame(df)
+        prints = {}
+
+        for stage in self.stages.values():
+            if stages is not None and stage.name not in stages:
+                continue
+            reads = stage.read_columns(store.columns)
+            inputs = store.view(reads)
+            for col in reads:
+                if col not in prints:
+                    prints[col] = fingerprint(inputs[col])
+            stage_params = {p: params[p] for p in stage.params if p in params}
+            key = (stage.name, tuple((c, prints[c]) for c in reads),
+                   tuple((p, fingerprint(v)) for p, v in sorted(stage_params.items())))
+
+            stats = self._stats[stage.name]
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                stats['hits'] += 1
+                stats['last'] = 'hit'
+            else:
+                start = time.perf_counter()
+                result = stage.func(inputs, **stage_params)
+                elapsed = (time.perf_counter() - start) * 1000
+                outputs = {c: StationFeatureStore._frozen(result[c]) for c in stage.writes if c in result.columns}
+                entry = {
+                    'outputs': outputs,
+                    'prints': {c: fingerprint(result[c]) for c in outputs},
+                    'state': {a: getattr(self.owner, a, None) for a in stage.state},
+                }
+                self._store(key, entry)
+                stats['misses'] += 1
+                stats['compute_ms'] += elapsed
+                stats['last'] = 'miss'
+
+            for col, values in entry['outputs'].items():
+                store.add(col, values)
+            prints.update(entry['prints'])
+            for attr, value in entry['state'].items():
+                setattr(self.owner, attr, value)
+
+        frame = store.view()
+        if isinstance(df, pd.DataFrame):
+            frame.index = df.index
+        return frame
+
+    def _store(self, key, entry):
+        self._cache[key] = entry
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def stats(self):
+        """Per-stage hits, misses, hit rate, total compute time (ms) and last outcome."""
+        table = pd.DataFrame.from_dict(self._stats, orient='index')
+        if table.empty:
+            return table
+        total = (table['hits'] + table['misses']).replace(0, np.nan)
+        table['hit_rate'] = (table['hits'] / total).fillna(0.0)
+        return table
+
+    def clear(self):
+        self._cache.clear()
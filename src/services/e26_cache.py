@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+except ImportError:
+    # Fallback: caching disabled, every load parses the CSV again
+    pyarrow = None
+    print("Warning: pyarrow not found. E-26 Parquet cache disabled.")
+
+
+class E26Cache:
+    """
+    Content-Addressed Cache for parsed E-26 inputs.
+    Each source file is keyed by (path, size, mtime, sha256). The normalized frame is stored
+    once per content hash as Parquet (categoricals preserved) and memory-mapped on later loads.
+    Bump CACHE_VERSION whenever the normalization in E26Processor changes.
+    """
+    DEFAULT_DIR = ".e26_cache"
+    CACHE_VERSION = 8
+    MANIFEST = "manifest.json"
+
+    def __init__(self, cache_dir=DEFAULT_DIR):
+        self.cache_dir = cache_dir
+        self.enabled = pyarrow is not None
+        self.manifest_path = os.path.join(cache_dir, self.MANIFEST)
+        self.manifest = self._read_manifest()
+
+    # --- MANIFEST ---
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            if manifest.get("version") == self.CACHE_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": self.CACHE_VERSION, "sources": {}}
+
+    def _write_manifest(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    # --- KEYS ---
+
+    @staticmethod
+    def hash_file(path, block_size=1 << 20):
+        """sha256 of the file contents, read in 1 MB blocks."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def content_key(self, path):
+        """
+        Returns the content hash for 'path'.
+        Size + mtime unchanged since the last visit -> reuse the recorded hash (no re-read).
+        """
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        entry = self.manifest["sources"].get(abs_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        sha = self.hash_file(abs_path)
+        self.manifest["sources"][abs_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha,
+        }
+        if entry and entry["sha256"] != sha:
+            self._drop_unreferenced(entry["sha256"])
+        self._write_manifest()
+        return sha
+
+    def _drop_unreferenced(self, sha):
+        """Removes the Parquet entries of a superseded hash no other source still points to."""
+        if any(e["sha256"] == sha for e in self.manifest["sources"].values()):
+            return
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(sha + "-"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _entry_path(self, sha, kind):
+        # The version is part of the name: a CACHE_VERSION bump misses every older entry
+        return os.path.join(self.cache_dir, f"{sha}-{kind}-v{self.CACHE_VERSION}.parquet")
+
+    # --- LOAD / STORE ---
+
+    def load(self, path, kind, loader):
+        """
+        Returns the cached frame for (path, kind), calling 'loader()' and storing
+        its result on a miss. 'kind' separates loaders that read the same file differently.
+        """
+        df = self.get(path, kind)
+        if df is not None:
+            return df
+
+        df = loader()
+        self.put(path, kind, df)
+        return df
+
+    def get(self, path, kind):
+        """Cached frame for (path, kind), or None on a miss."""
+        if not self.enabled or not os.path.exists(path):
+            return None
+        try:
+            entry_path = self._entry_path(self.content_key(path), kind)
+            if os.path.exists(entry_path):
+                return pd.read_parquet(entry_path, memory_map=True)
+        except Exception as e:
+            print(f"E-26 cache read failed for {path}: {e}")
+        return None
+
+    def put(self, path, kind, df):
+        """Stores a parsed frame for (path, kind). Empty frames (failed parses) are not cached."""
+        if not self.enabled or df.empty or not os.path.exists(path):
+            return
+        try:
+            self.store(self._entry_path(self.content_key(path), kind), df)
+        except OSError as e:
+            print(f"E-26 cache write failed for {path}: {e}")
+
+    def store(self, entry_path, df):
+        """Writes a frame as Parquet (object columns dictionary-encoded as categoricals)."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            out = df.copy()
+            for col in out.columns:
+                if out[col].dtype == object or pd.api.types.is_string_dtype(out[col].dtype):
+                    out[col] = out[col].astype("category")
+            tmp_path = entry_path + ".tmp"
+            out.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, entry_path)
+        except Exception as e:
+            print(f"E-26 cache write failed for {entry_path}: {e}")
+
+    # --- MAINTENANCE ---
+
+    def live_hashes(self):
+        """Hashes of sources that still exist unchanged on disk."""
+        live = set()
+        for abs_path, entry in self.manifest["sources"].items():
+            try:
+                stat = os.stat(abs_path)
+            except OSError:
+                continue
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                live.add(entry["sha256"])
+        return live
+
+    def purge(self, stale_only=True):
+        """
+        Deletes cache entries. stale_only=True keeps current-version entries whose source
+        is unchanged. Returns the number of Parquet files removed.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        keep = self.live_hashes() if stale_only else set()
+        current = f"-v{self.CACHE_VERSION}.parquet"
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".parquet"):
+                continue
+            if name.split("-", 1)[0] not in keep or not name.endswith(current):
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+
+        self.manifest["sources"] = {
+            p: e for p, e in self.manifest["sources"].items() if e["sha256"] in keep
+        }
+        self._write_manifest()
+        return removed
+
+
+def main(argv=None):
+    """CLI: python -m src.services.e26_cache {warm,purge} [options]"""
+    # Imported here: E26Processor itself depends on this module
+    from src.services.e26_processor import E26Processor
+
+    parser = argparse.ArgumentParser(description="Warm or purge the E-26 Parquet cache.")
+    parser.add_argument("--cache-dir", default=E26Cache.DEFAULT_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    warm = sub.add_parser("warm", help="Parse sources into the cache.")
+    warm.add_argument("files", nargs="*", help="Headless E-26 result files (default: app sources).")
+
+    purge = sub.add_parser("purge", help="Remove cache entries.")
+    purge.add_argument("--all", action="store_true", help="Also remove entries for unchanged sources.")
+
+    args = parser.parse_args(argv)
+    processor = E26Processor(cache_dir=args.cache_dir)
+
+    if args.command == "warm":
+        files = args.files or E26Processor.DEFAULT_RAW_FILES
+        for f in files:
+            if os.path.exists(f):
+                df = processor.load_raw_e26(f)
+                print(f"Cached {f}: {len(df)} rows")
+            else:
+                print(f"SKIPPING {f}: not found")
+        if not args.files:
+            df = processor.load_demo_data()
+            print(f"Cached {E26Processor.DEMO_FILE}: {len(df)} rows")
+    else:
+        removed = processor.cache.purge(stale_only=not args.all)
+        print(f"Removed {removed} cache entries from {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,73 @@
 import pandas as pd
+import numpy as np
 import io
 import os
+import csv
+import codecs
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.services.e26_cache import E26Cache
+from src.services.results_cube import ResultsCube
+from src.services.live_results import LiveResults
+from src.services.e26_validator import E26Validator
+from src.services.election_panel import ElectionPanel
 
 class E26Processor:
     """
     Module 2: E-26 Election Processor
     Updated for Strict Real Data: CSV Ingestion Only.
     """
-    def __init__(self):
+    # Ultimate geocoding fallback (Centro)
+    DEFAULT_COORDS = (6.2442, -75.5812)
+
+    # Headless E-26 layout (2022 format): column index -> internal name
+    RAW_E26_COLUMNS = {1: 'DEPARTAMENTO', 3: 'MUNICIPIO', 4: 'ZONA', 5: 'COD_PUESTO', 7: 'MESA', 8: 'PUESTO',
+                       11: 'CORPORACION', 14: 'PARTIDO', 16: 'CANDIDATO', 17: 'VOTOS'}
+    RAW_E26_KEYS = ['CORPORACION', 'MUNICIPIO', 'ZONA', 'PUESTO', 'CANDIDATO']
+    RAW_CHUNK_ROWS = 100000
+
+    # Format sniffing: only this many bytes are inspected before the single real parse
+    SNIFF_BYTES = 64 * 1024
+    SNIFF_DELIMITERS = [';', ',', '\t', '|']
+    # Re-parse encoding when a non-UTF-8 byte only shows up past the sniffed sample
+    FALLBACK_ENCODING = 'latin-1'
+    HEADER_MARKERS = {'PUESTO', 'VOTOS', 'ZONA', 'CANDIDATO', 'MUNICIPIO', 'NOMBRE_MUN', 'NOMBRE_DEP', 'MESA'}
+
+    # Compact ingest schema (columns missing from a frame are skipped)
+    CATEGORICAL_COLUMNS = ['NOMBRE_DEP', 'NOMBRE_MUN', 'DEPARTAMENTO', 'MUNICIPIO', 'ZONA', 'COD_PUESTO', 'PUESTO',
+                           'CORPORACION', 'CANDIDATO', 'PARTIDO']
+    # ZONA is a label, not a number: codes like '99A' must not collapse into one unknown zone
+    CODE_COLUMNS = ['MESA']  # small integer codes
+    CODE_DTYPE = 'int16'
+    VOTES_DTYPE = 'int32'
+
+    # Default sources (app.py loads these on every rerun)
+    DEFAULT_RAW_FILES = ["resultado ANDERSON DUQUE.csv", "resultado carlos humberto garcía .csv"]
+    DEMO_FILE = "E26_MEDELLIN_2022_PRELOAD.csv"
+    # Past elections for the multi-election panel (label -> file; missing files are skipped)
+    ELECTION_FILES = {
+        "2019": "E26_MEDELLIN_2019.csv",
+        "2022": DEMO_FILE,
+        "2023": "E26_MEDELLIN_2023.csv",
+    }
+
+    def __init__(self, cache_dir=E26Cache.DEFAULT_DIR):
+        # Parsed-input cache (None disables it)
+        self.cache = E26Cache(cache_dir) if cache_dir else None
+
+        # Shared categorical vocabularies (column -> categories), grown append-only across files
+        self.vocabularies = {}
+        # Election-night incremental aggregator (see ingest_batch)
+        self.live = None
+
+        # Integrity screening; process_data keeps the last report here
+        self.validator = E26Validator()
+        self.last_screen = (pd.DataFrame(), pd.DataFrame())
+
+        # Per-file ingest memory report: path -> {'before_bytes', 'after_bytes', 'saving'}
+        # (object/int64 layout vs compact codes; vocabularies not counted per file)
+        self.memory_report = {}
+
         # Load Master Geocoding Table
         try:
             stations_path = os.path.join("src", "data", "voting_stations.csv")
@@ -22,67 +82,92 @@ class E26Processor:
             print(f"Error loading voting stations CSV: {e}")
             self.stations_df = pd.DataFrame()
 
+        self._build_geo_index()
+
+    def _build_geo_index(self):
+        """
+        Builds the geocoding lookup tables once, so geocoding is a join instead of a scan.
+        - (PUESTO_NORM, ZONA_NORM) -> (LAT, LON): exact tier.
+        - PUESTO_NORM -> (LAT, LON): name-only tier (first match, as before).
+        """
+        if self.stations_df.empty:
+            self.geo_by_station = pd.DataFrame(columns=['LAT', 'LON'])
+            self.geo_by_name = pd.DataFrame(columns=['LAT', 'LON'])
+            return
+
+        # keep='first' mirrors the old matches.iloc[0] behaviour
+        self.geo_by_station = (
+            self.stations_df.drop_duplicates(['PUESTO_NORM', 'ZONA_NORM'], keep='first')
+            .set_index(['PUESTO_NORM', 'ZONA_NORM'])[['LAT', 'LON']]
+            .astype(float)
+        )
+        self.geo_by_name = (
+            self.stations_df.drop_duplicates('PUESTO_NORM', keep='first')
+            .set_index('PUESTO_NORM')[['LAT', 'LON']]
+            .astype(float)
+        )
+
+    def geocode_many(self, names, zones=None):
+        """
+        Batch geocoder. Returns a DataFrame with 'lat' and 'lon' aligned to the input order.
+        1. Exact (Puesto, Zona) match.
+        2. Puesto name match (any zone).
+        3. Fallback to Centro.
+        """
+        names_norm = pd.Series(names, dtype=object).astype(str).str.upper().to_numpy()
+        lat = np.full(len(names_norm), self.DEFAULT_COORDS[0], dtype=float)
+        lon = np.full(len(names_norm), self.DEFAULT_COORDS[1], dtype=float)
+
+        if len(names_norm) == 0 or self.stations_df.empty:
+            return pd.DataFrame({"lat": lat, "lon": lon})
+
+        # Tier 2: name-only (applied first, then overwritten by exact hits)
+        name_pos = self.geo_by_name.index.get_indexer(names_norm)
+        hit = name_pos >= 0
+        lat[hit] = self.geo_by_name['LAT'].to_numpy()[name_pos[hit]]
+        lon[hit] = self.geo_by_name['LON'].to_numpy()[name_pos[hit]]
+
+        # Tier 1: exact (Puesto, Zona), only where a zone was given
+        if zones is not None:
+            zones = pd.Series(zones, dtype=object)
+            has_zone = (zones.notna() & (zones.astype(str).str.strip() != "")).to_numpy()
+            zones_norm = zones.astype(str).str.zfill(2).to_numpy()
+            keys = pd.MultiIndex.from_arrays([names_norm, zones_norm])
+            exact_pos = self.geo_by_station.index.get_indexer(keys)
+            hit = (exact_pos >= 0) & has_zone
+            lat[hit] = self.geo_by_station['LAT'].to_numpy()[exact_pos[hit]]
+            lon[hit] = self.geo_by_station['LON'].to_numpy()[exact_pos[hit]]
+
+        return pd.DataFrame({"lat": lat, "lon": lon})
+
     def geocode_station(self, station_name, zone_id=None):
         """
         Tries to find coordinates for a station name.
         1. Exact Match in Loaded CSV.
         2. Fallback to centralized average (if CSV missing).
         """
-        if self.stations_df.empty:
-             return (6.2442, -75.5812)
-
         try:
-            station_upper = str(station_name).upper()
-            
-            # Simple Filter Matching
-            matches = self.stations_df[self.stations_df['PUESTO_NORM'] == station_upper]
-            
-            # Refine by Zone if provided
-            if zone_id and not matches.empty:
-                zone_str = str(zone_id).zfill(2)
-                zone_matches = matches[matches['ZONA_NORM'] == zone_str]
-                if not zone_matches.empty:
-                    matches = zone_matches
-            
-            if not matches.empty:
-                row = matches.iloc[0]
-                return (float(row['LAT']), float(row['LON']))
-                
+            coords = self.geocode_many([station_name], [zone_id] if zone_id else None)
+            return (float(coords.at[0, 'lat']), float(coords.at[0, 'lon']))
         except Exception as e:
             # print(f"Geocoding Error: {e}")
             pass
-        
+
         # 3. Ultimate Fallback (Centro)
-        return (6.2442, -75.5812)
+        return self.DEFAULT_COORDS
 
     def load_data_from_csv(self, uploaded_file):
         """
         Parses an uploaded CSV file (E-26 format).
-        Supports both Official Registraduría (Semicolon) and Standard (Comma).
+        Delimiter, encoding, header and layout (headered Registraduría / headless result file)
+        are sniffed from the first few KB, then the file is parsed exactly once.
         """
         if uploaded_file is None:
             return pd.DataFrame() # Return empty if no file
             
         try:
-            # Try reading with semicolon first (Official Standard)
-            try:
-                df = pd.read_csv(uploaded_file, sep=';')
-                if 'PUESTO' not in df.columns:
-                    # Fallback to comma if semicolon fails to find columns
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, sep=',')
-            except:
-                uploaded_file.seek(0)
-                df = pd.read_csv(uploaded_file, sep=',')
-            
-            # Normalize Columns
-            df.columns = [c.upper() for c in df.columns]
-            
-            # Map to internal standard
-            if 'VOTOS' in df.columns and 'PUESTO' in df.columns:
-                return df
-                
-            return pd.DataFrame() # Invalid format
+            df = self._parse_e26_strict(uploaded_file)
+            return self._compact(df, getattr(uploaded_file, 'name', 'upload'))
             
         except Exception as e:
             print(f"Error reading CSV: {e}")
@@ -92,46 +177,497 @@ class E26Processor:
         """
         Loads the High-Fidelity Preload CSV.
         """
+        return self._cached_load(self.DEMO_FILE, "demo", self._parse_demo_data)
+
+    def _parse_demo_data(self):
         try:
             # Load the Official-Format Preload
-            df = pd.read_csv("E26_MEDELLIN_2022_PRELOAD.csv", sep=';')
-            return df
+            return self._parse_e26_strict(self.DEMO_FILE)
         except Exception as e:
             print(f"Error loading preload data: {e}")
             return pd.DataFrame()
 
-    def load_raw_e26(self, file_path):
+    # --- FORMAT SNIFFING ---
+
+    @classmethod
+    def _read_sample(cls, source):
+        """First SNIFF_BYTES of a path or binary file-like (rewound afterwards)."""
+        if hasattr(source, 'read'):
+            sample = source.read(cls.SNIFF_BYTES)
+            source.seek(0)
+        else:
+            with open(source, 'rb') as fh:
+                sample = fh.read(cls.SNIFF_BYTES)
+        if isinstance(sample, str):
+            sample = sample.encode('utf-8')
+        return sample
+
+    @classmethod
+    def sniff_format(cls, sample):
+        """
+        Works out how to parse an E-26 file from its first bytes.
+        Returns {'encoding', 'sep', 'layout': 'headered'|'headless', 'columns'}.
+        Raises ValueError if the sample is not a recognizable E-26 layout.
+        """
+        complete = len(sample) < cls.SNIFF_BYTES
+
+        # 1. Encoding: UTF-8 (BOM tolerated) or Latin-1 ("garcía" exported from Excel)
+        try:
+            text = codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=complete)
+            encoding = 'utf-8-sig'
+        except UnicodeDecodeError:
+            text = sample.decode('latin-1')
+            encoding = 'latin-1'
+
+        lines = text.splitlines()
+        if not complete:
+            lines = lines[:-1]  # last line may be cut mid-row
+        lines = [line for line in lines if line.strip()][:50]
+        if not lines:
+            raise ValueError("Empty file")
+
+        # 2. Delimiter: the candidate that splits every sampled row into the same (largest) field count
+        def score(sep):
+            counts = [len(row) for row in csv.reader(lines, delimiter=sep)]
+            return (len(set(counts)) == 1 and counts[0] > 1, min(counts))
+        sep = max(cls.SNIFF_DELIMITERS, key=score)
+        first_row = next(csv.reader(lines[:1], delimiter=sep))
+
+        # 3. Header / layout
+        header = [c.strip().upper() for c in first_row]
+        if cls.HEADER_MARKERS.intersection(header):
+            if 'VOTOS' not in header or 'PUESTO' not in header:
+                raise ValueError(f"Headered file without VOTOS/PUESTO columns: {header}")
+            return {'encoding': encoding, 'sep': sep, 'layout': 'headered', 'columns': header,
+                    'raw_columns': first_row}
+
+        if len(first_row) > max(cls.RAW_E26_COLUMNS):
+            return {'encoding': encoding, 'sep': sep, 'layout': 'headless',
+                    'columns': list(cls.RAW_E26_COLUMNS.values())}
+
+        raise ValueError(f"Unrecognized E-26 layout ({len(first_row)} columns, sep '{sep}')")
+
+    @classmethod
+    def _parse_e26_strict(cls, source, chunksize=None, encoding=None):
+        """
+        Unified loader for both layouts: sniff once, parse once.
+        Headless files come out in the internal naming; headered files keep their
+        (upper-cased) columns. Raises on failure (used directly by the ingest pool).
+        The encoding is sniffed from the first SNIFF_BYTES only: if the parse then hits a
+        non-UTF-8 byte, the file is parsed again as FALLBACK_ENCODING ('encoding' forces one;
+        chunked readers leave the retry to the caller, see _stream_raw_e26).
+        """
+        fmt = cls.sniff_format(cls._read_sample(source))
+        read_opts = {'sep': fmt['sep'], 'encoding': encoding or fmt['encoding']}
+
+        if chunksize:
+            if fmt['layout'] != 'headless':
+                raise ValueError("Streaming is only supported for headless result files")
+            return cls._read_raw_e26(source, cls.RAW_E26_KEYS + ['VOTOS'], chunksize=chunksize, **read_opts)
+
+        try:
+            return cls._read_layout(source, fmt, read_opts)
+        except UnicodeDecodeError as e:
+            if read_opts['encoding'] == cls.FALLBACK_ENCODING:
+                raise
+            print(f"E-26: {e} past the sniffed sample, re-reading as {cls.FALLBACK_ENCODING}")
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return cls._read_layout(source, fmt, {**read_opts, 'encoding': cls.FALLBACK_ENCODING})
+
+    @classmethod
+    def _read_layout(cls, source, fmt, read_opts):
+        """The single read_csv of a sniffed file (see _parse_e26_strict)."""
+        if fmt['layout'] == 'headless':
+            df = cls._read_raw_e26(source, cls.RAW_E26_COLUMNS.values(), **read_opts)
+            df = cls._normalize_raw_chunk(df)
+            return df[list(cls.RAW_E26_COLUMNS.values())]
+
+        dtypes = {raw: 'category' for raw, name in zip(fmt['raw_columns'], fmt['columns'])
+                  if name in cls.CATEGORICAL_COLUMNS}
+        df = pd.read_csv(source, header=0, dtype=dtypes, **read_opts)
+        df.columns = fmt['columns']
+        return df
+
+    def _cached_load(self, file_path, kind, loader):
+        """
+        Routes a file loader through the Parquet cache (if enabled).
+        Fresh parses are compacted before caching; cached frames are re-aligned to the shared vocabularies.
+        """
+        def parse_compact():
+            return self._compact(loader(), file_path)
+
+        if self.cache is None:
+            return parse_compact()
+        return self.enforce_schema(self.cache.load(file_path, kind, parse_compact))
+
+    # --- COMPACT SCHEMA ---
+
+    def _shared_dtype(self, col, series):
+        """Extends the shared vocabulary of 'col' with the new values of 'series' and returns its dtype."""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories
+        else:
+            values = series.dropna().unique()
+        values = pd.Index(np.asarray(values, dtype=object), dtype=object)
+
+        vocab = self.vocabularies.get(col, pd.Index([], dtype=object))
+        new_values = values[~values.isin(vocab)]
+        if len(new_values):
+            # Append-only: codes of frames built on an older vocabulary stay valid
+            vocab = vocab.append(new_values)
+            self.vocabularies[col] = vocab
+        return pd.CategoricalDtype(vocab)
+
+    def enforce_schema(self, df):
+        """
+        Casts a frame to the compact E-26 schema:
+        - Names (MUNICIPIO, PUESTO, CANDIDATO, ...) -> categoricals over shared vocabularies.
+        - ZONA -> categorical zone labels ('01', '99A'; '-1' = unknown, see ElectionPanel.normalize_zona).
+        - MESA -> int16 codes (-1 = unknown).
+        - VOTOS -> int32. Missing / non-numeric values become 0 and are marked in VOTOS_INVALIDO
+          (screened by E26Validator instead of being silently hidden).
+        """
+        if df.empty:
+            return df
+
+        df = df.copy(deep=False)
+        if 'ZONA' in df.columns:
+            df['ZONA'] = ElectionPanel.normalize_zona(df['ZONA'])
+        for col in self.CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                dtype = self._shared_dtype(col, df[col])
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].cat.set_categories(dtype.categories)
+                else:
+                    df[col] = df[col].astype(object).astype(dtype)
+
+        for col in self.CODE_COLUMNS:
+            if col in df.columns and df[col].dtype != self.CODE_DTYPE:
+                codes = pd.to_numeric(df[col].astype(object), errors='coerce')
+                df[col] = codes.fillna(-1).astype(self.CODE_DTYPE)
+
+        if 'VOTOS' in df.columns and df['VOTOS'].dtype != self.VOTES_DTYPE:
+            votes = pd.to_numeric(df['VOTOS'].astype(object), errors='coerce')
+            if 'VOTOS_INVALIDO' not in df.columns and not pd.api.types.is_integer_dtype(df['VOTOS'].dtype):
+                invalid = votes.isna().to_numpy()
+                df['VOTOS_INVALIDO'] = invalid
+                if invalid.any():
+                    print(f"E-26: {int(invalid.sum())} rows with missing / non-numeric VOTOS counted as 0 "
+                          f"(flagged VOTOS_INVALIDO)")
+            df['VOTOS'] = votes.fillna(0).astype(self.VOTES_DTYPE)
+
+        return df
+
+    @staticmethod
+    def _object_bytes(df):
+        """Bytes the frame would take in the old layout (object strings, int64 numbers)."""
+        total = 0
+        for col in df.columns:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Same accounting as memory_usage(deep=True) on an object column; code -1 -> NaN float
+                sizes = np.array([sys.getsizeof(str(c)) for c in series.cat.categories] + [sys.getsizeof(0.0)])
+                total += int(sizes[series.cat.codes.to_numpy()].sum()) + 8 * len(series)
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                total += 8 * len(series)
+            else:
+                total += int(series.memory_usage(deep=True, index=False))
+        return total
+
+    @staticmethod
+    def _compact_bytes(df):
+        """Bytes of the compact frame, excluding the shared vocabularies (held once per processor)."""
+        total = 0
+        for col in df.columns:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                total += series.cat.codes.nbytes
+            else:
+                total += int(series.memory_usage(deep=True, index=False))
+        return total
+
+    def _compact(self, df, file_path):
+        """enforce_schema + memory report for one loaded file."""
+        if df.empty:
+            return df
+
+        df = self.enforce_schema(df)
+        before = self._object_bytes(df)
+        after = self._compact_bytes(df)
+        saving = 1 - after / before if before else 0.0
+        self.memory_report[file_path] = {'before_bytes': before, 'after_bytes': after, 'saving': saving}
+        print(f"E-26 {file_path}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({saving:.0%} saved)")
+        return df
+
+    def concat_frames(self, frames):
+        """
+        Concatenates E-26 frames keeping the compact schema
+        (categoricals are re-aligned to the latest shared vocabularies so pandas does not fall back to object).
+        """
+        frames = [self.enforce_schema(f) for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def load_raw_e26(self, file_path, chunksize=None):
         """
         Parses raw, headerless E-26 CSVs.
         Mappings (Based on 2022 Format):
+        - Col 1: DEPARTAMENTO
         - Col 3: MUNICIPIO
         - Col 4: ZONA (Code)
+        - Col 5: COD_PUESTO (alphanumeric puesto code, identifies the mesa together with ZONA/MESA)
+        - Col 7: MESA
         - Col 8: PUESTO (Name)
+        - Col 11: CORPORACION (CONCEJO, ASAMBLEA, ...: files of several corporations can be concatenated)
+        - Col 14: PARTIDO
         - Col 16: CANDIDATE NAME
         - Col 17: VOTES
+        If 'chunksize' is given the file is streamed instead (see _stream_raw_e26).
+        Results are served from the Parquet cache when the file is unchanged.
         """
+        if chunksize:
+            return self._cached_load(file_path, f"stream{chunksize}",
+                                     lambda: self._stream_raw_e26(file_path, chunksize))
+        return self._cached_load(file_path, "raw", lambda: self._parse_raw_e26(file_path))
+
+    @classmethod
+    def _read_raw_e26(cls, file_path, columns, **kwargs):
+        """read_csv over the headless layout: only 'columns' are parsed, names as categoricals."""
+        usecols = [i for i, name in cls.RAW_E26_COLUMNS.items() if name in columns]
+        dtypes = {i: ('category' if cls.RAW_E26_COLUMNS[i] in cls.CATEGORICAL_COLUMNS else str) for i in usecols}
+        return pd.read_csv(file_path, header=None, usecols=usecols, dtype=dtypes, **kwargs)
+
+    @classmethod
+    def _normalize_raw_chunk(cls, chunk):
+        """Same normalization as always (strip/upper/zfill), applied on the categories instead of every row."""
+        chunk = chunk.rename(columns=cls.RAW_E26_COLUMNS)
+        for col in ('DEPARTAMENTO', 'MUNICIPIO', 'PUESTO', 'CORPORACION'):
+            if col in chunk.columns:
+                chunk[col] = cls._map_categories(chunk[col], lambda c: c.str.strip().str.upper())
+        for col in ('COD_PUESTO', 'PARTIDO', 'CANDIDATO'):
+            if col in chunk.columns:
+                chunk[col] = cls._map_categories(chunk[col], lambda c: c.str.strip())
+        # VOTOS stays raw here: enforce_schema coerces it and records invalid values
+        return chunk
+
+    def _parse_raw_e26(self, file_path):
         try:
-            # Read without header
-            df = pd.read_csv(file_path, header=None, dtype=str)
-            
-            # Select and Rename Columns
-            target_df = pd.DataFrame()
-            target_df['MUNICIPIO'] = df[3].astype(str).str.strip().str.upper()
-            target_df['ZONA'] = df[4].astype(str).str.zfill(2)
-            target_df['PUESTO'] = df[8].astype(str).str.strip().str.upper()
-            target_df['CANDIDATO'] = df[16].astype(str).str.strip()
-            target_df['VOTOS'] = df[17].fillna(0).astype(int)
-            
-            return target_df
-            
+            return self._parse_e26_strict(file_path)
+
         except Exception as e:
             print(f"Error loading raw E-26 file {file_path}: {e}")
             return pd.DataFrame()
 
+    @staticmethod
+    def _map_categories(series, func):
+        """
+        Applies a string transform to the categories of a categorical column
+        (once per distinct value instead of once per row).
+        """
+        cats = series.cat.categories
+        mapped = pd.Series(func(pd.Series(cats.astype(str), index=cats)), index=cats)
+        return series.map(mapped).astype('category')
+
+    def _stream_raw_e26(self, file_path, chunksize=RAW_CHUNK_ROWS):
+        """
+        Streaming loader for department/national exports.
+        Reads only the key columns in fixed-size chunks (categorical keys, numeric votes),
+        pre-aggregates each chunk by (CORPORACION, MUNICIPIO, ZONA, PUESTO, CANDIDATO) and folds it into a
+        running total. Peak memory is one chunk plus the distinct keys, whatever the file size.
+        Mesa-level rows are not kept: VOTOS are summed per key, and VOTOS_INVALIDO counts the
+        rows of each key whose VOTOS were missing / non-numeric (summed as 0, screened by E26Validator).
+        """
+        try:
+            try:
+                totals = self._fold_chunks(self._parse_e26_strict(file_path, chunksize=chunksize))
+            except UnicodeDecodeError as e:
+                # Non-UTF-8 byte past the sniffed sample: start over (partials would mix encodings)
+                print(f"E-26 {file_path}: {e}, re-streaming as {self.FALLBACK_ENCODING}")
+                totals = self._fold_chunks(
+                    self._parse_e26_strict(file_path, chunksize=chunksize, encoding=self.FALLBACK_ENCODING))
+
+            if totals is None:
+                return pd.DataFrame()
+            invalid = int(totals['VOTOS_INVALIDO'].sum())
+            if invalid:
+                print(f"E-26 {file_path}: {invalid} rows with missing / non-numeric VOTOS counted as 0 "
+                      f"(VOTOS_INVALIDO)")
+            return totals
+
+        except Exception as e:
+            print(f"Error streaming raw E-26 file {file_path}: {e}")
+            return pd.DataFrame()
+
+    def _fold_chunks(self, reader):
+        """Running per-key totals over a chunked reader (None if it yields nothing)."""
+        keys = self.RAW_E26_KEYS
+        sums = ['VOTOS', 'VOTOS_INVALIDO']
+        totals = None
+        for chunk in reader:
+            chunk = self._normalize_raw_chunk(chunk)
+            votes = pd.to_numeric(chunk['VOTOS'], errors='coerce')
+            chunk['VOTOS_INVALIDO'] = votes.isna().astype('int64')
+            chunk['VOTOS'] = votes.fillna(0).astype('int64')
+            chunk['ZONA'] = ElectionPanel.normalize_zona(chunk['ZONA'])
+
+            partial = chunk.groupby(keys, observed=True, sort=False)[sums].sum().reset_index()
+            if totals is not None:
+                partial = pd.concat([totals, partial], ignore_index=True)
+                partial = partial.groupby(keys, observed=True, sort=False)[sums].sum().reset_index()
+            totals = partial
+        return totals
+
+    def load_raw_many(self, file_paths, max_workers=None):
+        """
+        Parallel ingest of many headless E-26 files (one per candidate / corporation).
+        Cache hits are served directly; misses are parsed across a process pool of at most
+        'max_workers' processes (default: CPU count), then compacted and cached here (the same
+        compact frame load_raw_e26 caches). Every row keeps its CORPORACION, so files of
+        different corporations stay separable after the concatenation.
+        Returns (frame, errors): one concatenated categorical frame and {path: error message}
+        for every file that could not be loaded.
+        """
+        frames = {}
+        errors = {}
+        pending = []
+
+        for path in file_paths:
+            if not os.path.exists(path):
+                errors[path] = "FileNotFoundError: file does not exist"
+                continue
+            cached = self.cache.get(path, "raw") if self.cache else None
+            if cached is not None:
+                frames[path] = self.enforce_schema(cached)
+            else:
+                pending.append(path)
+
+        workers = min(len(pending), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            parsed = ((path, self._ingest_file(path)) for path in pending)
+        else:
+            parsed = self._ingest_parallel(pending, workers)
+
+        for path, (df, error) in parsed:
+            if error:
+                errors[path] = error
+                continue
+            frames[path] = self._compact(df, path)
+            if self.cache:
+                self.cache.put(path, "raw", frames[path])
+
+        # Keep the caller's file order
+        ordered = [frames[path] for path in file_paths if path in frames]
+        return self.concat_frames(ordered), errors
+
+    @staticmethod
+    def _ingest_parallel(paths, workers):
+        """Yields (path, (df, error)) as files finish in the process pool."""
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_ingest_raw_file, path): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    yield path, future.result()
+                except Exception as e:
+                    # Worker crashed (e.g. killed); report it like a parse error
+                    yield path, (None, f"{type(e).__name__}: {e}")
+
+    @classmethod
+    def _ingest_file(cls, path):
+        """(df, None) on success, (None, 'ErrorType: message') on failure."""
+        try:
+            df = cls._parse_e26_strict(path)
+            if df.empty:
+                return None, "EmptyDataError: no rows"
+            return df, None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    def start_live(self, target_candidates=None):
+        """Starts (or restarts) election-night incremental aggregation for a list of targets."""
+        self.live = LiveResults(self, target_candidates or ["MARIA FERNANDA CABAL"])
+        return self.live
+
+    def ingest_batch(self, batch, target_candidates=None):
+        """
+        Election night: folds a partial drop of mesa rows into the live aggregates.
+        Already-seen mesa rows are skipped; cost is proportional to the batch.
+        Returns the number of new rows. Read results with self.live.frame(), key caches on self.live.version.
+        """
+        if self.live is None:
+            self.start_live(target_candidates)
+        return self.live.ingest(batch)
+
+    def build_cube(self, df):
+        """
+        Builds the hierarchical results cube (department -> mesa rollups) for a raw dataset.
+        Build once per dataset and drill down with ResultsCube.query().
+        """
+        return ResultsCube(self.enforce_schema(df))
+
+    @staticmethod
+    def _match_candidates(names, target_candidates):
+        """
+        Resolves every distinct candidate name against all targets at once.
+        Returns a (names x targets) boolean matrix using the same 'contains' rule
+        as the old per-target filter, but evaluated once per name instead of once per row.
+        """
+        names = pd.Series(np.asarray(names, dtype=object)).astype(str)
+        match = np.zeros((len(names), len(target_candidates)), dtype=bool)
+        for j, target in enumerate(target_candidates):
+            match[:, j] = names.str.contains(target.upper(), na=False).to_numpy()
+        return match
+
+    def _aggregate_station_votes(self, df, target_candidates):
+        """
+        Builds the (Zona, Puesto) x candidate vote matrix with one groupby and projects it
+        onto the targets with a matrix product. Returns Zona, Puesto, Votos_Total, Votos_{Target}...
+        """
+        if "CANDIDATO" in df.columns:
+            candidates = df["CANDIDATO"]
+            if not isinstance(candidates.dtype, pd.CategoricalDtype):
+                candidates = candidates.astype("category")
+            cand_id = pd.Series(candidates.cat.codes, index=df.index, name="_CID")
+            names = candidates.cat.categories
+        else:
+            cand_id = pd.Series(-1, index=df.index, name="_CID")
+            names = pd.Index([])
+
+        # Station x candidate matrix (the only pass over raw rows)
+        matrix = (
+            df.groupby(["ZONA", "PUESTO", cand_id], observed=True)["VOTOS"].sum()
+            .unstack("_CID", fill_value=0)
+        )
+        values = matrix.to_numpy()
+
+        # Candidate -> target projection (-1 = missing name, never matches)
+        cids = matrix.columns.to_numpy()
+        name_match = self._match_candidates(names, target_candidates)
+        col_match = np.zeros((len(cids), len(target_candidates)), dtype=values.dtype)
+        known = cids >= 0
+        col_match[known] = name_match[cids[known]]
+        target_votes = values @ col_match
+
+        base_group = matrix.index.to_frame(index=False).rename(columns={"ZONA": "Zona", "PUESTO": "Puesto"})
+        base_group["Votos_Total"] = values.sum(axis=1)
+        for j, target in enumerate(target_candidates):
+            base_group[f"Votos_{target.replace(' ', '_')}"] = target_votes[:, j]
+        return base_group
+
+    def validate_data(self, df):
+        """
+        Integrity & anomaly screening of a raw (mesa-level) frame.
+        Returns (flags, quality): flagged rows and per-puesto quality scores (see E26Validator).
+        """
+        return self.validator.screen(self.enforce_schema(df))
+
     def process_data(self, df, target_candidates=None):
         """
         Aggregates votes by Puesto for a list of target candidates.
-        Returns a DataFrame with columns: Puesto, lat, lon, Votos_Total, and Votos_{Candidate} for each target.
+        Returns a DataFrame with columns: Puesto, lat, lon, Votos_Total, and Votos_{Candidate} for each target,
+        plus 'quality_score' / 'anomaly_rows' from the integrity screening (report kept in self.last_screen).
         """
         if df.empty:
             return pd.DataFrame()
@@ -141,37 +677,20 @@ class E26Processor:
         
         if "VOTOS" not in df.columns or "PUESTO" not in df.columns:
             return pd.DataFrame()
+        df = self.enforce_schema(df)
 
         # Default targets if none provided
         if not target_candidates:
             target_candidates = ["MARIA FERNANDA CABAL"]
             
-        # 1. Base Aggregation (Total Votes per Puesto)
-        base_group = df.groupby(["ZONA", "PUESTO"])["VOTOS"].sum().reset_index()
-        base_group.rename(columns={"PUESTO": "Puesto", "VOTOS": "Votos_Total", "ZONA": "Zona"}, inplace=True)
-        
-        # 2. Target Specific Aggregation
-        for target in target_candidates:
-            target_upper = target.upper()
-            # Filter for this specific candidate
-            if "CANDIDATO" in df.columns:
-                # Flexible matching
-                mask = df["CANDIDATO"].str.contains(target_upper, na=False)
-                target_votes = df[mask].groupby(["ZONA", "PUESTO"])["VOTOS"].sum().reset_index()
-                
-                # Merge into base
-                col_name = f"Votos_{target.replace(' ', '_')}"
-                base_group = pd.merge(base_group, target_votes, left_on=["Zona", "Puesto"], right_on=["ZONA", "PUESTO"], how="left")
-                base_group.drop(columns=["ZONA", "PUESTO"], inplace=True)
-                base_group.rename(columns={"VOTOS": col_name}, inplace=True)
-                base_group[col_name] = base_group[col_name].fillna(0)
-            else:
-                base_group[f"Votos_{target.replace(' ', '_')}"] = 0
+        # 1 + 2. Base and Target Aggregation in a single pass
+        base_group = self._aggregate_station_votes(df, target_candidates)
 
-        # 3. Geocode
-        base_group["coords"] = base_group.apply(lambda row: self.geocode_station(row["Puesto"], row["Zona"]), axis=1)
-        base_group["lat"] = base_group["coords"].apply(lambda x: x[0])
-        base_group["lon"] = base_group["coords"].apply(lambda x: x[1])
+        # 3. Geocode (single vectorized join against the station index)
+        coords = self.geocode_many(base_group["Puesto"], base_group["Zona"])
+        base_group["coords"] = list(zip(coords["lat"], coords["lon"]))
+        base_group["lat"] = coords["lat"].to_numpy()
+        base_group["lon"] = coords["lon"].to_numpy()
         
         # 4. Calculate Historical Strength (based on the first target in the list as 'primary')
         primary_col = f"Votos_{target_candidates[0].replace(' ', '_')}"
@@ -181,7 +700,52 @@ class E26Processor:
         else:
             base_group["historical_strength"] = 0
             
+        # 5. Integrity screening (vectorized) -> per-puesto quality
+        flags, quality = self.validator.screen(df)
+        self.last_screen = (flags, quality)
+        if not quality.empty:
+            station_quality = quality[['ZONA', 'PUESTO', 'quality_score', 'n_flagged']].rename(
+                columns={'ZONA': 'Zona', 'PUESTO': 'Puesto', 'n_flagged': 'anomaly_rows'})
+            base_group = base_group.merge(station_quality, on=['Zona', 'Puesto'], how='left')
+            base_group["quality_score"] = base_group["quality_score"].fillna(100.0)
+            base_group["anomaly_rows"] = base_group["anomaly_rows"].fillna(0).astype(int)
+        else:
+            base_group["quality_score"] = 100.0
+            base_group["anomaly_rows"] = 0
+
         # Backward Compatibility
         base_group["Votos"] = base_group["Votos_Total"]
             
         return base_group
+
+    def load_election(self, file_path):
+        """Loads one election's E-26 file (any sniffable layout) through the cache."""
+        def parse():
+            try:
+                return self._parse_e26_strict(file_path)
+            except Exception as e:
+                print(f"Error loading election file {file_path}: {e}")
+                return pd.DataFrame()
+        return self._cached_load(file_path, "election", parse)
+
+    def build_panel(self, target_candidates=None, election_files=None):
+        """
+        Multi-election station panel (see ElectionPanel) over the existing files of
+        'election_files' (default ELECTION_FILES), each processed for the same targets.
+        """
+        panel = ElectionPanel()
+        last_screen = self.last_screen
+        for label, path in (election_files or self.ELECTION_FILES).items():
+            if not os.path.exists(path):
+                continue
+            stations = self.process_data(self.load_election(path), target_candidates)
+            if not stations.empty:
+                panel.add(label, stations)
+        # The panel's screenings are not the current election's
+        self.last_screen = last_screen
+        return panel
+
+
+def _ingest_raw_file(path):
+    """Process-pool entry point (module level so it can be pickled)."""
+    return E26Processor._ingest_file(path)
@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+
+
+class E26Validator:
+    """
+    Module 2d: E-26 Integrity & Anomaly Screening.
+    Fully vectorized checks over the mesa-level frame:
+    - DUPLICADO: repeated (race, mesa, list, candidate) rows (the first copy is kept clean).
+    - VOTOS_NEGATIVOS / VOTOS_INVALIDOS: negative, missing or non-numeric VOTOS.
+    - MESA_ATIPICA: mesa total (per race) is a robust outlier (modified z-score) against its puesto.
+    - DIGITOS_ANOMALOS: last-digit distribution of the puesto's mesa totals fails a uniformity chi-square.
+    Returns a flagged-rows report and per-puesto quality scores (0-100).
+    """
+    CHECKS = ['DUPLICADO', 'VOTOS_NEGATIVOS', 'VOTOS_INVALIDOS', 'MESA_ATIPICA', 'DIGITOS_ANOMALOS']
+
+    # Row identity (columns absent from the frame are skipped). Mesas are screened per race:
+    # a mesa votes every corporation, and 'VOTOS EN BLANCO' repeats for each race / list
+    MESA_KEYS = ['CORPORACION', 'MUNICIPIO', 'ZONA', 'COD_PUESTO', 'PUESTO', 'MESA']
+    ROW_KEYS = MESA_KEYS + ['PARTIDO', 'CANDIDATO']
+
+    # Outlier test: modified z-score (Iglewicz & Hoaglin) above 3.5, puestos with >= 5 mesas
+    OUTLIER_Z = 3.5
+    MIN_MESAS = 5
+
+    # Last-digit test: mesa totals >= 10, puestos with >= 30 of them, chi-square df=9 at p=0.01
+    DIGIT_MIN_VALUE = 10
+    DIGIT_MIN_SAMPLES = 30
+    DIGIT_CHI2_CRITICAL = 21.666
+
+    def screen(self, df):
+        """
+        Runs every check over 'df' (compact E-26 schema).
+        Returns (flags, quality):
+        - flags: the offending rows plus one boolean column per check and a 'FLAGS' summary.
+        - quality: per (ZONA, PUESTO) row counts, per-check counts and 'quality_score'.
+        """
+        if df.empty or 'VOTOS' not in df.columns or 'PUESTO' not in df.columns:
+            return pd.DataFrame(), pd.DataFrame()
+
+        df = df.reset_index(drop=True)
+        n = len(df)
+        votes = df['VOTOS'].to_numpy()
+        checks = {}
+
+        row_keys = [c for c in self.ROW_KEYS if c in df.columns]
+        checks['DUPLICADO'] = df.duplicated(row_keys, keep='first').to_numpy()
+        checks['VOTOS_NEGATIVOS'] = votes < 0
+        if 'VOTOS_INVALIDO' in df.columns:
+            checks['VOTOS_INVALIDOS'] = df['VOTOS_INVALIDO'].to_numpy(dtype=bool)
+        else:
+            checks['VOTOS_INVALIDOS'] = np.zeros(n, dtype=bool)
+
+        # Mesa totals (clean rows only) -> one value per mesa, mapped back to its rows
+        mesa_keys = [c for c in self.MESA_KEYS if c in df.columns]
+        puesto_keys = [c for c in mesa_keys if c != 'MESA']
+        clean = ~(checks['DUPLICADO'] | checks['VOTOS_NEGATIVOS'] | checks['VOTOS_INVALIDOS'])
+        mesa_id = df.groupby(mesa_keys, observed=True, sort=False).ngroup().to_numpy()
+        mesa_total = np.bincount(mesa_id, weights=np.where(clean, votes, 0))
+        first_row = np.unique(mesa_id, return_index=True)[1]
+        puesto_of_mesa = df.groupby(puesto_keys, observed=True, sort=False).ngroup().to_numpy()[first_row]
+
+        mesa_outlier = self._robust_outliers(mesa_total, puesto_of_mesa)
+        puesto_digits = self._digit_anomalies(mesa_total, puesto_of_mesa)
+        checks['MESA_ATIPICA'] = mesa_outlier[mesa_id]
+        checks['DIGITOS_ANOMALOS'] = puesto_digits[puesto_of_mesa][mesa_id]
+
+        matrix = np.column_stack([checks[c] for c in self.CHECKS])
+        flagged = matrix.any(axis=1)
+
+        # Flagged-rows report
+        flags = df[flagged].copy()
+        summary = np.full(int(flagged.sum()), '', dtype=object)
+        for j, name in enumerate(self.CHECKS):
+            flags[name] = matrix[flagged, j]
+            summary = summary + np.where(matrix[flagged, j], name + ';', '')
+        flags['FLAGS'] = [s.rstrip(';') for s in summary]
+
+        # Per-puesto quality (same keys as process_data output)
+        per_row = pd.DataFrame(matrix, columns=self.CHECKS)
+        per_row['ZONA'] = df['ZONA'].to_numpy() if 'ZONA' in df.columns else '-1'
+        per_row['PUESTO'] = df['PUESTO'].to_numpy()
+        per_row['FLAGGED'] = flagged
+        quality = per_row.groupby(['ZONA', 'PUESTO'], observed=True).agg(
+            n_rows=('FLAGGED', 'size'), n_flagged=('FLAGGED', 'sum'),
+            **{name.lower(): (name, 'sum') for name in self.CHECKS}
+        ).reset_index()
+        quality['quality_score'] = 100 * (1 - quality['n_flagged'] / quality['n_rows'])
+        return flags, quality
+
+    def _robust_outliers(self, values, group):
+        """Per-value flag: |modified z| > OUTLIER_Z within its group (median / MAD per group)."""
+        frame = pd.DataFrame({'v': values, 'g': group})
+        grouped = frame.groupby('g')['v']
+        median = grouped.transform('median').to_numpy()
+        mad = (frame['v'] - median).abs().groupby(frame['g']).transform('median').to_numpy()
+        size = grouped.transform('size').to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = 0.6745 * (values - median) / mad
+        z = np.where(mad > 0, z, 0.0)
+        return (np.abs(z) > self.OUTLIER_Z) & (size >= self.MIN_MESAS)
+
+    def _digit_anomalies(self, values, group):
+        """Per-group flag: last digits of the values deviate from uniform (chi-square, df=9)."""
+        n_groups = int(group.max()) + 1 if len(group) else 0
+        eligible = values >= self.DIGIT_MIN_VALUE
+        digits = (values[eligible].astype(np.int64)) % 10
+
+        counts = np.zeros((n_groups, 10))
+        np.add.at(counts, (group[eligible], digits), 1)
+        totals = counts.sum(axis=1)
+        expected = totals[:, None] / 10
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chi2 = np.where(expected > 0, (counts - expected) ** 2 / expected, 0).sum(axis=1)
+        return (chi2 > self.DIGIT_CHI2_CRITICAL) & (totals >= self.DIGIT_MIN_SAMPLES)
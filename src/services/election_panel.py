@@ -0,0 +1,168 @@
+import re
+import unicodedata
+import pandas as pd
+import numpy as np
+from src.services.compute_graph import fingerprint
+
+
+class ElectionPanel:
+    """
+    Module 2e: Multi-Election Station Panel.
+    Aligns the processed station results of several elections (2019, 2022, 2023, ...) on a
+    stable station key, "<zona>|<normalized puesto>" (accents, case, punctuation and spacing
+    folded, so renamed spellings of the same puesto line up), and keeps every vote column as a
+    stations x elections matrix (NaN where a station did not exist in an election).
+
+    estimates() fits all stations at once from masked moments over the share matrix:
+    - swing: change in the candidate's share between the last two elections the station has,
+    - volatility: standard deviation of the station's share changes,
+    - elasticity: slope of the station's share on the city-wide share (1 = moves with the city,
+      > 1 amplifies city swings, < 1 is stable), with its R^2.
+    """
+    MIN_ELECTIONS = 2
+
+    def __init__(self):
+        self.elections = []
+        self._frames = {}
+        self._prints = {}
+        self._matrices = {}
+        self._stations = None
+
+    def __len__(self):
+        return len(self.elections)
+
+    def __repr__(self):
+        # Content-based, so the Fx graph can key stages on the panel itself
+        return f"ElectionPanel({fingerprint(self._prints)})"
+
+    @staticmethod
+    def normalize_puesto(names):
+        """Upper case, no accents, alphanumerics separated by single spaces (computed once per distinct name)."""
+        names = pd.Series(np.asarray(names, dtype=object)).astype(str)
+        uniques = pd.unique(names)
+        folded = [
+            re.sub(r'[^A-Z0-9]+', ' ', unicodedata.normalize('NFKD', u).encode('ascii', 'ignore').decode().upper()).strip()
+            for u in uniques
+        ]
+        return pd.Series(folded, index=uniques).reindex(names.to_numpy()).to_numpy()
+
+    @staticmethod
+    def normalize_zona(zona):
+        """
+        Zone labels as a categorical: numeric codes zero-padded like the geocoding table
+        ('1', '01', 1 -> '01'), any other code ('99A', 'ZR') stripped and upper-cased, so a
+        non-numeric zone stays its own zone. Missing / blank -> '-1' (unknown).
+        Computed once per distinct code.
+        """
+        codes, uniques = pd.factorize(pd.Series(zona), sort=False)
+        # Trailing slot for code -1 (missing)
+        text = pd.Series(np.append(np.asarray(uniques, dtype=object), '')).astype(str).str.strip().str.upper()
+        text[text == ''] = '-1'
+        numbers = pd.to_numeric(text, errors='coerce')
+        numeric = numbers.notna().to_numpy()
+        labels = text.to_numpy(dtype=object)
+        labels[numeric] = numbers[numeric].astype('int64').astype(str).str.zfill(2).to_numpy()
+
+        remap, vocab = pd.factorize(labels, sort=True)
+        return pd.Categorical.from_codes(remap[codes], categories=vocab)
+
+    @classmethod
+    def station_key(cls, zona, puesto):
+        """Stable station keys for parallel arrays of zonas and puesto names."""
+        zones = np.asarray(cls.normalize_zona(np.asarray(zona, dtype=object)), dtype=str)
+        return pd.Index(zones + '|' + cls.normalize_puesto(puesto), name='station_key')
+
+    def keys_of(self, df):
+        return self.station_key(df['Zona'], df['Puesto'])
+
+    def add(self, label, station_df):
+        """Adds (or replaces) one election from a processed station frame (Zona, Puesto, Votos_*)."""
+        label = str(label)
+        vote_cols = [c for c in station_df.columns if c.startswith('Votos')]
+        frame = station_df[vote_cols].astype(float).set_axis(self.keys_of(station_df))
+        # Two spellings that fold to the same key are the same station
+        frame = frame.groupby(level=0, sort=False).sum()
+        if label not in self._frames:
+            self.elections.append(label)
+        self._frames[label] = frame
+        self._prints[label] = fingerprint(frame)
+        self._matrices.clear()
+        self._stations = None
+        return self
+
+    @property
+    def stations(self):
+        """Union of the station keys, in order of first appearance."""
+        if self._stations is None:
+            keys = pd.Index([], dtype=object)
+            for label in self.elections:
+                index = self._frames[label].index
+                keys = keys.append(index[~index.isin(keys)])
+            self._stations = keys.rename('station_key')
+        return self._stations
+
+    def matrix(self, column):
+        """Stations x elections matrix of a vote column (NaN where missing)."""
+        if column not in self._matrices:
+            stations = self.stations
+            values = np.full((len(stations), len(self.elections)), np.nan)
+            for j, label in enumerate(self.elections):
+                frame = self._frames[label]
+                if column in frame.columns:
+                    pos = stations.get_indexer(frame.index)
+                    values[pos, j] = frame[column].to_numpy()
+            self._matrices[column] = pd.DataFrame(values, index=stations, columns=self.elections)
+        return self._matrices[column]
+
+    def estimates(self, candidate_col, total_col='Votos_Total'):
+        """
+        Per-station swing, volatility and elasticity of 'candidate_col' (see class docstring).
+        Stations with fewer than MIN_ELECTIONS shares (or a flat city series) get NaN.
+        """
+        votes = self.matrix(candidate_col).to_numpy()
+        totals = self.matrix(total_col).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(totals > 0, votes / totals, np.nan)
+            city = np.nansum(votes, axis=0) / np.nansum(np.where(np.isnan(votes), np.nan, totals), axis=0)
+        mask = ~np.isnan(share)
+        n = mask.sum(axis=1)
+
+        # Masked least squares of share on city share, every station in one pass
+        x = np.where(mask, city[None, :], 0.0)
+        y = np.where(mask, share, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_mean = x.sum(axis=1) / n
+            y_mean = y.sum(axis=1) / n
+            dx = np.where(mask, x - x_mean[:, None], 0.0)
+            dy = np.where(mask, y - y_mean[:, None], 0.0)
+            sxx = np.einsum('ij,ij->i', dx, dx)
+            syy = np.einsum('ij,ij->i', dy, dy)
+            sxy = np.einsum('ij,ij->i', dx, dy)
+            fit = (n >= self.MIN_ELECTIONS) & (sxx > 1e-12)
+            elasticity = np.where(fit, sxy / sxx, np.nan)
+            r2 = np.where(fit & (syy > 0), sxy ** 2 / (sxx * syy), np.nan)
+
+        # Share changes between consecutive elections each station took part in
+        # (present shares packed to the left, order kept)
+        order = np.argsort(~mask, axis=1, kind='stable')
+        packed = np.take_along_axis(share, order, axis=1)
+        rows = np.arange(len(n))
+        steps = np.diff(packed, axis=1) if packed.shape[1] > 1 else np.full((len(n), 1), np.nan)
+        step_count = np.clip(n - 1, 0, None)
+        has_swing = step_count >= self.MIN_ELECTIONS - 1
+        swing = np.where(has_swing, steps[rows, np.clip(step_count - 1, 0, None)], np.nan)
+        valid = np.arange(steps.shape[1])[None, :] < step_count[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step_mean = np.where(valid, steps, 0.0).sum(axis=1) / step_count
+            volatility = np.sqrt((np.where(valid, steps - step_mean[:, None], 0.0) ** 2).sum(axis=1) / step_count)
+        volatility = np.where(has_swing, volatility, np.nan)
+        latest = np.where(n > 0, packed[rows, np.clip(n - 1, 0, None)], np.nan)
+
+        return pd.DataFrame({
+            'share': latest, 'swing': swing, 'volatility': volatility,
+            'elasticity': elasticity, 'elasticity_r2': r2, 'n_elections': n,
+        }, index=self.stations)
+
+    def lookup(self, df, candidate_col, total_col='Votos_Total'):
+        """estimates() aligned to the stations of a processed frame (positional)."""
+        return self.estimates(candidate_col, total_col).reindex(self.keys_of(df)).reset_index(drop=True)
@@ -0,0 +1,100 @@
+import pandas as pd
+import numpy as np
+
+
+class StationFeatureStore:
+    """
+    Module 4e: Station Feature Store.
+    Columnar store of per-station features keyed by station id ((Zona, Puesto) when both
+    are present). Every column is held once as an immutable array: numpy columns are
+    flagged read-only, so frames built by view() share memory with the store and any
+    in-place write raises instead of leaking into other readers. Adding a feature costs
+    O(that column); branch() gives a tab / stage its own namespace that shares every
+    existing column (copy-on-write: a branch only ever adds or replaces its own columns).
+    """
+    KEY_COLUMNS = ['Zona', 'Puesto']
+
+    def __init__(self, ids):
+        self.ids = ids if isinstance(ids, pd.Index) else pd.Index(ids)
+        self._columns = {}
+
+    @classmethod
+    def from_frame(cls, df, key_columns=None):
+        """Store over the columns of 'df' (no copies: read-only views of its arrays)."""
+        keys = [c for c in (key_columns or cls.KEY_COLUMNS) if c in df.columns]
+        if len(keys) > 1:
+            ids = pd.MultiIndex.from_arrays([df[c].to_numpy() for c in keys], names=keys)
+        elif keys:
+            ids = pd.Index(df[keys[0]].to_numpy(), name=keys[0])
+        else:
+            ids = pd.RangeIndex(len(df))
+        store = cls(ids)
+        for col in df.columns:
+            store._columns[col] = cls._frozen(df[col], copy=False)
+        return store
+
+    @staticmethod
+    def _frozen(values, copy=True):
+        """Immutable column: numpy data is (copied if 'copy' and writeable, then) flagged read-only."""
+        if isinstance(values, pd.Series):
+            values = values.array if not isinstance(values.dtype, np.dtype) else values.to_numpy()
+        if isinstance(values, np.ndarray):
+            if copy and values.flags.writeable:
+                values = values.copy()
+            else:
+                values = values.view()
+            values.setflags(write=False)
+        elif not hasattr(values, 'dtype'):
+            values = np.asarray(values)
+            values.setflags(write=False)
+        return values
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def add(self, name, values):
+        """
+        Adds (or replaces, in this store only) a feature column. A Series indexed by station id
+        is aligned to the store; anything else must be positional with one value per station.
+        Arrays that are already read-only are shared as-is; writeable ones are copied once.
+        """
+        if isinstance(values, pd.Series) and not isinstance(values.index, pd.RangeIndex):
+            values = values.reindex(self.ids)
+        if np.ndim(values) == 0:
+            values = np.full(len(self), values)
+        if len(values) != len(self):
+            raise ValueError(f"Feature '{name}' has {len(values)} values for {len(self)} stations")
+        self._columns[name] = self._frozen(values)
+        return self
+
+    def get(self, name):
+        """Read-only array of a feature."""
+        return self._columns[name]
+
+    def view(self, columns=None):
+        """DataFrame over the stored arrays (no copies; positional index)."""
+        names = self.columns if columns is None else [c for c in columns if c in self._columns]
+        return pd.DataFrame({c: self._columns[c] for c in names}, copy=False)
+
+    def branch(self):
+        """New store sharing every current column; later adds on either side stay private."""
+        child = StationFeatureStore(self.ids)
+        child._columns = dict(self._columns)
+        return child
+
+    def nbytes(self):
+        """Bytes held by the distinct arrays of this store."""
+        seen, total = set(), 0
+        for values in self._columns.values():
+            base = values.base if isinstance(values, np.ndarray) and values.base is not None else values
+            if id(base) not in seen:
+                seen.add(id(base))
+                total += getattr(values, 'nbytes', 0)
+        return total
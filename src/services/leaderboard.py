@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+
+class Leaderboard:
+    """
+    Module 4i: Streaming Top-k Station Leaderboards.
+    Stations (any hashable key, e.g. (Zona, Puesto)) are upserted with their metric values and
+    label columns. For every tracked metric the board keeps the 'capacity' best stations and
+    the floor value needed to enter them, so an update only touches rows that cross the floor
+    and "top N by M where F" reads at most 'capacity' entries. When a top station falls below
+    the floor the set is refilled lazily, on the next query, with one argpartition; queries the
+    kept set cannot answer (very selective filters, N > capacity, untracked metrics) use
+    argpartition over the full columns. Keys are looked up by hash, so syncing a whole frame
+    is vectorized and only its new or changed rows reach the top sets.
+    """
+    CAPACITY = 64
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, metrics, capacity=CAPACITY):
+        self.metrics = list(metrics)
+        self.capacity = capacity
+        self.version = 0
+        # Station keys: hashed (vectorized lookups) and as given (results)
+        self._index = pd.Index(np.zeros(0, dtype=np.uint64))
+        self._keys = []
+        self._rows = self.INITIAL_CAPACITY
+        self._values = {m: np.full(self._rows, np.nan) for m in self.metrics}
+        self._labels = {}
+        self._top = {m: {} for m in self.metrics}
+        self._floor = {m: -np.inf for m in self.metrics}
+        self._complete = {m: True for m in self.metrics}
+        # Row of each station in the last synced frame (-1: not in it)
+        self._frame_row = np.full(self._rows, -1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _grow(self, needed):
+        """Doubles the row capacity until 'needed' stations fit."""
+        if needed <= self._rows:
+            return
+        while self._rows < needed:
+            self._rows *= 2
+        for name, old in self._values.items():
+            new = np.full(self._rows, np.nan)
+            new[:len(old)] = old
+            self._values[name] = new
+        for name, old in self._labels.items():
+            new = np.empty(self._rows, dtype=object)
+            new[:len(old)] = old
+            self._labels[name] = new
+        frame_row = np.full(self._rows, -1, dtype=np.int64)
+        frame_row[:len(self._frame_row)] = self._frame_row
+        self._frame_row = frame_row
+
+    @staticmethod
+    def hash_keys(keys):
+        """uint64 hash per station key: a frame of key columns, or a list of keys (tuples or scalars)."""
+        if not isinstance(keys, pd.DataFrame):
+            keys = list(keys)
+            keys = pd.DataFrame(keys) if keys and isinstance(keys[0], tuple) else pd.DataFrame({0: keys})
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+    def _locate(self, hashes):
+        """Positions of hashed keys (-1 = not on the board)."""
+        if not len(self._index):
+            return np.full(len(hashes), -1, dtype=np.int64)
+        return self._index.get_indexer(hashes)
+
+    def _positions(self, hashes, key_of):
+        """Positions of hashed keys, appending the new ones ('key_of(rows)' gives their keys)."""
+        positions = self._locate(hashes)
+        new = np.flatnonzero(positions < 0)
+        if len(new):
+            # Repeated new keys share one position, in order of first appearance
+            unique, first, inverse = np.unique(hashes[new], return_index=True, return_inverse=True)
+            order = np.argsort(first)
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            positions[new] = len(self._keys) + rank[inverse]
+            self._index = self._index.append(pd.Index(unique[order]))
+            self._keys.extend(key_of(new[first[order]]))
+            self._grow(len(self._keys))
+        return positions
+
+    # --- UPDATES ---
+
+    def update(self, keys, metrics=None, labels=None):
+        """
+        Upserts stations: 'metrics' / 'labels' map a column to one value per key.
+        Only rows whose value enters, leaves or moves inside a kept top set cost more than O(1).
+        """
+        keys = list(keys)
+        positions = self._positions(self.hash_keys(keys), lambda rows: [keys[i] for i in rows])
+        return self._apply(positions, metrics, labels)
+
+    def _apply(self, positions, metrics=None, labels=None):
+        for name, values in (labels or {}).items():
+            if name not in self._labels:
+                self._labels[name] = np.empty(self._rows, dtype=object)
+            self._labels[name][positions] = np.asarray(values, dtype=object)
+        for name, values in (metrics or {}).items():
+            values = np.asarray(values, dtype=float)
+            if name not in self._values:
+                # Untracked column: stored for ad-hoc (argpartition) queries only
+                self._values[name] = np.full(self._rows, np.nan)
+            self._values[name][positions] = values
+            if name in self._top:
+                self._update_top(name, positions, values)
+        self.version += 1
+        return self
+
+    def _update_top(self, metric, positions, values):
+        top = self._top[metric]
+        floor = self._floor[metric]
+        # Rows that can matter: already kept, or above the entry floor
+        kept = np.fromiter((p in top for p in positions.tolist()), bool, len(positions))
+        candidates = np.flatnonzero((values > floor) | kept)
+        if len(candidates) > self.capacity:
+            # Bulk change (first load, big drop): one argpartition on the next query is cheaper
+            self._complete[metric] = False
+            return
+        for i in candidates:
+            pos, value = int(positions[i]), values[i]
+            if pos in top:
+                if value >= floor:
+                    top[pos] = value
+                else:
+                    # Fell below the floor: someone outside may now be better
+                    del top[pos]
+                    self._complete[metric] = False
+            elif not np.isnan(value):
+                top[pos] = value
+                if len(top) > self.capacity:
+                    del top[min(top, key=top.get)]
+            if len(top) >= self.capacity:
+                floor = min(top.values())
+        self._floor[metric] = floor if len(top) >= self.capacity else -np.inf
+
+    def _refill(self, metric):
+        """Rebuilds a kept top set from the full column (one argpartition)."""
+        values = self._values[metric][:len(self)]
+        order = self.top_n(values, self.capacity)
+        self._top[metric] = {int(p): values[p] for p in order}
+        self._floor[metric] = values[order[-1]] if len(order) >= self.capacity else -np.inf
+        self._complete[metric] = True
+
+    def sync(self, df, key_columns=('Zona', 'Puesto'), label_columns=()):
+        """
+        Brings the board in line with a station frame: stations are matched by their hashed
+        key columns and compared column-wise (vectorized); only the rows whose tracked values
+        or labels changed (or that are new) are pushed through the top sets, and stations
+        missing from the frame drop out of the rankings. Returns the number of stations pushed.
+        """
+        cols = [c for c in key_columns if c in df.columns]
+        hashes = self.hash_keys(df[cols] if cols else pd.DataFrame({0: np.arange(len(df))}))
+        positions = self._locate(hashes)
+        known = positions >= 0
+        old_at = np.where(known, positions, 0)
+        changed = ~known
+        metric_cols = [m for m in self.metrics if m in df.columns]
+        label_cols = [c for c in label_columns if c in df.columns]
+        for m in metric_cols:
+            new = df[m].to_numpy(dtype=float)
+            old = np.where(known, self._values[m][old_at], np.nan)
+            changed |= ~((new == old) | (np.isnan(new) & np.isnan(old)))
+        for c in label_cols:
+            new = df[c].to_numpy(dtype=object)
+            stored = self._labels.get(c)
+            changed |= (new != stored[old_at]) if stored is not None else True
+
+        rows = np.flatnonzero(changed)
+        in_frame = np.zeros(len(self), dtype=bool)
+        in_frame[positions[known]] = True
+        gone = np.flatnonzero((self._frame_row[:len(self)] >= 0) & ~in_frame)
+        if len(rows):
+            if cols:
+                key_of = lambda new: self.frame_keys(df.iloc[rows[new]], cols)  # noqa: E731
+            else:
+                key_of = lambda new: rows[new].tolist()  # noqa: E731
+            pushed = self._positions(hashes[rows], key_of)
+            self._apply(pushed,
+                        metrics={m: df[m].to_numpy(dtype=float)[rows] for m in metric_cols},
+                        labels={c: df[c].to_numpy(dtype=object)[rows] for c in label_cols})
+        if len(gone):
+            self._apply(gone, metrics={m: np.full(len(gone), np.nan) for m in metric_cols})
+        self._frame_row[:len(self)] = -1
+        self._frame_row[self._locate(hashes)] = np.arange(len(df))
+        return len(rows) + len(gone)
+
+    @staticmethod
+    def frame_keys(df, key_columns=('Zona', 'Puesto')):
+        cols = [c for c in key_columns if c in df.columns]
+        if not cols:
+            return list(range(len(df)))
+        return list(zip(*[df[c].tolist() for c in cols])) if len(cols) > 1 else df[cols[0]].tolist()
+
+    # --- QUERIES ---
+
+    @staticmethod
+    def top_n(values, n, mask=None):
+        """Positions of the n largest finite values (where 'mask'), best first: argpartition + sort of n."""
+        values = np.asarray(values, dtype=float)
+        valid = np.isfinite(values) if mask is None else (np.isfinite(values) & np.asarray(mask, dtype=bool))
+        candidates = np.flatnonzero(valid)
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-values[candidates], n - 1)[:n]]
+        # Ties: earlier station first
+        return candidates[np.lexsort((candidates, -values[candidates]))]
+
+    def _matches(self, pos, where):
+        for column, allowed in where.items():
+            value = self._labels[column][pos] if column in self._labels else self._values[column][pos]
+            if isinstance(allowed, (set, frozenset, list, tuple)):
+                if value not in allowed:
+                    return False
+            elif value != allowed:
+                return False
+        return True
+
+    def top(self, metric, n=10, where=None):
+        """
+        Keys and values of the 'n' best stations by 'metric' whose columns match 'where'
+        ({column: value or collection of values}). Returns a DataFrame: key, metric and row
+        (position in the last synced frame, -1 if none).
+        """
+        where = where or {}
+        if metric in self._top and n <= self.capacity:
+            if not self._complete[metric]:
+                self._refill(metric)
+            top = self._top[metric]
+            ranked = sorted(top, key=lambda p: (-top[p], p))
+            picked = [p for p in ranked if self._matches(p, where)][:n]
+            # The kept set answers if it filled the request or already holds every ranked station
+            if len(picked) == n or len(top) < self.capacity:
+                return self._result(metric, picked)
+        return self._result(metric, self._scan(metric, n, where))
+
+    def _scan(self, metric, n, where):
+        """Ad-hoc path: filter mask over the full columns, then argpartition."""
+        size = len(self)
+        mask = np.ones(size, dtype=bool)
+        for column, allowed in where.items():
+            values = self._labels[column][:size] if column in self._labels else self._values[column][:size]
+            if isinstance(allowed, (set, frozenset, list, tuple)):
+                mask &= pd.Series(values).isin(list(allowed)).to_numpy()
+            else:
+                mask &= values == allowed
+        return self.top_n(self._values[metric][:size], n, mask).tolist()
+
+    def _result(self, metric, positions):
+        positions = list(positions)
+        return pd.DataFrame({'key': [self._keys[p] for p in positions],
+                             metric: self._values[metric][positions] if positions else [],
+                             'row': self._frame_row[positions] if positions else []})
@@ -0,0 +1,209 @@
+import pandas as pd
+import numpy as np
+from src.services.leaderboard import Leaderboard
+
+
+class LiveResults:
+    """
+    Module 2c: Election-Night Incremental Aggregator.
+    Keeps the station x target vote matrix of process_data() as growable arrays and folds
+    partial E-26 / preconteo drops into it. Each batch costs O(batch rows + new stations):
+    mesa rows are identified by a vectorized hash of their mesa identity, a row seen before
+    is a revision (only the change of its VOTOS is applied, unchanged replays are skipped),
+    only new stations are geocoded, and the matrix is updated in place with scatter-adds.
+    'version' increments on every batch that changes the results (UI caches key on it).
+    'leaderboard' ranks the stations by Votos_Total and by each target column, updated from
+    the touched stations only.
+    """
+    # Row identity used to dedupe drops. MESA is required; the optional columns present in the
+    # first batch become the identity every later batch must carry.
+    DEDUPE_KEYS = ['CORPORACION', 'MUNICIPIO', 'ZONA', 'COD_PUESTO', 'PUESTO', 'MESA', 'CANDIDATO']
+    REQUIRED_KEYS = ['PUESTO', 'MESA']
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, processor, target_candidates):
+        self.processor = processor
+        self.targets = list(target_candidates)
+        self.target_columns = [f"Votos_{t.replace(' ', '_')}" for t in self.targets]
+        self.version = 0
+
+        # Seen mesa rows: sorted identity hashes and the VOTOS last counted for each
+        self._key_columns = None
+        self._seen_keys = np.zeros(0, dtype=np.uint64)
+        self._seen_votes = np.zeros(0, dtype=np.int64)
+        self._station_pos = {}
+        self._zona = []
+        self._puesto = []
+        self._name_match = {}
+        self._max_primary = 0
+
+        # Column 0 = Votos_Total, then one column per target
+        self._votes = np.zeros((self.INITIAL_CAPACITY, 1 + len(self.targets)), dtype=np.int64)
+        self._lat = np.zeros(self.INITIAL_CAPACITY)
+        self._lon = np.zeros(self.INITIAL_CAPACITY)
+        self._strength = np.zeros(self.INITIAL_CAPACITY)
+        self.leaderboard = Leaderboard(['Votos_Total'] + self.target_columns)
+
+    @property
+    def n_stations(self):
+        return len(self._zona)
+
+    def _grow(self, needed):
+        """Doubles the array capacity until 'needed' stations fit."""
+        capacity = len(self._lat)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        votes = np.zeros((capacity, self._votes.shape[1]), dtype=np.int64)
+        votes[:len(self._votes)] = self._votes
+        self._votes = votes
+        for name in ('_lat', '_lon', '_strength'):
+            old = getattr(self, name)
+            new = np.zeros(capacity)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _target_match(self, names):
+        """(len(names) x targets) match rows, resolving each candidate name only the first time it is seen."""
+        unseen = [n for n in names if n not in self._name_match]
+        if unseen:
+            rows = self.processor._match_candidates(unseen, self.targets)
+            self._name_match.update(zip(unseen, rows))
+        if not len(names):
+            return np.zeros((0, len(self.targets)), dtype=np.int64)
+        return np.array([self._name_match[n] for n in names], dtype=np.int64)
+
+    def _revisions(self, batch):
+        """
+        Matches the batch rows against every row already ingested (a later row of the same mesa
+        in the batch wins). Records their VOTOS and returns (rows that change the aggregates,
+        their VOTOS change: the full count for new rows, new - old for revised ones).
+        """
+        hashes = pd.util.hash_pandas_object(batch[self._key_columns], index=False).to_numpy()
+        latest = ~pd.Series(hashes).duplicated(keep='last').to_numpy()
+        batch, hashes = batch[latest], hashes[latest]
+        votes = batch['VOTOS'].to_numpy(dtype=np.int64)
+
+        pos = np.searchsorted(self._seen_keys, hashes)
+        seen = np.zeros(len(hashes), dtype=bool)
+        old = np.zeros(len(hashes), dtype=np.int64)
+        if len(self._seen_keys):
+            clipped = np.minimum(pos, len(self._seen_keys) - 1)
+            seen = self._seen_keys[clipped] == hashes
+            old = np.where(seen, self._seen_votes[clipped], 0)
+        delta = votes - old
+
+        self._seen_votes[pos[seen]] = votes[seen]
+        order = np.argsort(hashes[~seen])
+        new_keys = hashes[~seen][order]
+        at = np.searchsorted(self._seen_keys, new_keys)
+        self._seen_keys = np.insert(self._seen_keys, at, new_keys)
+        self._seen_votes = np.insert(self._seen_votes, at, votes[~seen][order])
+
+        changed = ~seen | (delta != 0)
+        return batch[changed], delta[changed]
+
+    def ingest(self, batch):
+        """
+        Folds a batch of mesa rows (raw E-26 schema) into the aggregates.
+        Rows of a mesa seen in an earlier drop are revisions: the aggregates move by the change
+        in their VOTOS. Raises ValueError if the batch lacks mesa identity (REQUIRED_KEYS) or
+        does not carry the identity columns of the first batch.
+        Returns the number of new or revised rows.
+        """
+        if batch is None or batch.empty:
+            return 0
+
+        batch = batch.copy(deep=False)
+        batch.columns = [str(c).upper() for c in batch.columns]
+        if 'VOTOS' not in batch.columns:
+            return 0
+        missing = [c for c in self.REQUIRED_KEYS if c not in batch.columns]
+        if missing:
+            raise ValueError(f"E-26 batch without mesa identity (missing {missing}): rows cannot be deduplicated")
+        batch = self.processor.enforce_schema(batch)
+        if 'ZONA' not in batch.columns:
+            batch['ZONA'] = '-1'
+        if 'CANDIDATO' not in batch.columns:
+            batch['CANDIDATO'] = ''
+        if self._key_columns is None:
+            self._key_columns = [c for c in self.DEDUPE_KEYS if c in batch.columns]
+        elif not set(self._key_columns).issubset(batch.columns):
+            raise ValueError(f"E-26 batch without the identity columns of earlier drops: {self._key_columns}")
+
+        # 1. New and revised rows only (VOTOS becomes the change to apply)
+        rows, delta = self._revisions(batch)
+        if rows.empty:
+            return 0
+        batch = rows.assign(VOTOS=delta)
+
+        # 2. Aggregate the batch itself (station x candidate)
+        grouped = batch.groupby(['ZONA', 'PUESTO', 'CANDIDATO'], observed=True)['VOTOS'].sum()
+        zonas = grouped.index.get_level_values('ZONA').to_numpy()
+        puestos = np.asarray(grouped.index.get_level_values('PUESTO'), dtype=object)
+        names = list(np.asarray(grouped.index.get_level_values('CANDIDATO'), dtype=object))
+        votes = grouped.to_numpy().astype(np.int64)
+
+        # 3. Station positions (new stations are appended)
+        first_new = self.n_stations
+        positions = np.empty(len(votes), dtype=np.int64)
+        for i, station in enumerate(zip(zonas.tolist(), puestos.tolist())):
+            pos = self._station_pos.get(station)
+            if pos is None:
+                pos = len(self._zona)
+                self._station_pos[station] = pos
+                self._zona.append(station[0])
+                self._puesto.append(station[1])
+            positions[i] = pos
+        self._grow(self.n_stations)
+
+        # 4. Scatter-add totals and target votes
+        np.add.at(self._votes[:, 0], positions, votes)
+        np.add.at(self._votes[:, 1:], positions, votes[:, None] * self._target_match(names))
+
+        # 5. Geocode only the new stations
+        if self.n_stations > first_new:
+            coords = self.processor.geocode_many(self._puesto[first_new:], self._zona[first_new:])
+            self._lat[first_new:self.n_stations] = coords['lat'].to_numpy()
+            self._lon[first_new:self.n_stations] = coords['lon'].to_numpy()
+
+        # 6. historical_strength: while votes only grow, the max is updated from the touched rows.
+        # A new max (or a downward revision) rescales the column in one vectorized pass;
+        # otherwise only touched rows change.
+        touched = np.unique(positions)
+        if self.targets:
+            primary = self._votes[:, 1]
+            batch_max = int(primary[touched].max())
+            n = self.n_stations
+            if batch_max > self._max_primary or (delta < 0).any():
+                self._max_primary = int(primary[:n].max())
+                self._strength[:n] = primary[:n] / self._max_primary * 100 if self._max_primary > 0 else 0.0
+            elif self._max_primary > 0:
+                self._strength[touched] = primary[touched] / self._max_primary * 100
+
+        # 7. Rankings: push the touched stations' new counts
+        self.leaderboard.update(
+            [(self._zona[p], self._puesto[p]) for p in touched],
+            metrics={col: self._votes[touched, j] for j, col in enumerate(['Votos_Total'] + self.target_columns)},
+        )
+
+        self.version += 1
+        return len(rows)
+
+    def frame(self):
+        """Current results in the process_data() layout."""
+        n = self.n_stations
+        out = pd.DataFrame({
+            "Zona": self._zona,
+            "Puesto": self._puesto,
+            "Votos_Total": self._votes[:n, 0],
+        })
+        for j, col in enumerate(self.target_columns):
+            out[col] = self._votes[:n, 1 + j]
+        out["lat"] = self._lat[:n]
+        out["lon"] = self._lon[:n]
+        out["coords"] = list(zip(out["lat"], out["lon"]))
+        out["historical_strength"] = self._strength[:n]
+        out["Votos"] = out["Votos_Total"]
+        return out
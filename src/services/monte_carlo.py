@@ -0,0 +1,175 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - Python < 3.8
+    shared_memory = None
+
+
+class DigitalTwin:
+    """
+    Module 4c: Digital Twin Monte Carlo Engine.
+    Simulates N elections over the station x candidate vote matrix. Each run draws
+    - turnout: a common (election-wide) shock plus per-station noise (log-normal),
+    - vote shares: a common swing per candidate plus per-station noise (on the log scale,
+      renormalized so shares still sum to one, the 'others' bloc included).
+    Runs are processed in memory-bounded chunks; every chunk has its own seed spawned from
+    the master seed, so results are reproducible and identical with or without the process pool.
+    """
+    TURNOUT_SIGMA = 0.08
+    LOCAL_TURNOUT_SIGMA = 0.05
+    SWING_SIGMA = 0.05
+    LOCAL_SWING_SIGMA = 0.15
+    CHUNK_BYTES = 64 * 1024 * 1024
+    CI = (5, 95)
+
+    def __init__(self, station_votes, totals, candidates, seed=None):
+        """
+        station_votes: (stations x candidates) baseline votes.
+        totals: (stations,) total votes cast (>= the candidates' sum; the rest is 'others').
+        """
+        votes = np.asarray(station_votes, dtype=np.float64).reshape(len(totals), -1)
+        totals = np.maximum(np.asarray(totals, dtype=np.float64), votes.sum(axis=1))
+        self.candidates = list(candidates)
+        self.seed = seed
+        self.totals = totals.astype(np.float32)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(totals[:, None] > 0, votes / totals[:, None], 0.0)
+        others = np.clip(1 - shares.sum(axis=1), 0, 1)
+        # Last column = 'others' bloc
+        self.shares = np.column_stack([shares, others]).astype(np.float32)
+
+    def chunk_size(self):
+        """Runs per chunk so the per-chunk working set stays under CHUNK_BYTES."""
+        per_run = self.shares.size * 4 * 4  # float32, ~4 live (runs x stations x parties) arrays
+        return max(1, int(self.CHUNK_BYTES // max(per_run, 1)))
+
+    def run(self, n_sims=1000, max_workers=None):
+        """
+        Simulates 'n_sims' elections. 'max_workers' > 1 spreads the chunks over a process
+        pool that reads the inputs from shared memory.
+        Returns a dict with per-station win probabilities, per-run totals / stations won,
+        and their means and confidence intervals per candidate.
+        """
+        n_stations, n_cands = len(self.totals), len(self.candidates)
+        size = self.chunk_size()
+        chunks = [min(size, n_sims - start) for start in range(0, n_sims, size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunks))
+
+        if max_workers and max_workers > 1 and len(chunks) > 1 and shared_memory is not None:
+            results = self._run_pool(chunks, seeds, max_workers)
+        else:
+            results = [_simulate(self.totals, self.shares, n, s, self._params()) for n, s in zip(chunks, seeds)]
+
+        station_wins = np.zeros((n_stations, n_cands))
+        totals, won = [], []
+        for wins, run_totals, run_won in results:
+            station_wins += wins
+            totals.append(run_totals)
+            won.append(run_won)
+        totals = np.concatenate(totals) if totals else np.zeros((0, n_cands))
+        won = np.concatenate(won) if won else np.zeros((0, n_cands))
+
+        leader = totals.argmax(axis=1) if len(totals) else np.zeros(0, dtype=np.int64)
+        low, high = self.CI
+        return {
+            'n_sims': n_sims,
+            'candidates': self.candidates,
+            'station_win_probability': station_wins / max(n_sims, 1),
+            'win_probability': np.bincount(leader, minlength=n_cands) / max(n_sims, 1),
+            'run_totals': totals,
+            'run_stations_won': won,
+            'votes_mean': totals.mean(axis=0) if len(totals) else np.zeros(n_cands),
+            'votes_ci': np.percentile(totals, [low, high], axis=0).T if len(totals) else np.zeros((n_cands, 2)),
+            'stations_won_mean': won.mean(axis=0) if len(won) else np.zeros(n_cands),
+            'stations_won_ci': np.percentile(won, [low, high], axis=0).T if len(won) else np.zeros((n_cands, 2)),
+        }
+
+    def _params(self):
+        return (self.TURNOUT_SIGMA, self.LOCAL_TURNOUT_SIGMA, self.SWING_SIGMA, self.LOCAL_SWING_SIGMA)
+
+    def _run_pool(self, chunks, seeds, max_workers):
+        """Chunks on a process pool; the input arrays are published once through shared memory."""
+        blocks = []
+        try:
+            specs = []
+            for array in (self.totals, self.shares):
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                blocks.append(block)
+                specs.append((block.name, array.shape, array.dtype.str))
+
+            workers = min(max_workers, len(chunks), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_simulate_shared, specs, n, s, self._params()) for n, s in zip(chunks, seeds)]
+                return [f.result() for f in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+
+def _simulate(totals, shares, n_runs, seed_seq, params):
+    """
+    One chunk of runs. Returns (station wins per candidate, per-run candidate totals,
+    per-run stations won per candidate).
+    """
+    turnout_sigma, local_turnout_sigma, swing_sigma, local_swing_sigma = params
+    rng = np.random.default_rng(seed_seq)
+    n_stations, n_parties = shares.shape
+    n_cands = n_parties - 1
+
+    # Turnout: (runs x stations)
+    turnout = rng.standard_normal((n_runs, n_stations), dtype=np.float32)
+    turnout *= local_turnout_sigma
+    turnout += turnout_sigma * rng.standard_normal((n_runs, 1), dtype=np.float32)
+    np.exp(turnout, out=turnout)
+    turnout *= totals
+
+    # Shares: party-major (parties x runs x stations) so every per-party step works on contiguous planes.
+    # Log-scale noise, then renormalized across parties.
+    noise = rng.standard_normal((n_parties, n_runs, n_stations), dtype=np.float32)
+    noise *= local_swing_sigma
+    noise += swing_sigma * rng.standard_normal((n_parties, n_runs, 1), dtype=np.float32)
+    np.exp(noise, out=noise)
+    noise *= shares.T[:, None, :]
+    norm = noise.sum(axis=0)
+    np.divide(noise, norm, out=noise, where=norm > 0)
+    noise *= turnout
+    votes = noise[:n_cands]
+
+    # A station is won by the top candidate (against the 'others' bloc when there is only one)
+    rivals = votes if n_cands > 1 else noise
+    best = rivals[0].copy()
+    winner = np.zeros((n_runs, n_stations), dtype=np.int8)
+    for c in range(1, len(rivals)):
+        ahead = rivals[c] > best
+        winner[ahead] = c
+        np.maximum(best, rivals[c], out=best)
+    winner[best <= 0] = -1
+
+    station_wins = np.empty((n_stations, n_cands))
+    stations_won = np.empty((n_runs, n_cands))
+    for c in range(n_cands):
+        won = winner == c
+        station_wins[:, c] = won.sum(axis=0)
+        stations_won[:, c] = won.sum(axis=1)
+
+    return station_wins, votes.sum(axis=2, dtype=np.float64).T, stations_won
+
+
+def _simulate_shared(specs, n_runs, seed_seq, params):
+    """Process-pool entry point: attaches to the shared inputs instead of unpickling copies."""
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    try:
+        arrays = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+                  for block, (_, shape, dtype) in zip(blocks, specs)]
+        result = _simulate(arrays[0], arrays[1], n_runs, seed_seq, params)
+        del arrays  # views must be released before the blocks close
+        return result
+    finally:
+        for block in blocks:
+            block.close()
@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+
+
+class ResultsCube:
+    """
+    Module 2b: Hierarchical E-26 Results Cube.
+    Built once per dataset: keeps the mesa-level rows and precomputes rollups at every level
+    (DEPARTAMENTO -> MUNICIPIO -> ZONA -> PUESTO -> MESA) for every candidate, every party
+    and the totals. Queries are answered from the stored rollup, never from the raw rows.
+    """
+    LEVELS = ['DEPARTAMENTO', 'MUNICIPIO', 'ZONA', 'PUESTO', 'MESA']
+    MEASURES = ['CANDIDATO', 'PARTIDO']
+    # Mesa numbers repeat across puesto codes, so the mesa level is keyed by both
+    MESA_KEYS = ['COD_PUESTO', 'MESA']
+
+    # Preload (headered) files use the Registraduría names for the upper levels
+    ALIASES = {'NOMBRE_DEP': 'DEPARTAMENTO', 'NOMBRE_MUN': 'MUNICIPIO'}
+    CODE_LEVELS = ['MESA']
+    UNKNOWN = 'N/A'
+
+    def __init__(self, raw_df):
+        self.base = self._build_base(raw_df)
+        self.rollups = {}
+        self._build_rollups()
+
+    def level_keys(self, level):
+        """Grouping keys of a level (its ancestors included)."""
+        depth = self.LEVELS.index(level)
+        if level == 'MESA':
+            return self.LEVELS[:depth] + self.MESA_KEYS
+        return self.LEVELS[:depth + 1]
+
+    def _build_base(self, raw_df):
+        """Mesa x candidate x party vote table (duplicates summed)."""
+        keys = self.level_keys('MESA') + self.MEASURES
+        if raw_df.empty or 'VOTOS' not in raw_df.columns:
+            index = pd.MultiIndex.from_arrays([[] for _ in keys], names=keys)
+            return pd.Series([], index=index, dtype='int64', name='VOTOS')
+
+        frame = raw_df.rename(columns={k: v for k, v in self.ALIASES.items() if v not in raw_df.columns})
+        missing = {}
+        for col in keys:
+            if col not in frame.columns:
+                missing[col] = -1 if col in self.CODE_LEVELS else self.UNKNOWN
+        if missing:
+            frame = frame.assign(**missing)
+
+        votes = frame['VOTOS'].astype('int64')
+        return votes.groupby([frame[c] for c in keys], observed=True).sum()
+
+    def _build_rollups(self):
+        """
+        Rolls up finest-to-coarsest: each level is aggregated from the level below it,
+        so the raw rows are only touched once (in _build_base).
+        """
+        for measure in self.MEASURES + [None]:
+            finer = self.base
+            for level in reversed(self.LEVELS):
+                group = self.level_keys(level) + ([measure] if measure else [])
+                rolled = finer.groupby(level=group, observed=True).sum()
+                self.rollups[(level, measure)] = rolled
+                finer = rolled
+
+    # --- QUERY API ---
+
+    def members(self, measure='CANDIDATO'):
+        """Distinct candidates (or parties) present in the cube."""
+        table = self.rollups.get((self.LEVELS[0], measure))
+        if table is None or table.empty:
+            return []
+        return list(table.index.get_level_values(measure).unique())
+
+    def query(self, level='PUESTO', candidate=None, party=None, filters=None):
+        """
+        Votes at 'level' for a candidate (or party, or the totals when both are None).
+        'candidate' / 'party' and the values in 'filters' may be a single value or a list.
+        'filters' = {'MUNICIPIO': 'MEDELLIN', 'ZONA': '01'} (only keys of 'level' or its ancestors).
+        Returns a DataFrame with the level keys (and the member, if any) plus VOTOS.
+        """
+        if level not in self.LEVELS:
+            raise ValueError(f"Unknown level '{level}'. Expected one of {self.LEVELS}")
+        if candidate is not None and party is not None:
+            raise ValueError("Query either a candidate or a party, not both")
+
+        measure, member = (None, None)
+        if candidate is not None:
+            measure, member = 'CANDIDATO', candidate
+        elif party is not None:
+            measure, member = 'PARTIDO', party
+
+        table = self.rollups[(level, measure)]
+        allowed = self.level_keys(level)
+        mask = np.ones(len(table), dtype=bool)
+
+        for key, value in (filters or {}).items():
+            if key not in allowed:
+                raise ValueError(f"Filter '{key}' is below level '{level}'")
+            mask &= self._match(table.index.get_level_values(key), value)
+        if measure:
+            mask &= self._match(table.index.get_level_values(measure), member)
+
+        result = table[mask].reset_index()
+        for col in result.columns:
+            if isinstance(result[col].dtype, pd.CategoricalDtype):
+                result[col] = result[col].cat.remove_unused_categories()
+        return result
+
+    def total(self, level='DEPARTAMENTO', candidate=None, party=None, filters=None):
+        """Scalar sum of a query."""
+        return int(self.query(level, candidate, party, filters)['VOTOS'].sum())
+
+    @staticmethod
+    def _match(values, wanted):
+        if isinstance(wanted, (list, tuple, set, np.ndarray, pd.Index)):
+            return np.asarray(values.isin(list(wanted)))
+        return np.asarray(values == wanted)
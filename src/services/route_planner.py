@@ -0,0 +1,221 @@
+import time
+import numpy as np
+from src.services.spatial_index import haversine_m
+
+
+class RoutePlanner:
+    """
+    Module 4b: Logistics Route Planner.
+    - Station-to-station haversine distance matrices, cached per set of coordinates.
+    - Single team (TSP): nearest-neighbour construction + 2-opt and Or-opt improvement.
+    - Several teams (VRP): one improved giant tour split optimally into at most 'n_teams'
+      routes that respect the stop capacity and the time budget of each team (dropping the
+      fewest lowest-priority stops no split can hold), then each route is improved on its own.
+    Construction is bounded (one greedy tour, at most log2(n) + 2 splits); improvement stops
+    at 'time_budget_s' and the best routes found so far are returned.
+    """
+    SPEED_KMH = 25.0
+    SERVICE_MIN = 20.0
+    MAX_CACHED = 8
+
+    def __init__(self, speed_kmh=SPEED_KMH, service_min=SERVICE_MIN):
+        self.speed_kmh = speed_kmh
+        self.service_min = service_min
+        self._matrices = {}
+
+    # --- DISTANCES ---
+
+    def distance_matrix(self, lat, lon):
+        """Symmetric haversine matrix in meters (cached for the same coordinates)."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        key = hash((lat.tobytes(), lon.tobytes()))
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            matrix = haversine_m(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+            if len(self._matrices) >= self.MAX_CACHED:
+                self._matrices.pop(next(iter(self._matrices)))
+            self._matrices[key] = matrix
+        return matrix
+
+    def travel_minutes(self, meters):
+        return meters / 1000.0 / self.speed_kmh * 60.0
+
+    @staticmethod
+    def tour_length(dist, tour):
+        tour = np.asarray(tour)
+        return float(dist[tour[:-1], tour[1:]].sum()) if len(tour) > 1 else 0.0
+
+    # --- SINGLE TEAM ---
+
+    def nearest_neighbor(self, dist, nodes, start):
+        """Closed tour start -> nodes (greedy nearest) -> start."""
+        remaining = np.asarray([n for n in nodes if n != start], dtype=np.int64)
+        tour = [start]
+        current = start
+        while len(remaining):
+            k = int(np.argmin(dist[current, remaining]))
+            current = int(remaining[k])
+            tour.append(current)
+            remaining = np.delete(remaining, k)
+        tour.append(start)
+        return tour
+
+    def improve(self, dist, tour, deadline):
+        """2-opt and Or-opt (segments of 1-3 stops) until no move improves or the deadline passes."""
+        tour = np.asarray(tour, dtype=np.int64)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self._two_opt_pass(dist, tour, deadline)
+            improved = self._or_opt_pass(dist, tour, deadline) or improved
+        return tour.tolist()
+
+    @staticmethod
+    def _two_opt_pass(dist, tour, deadline):
+        """One sweep of best-improvement 2-opt per first edge (vectorized over the second edge)."""
+        n = len(tour)
+        improved = False
+        for i in range(n - 3):
+            if time.perf_counter() >= deadline:
+                break
+            a, b = tour[i], tour[i + 1]
+            c, d = tour[i + 2:n - 1], tour[i + 3:n]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 2 + k
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                improved = True
+        return improved
+
+    @staticmethod
+    def _or_opt_pass(dist, tour, deadline):
+        """Moves segments of 1-3 stops (either orientation) to their best position elsewhere."""
+        improved = False
+        for length in (1, 2, 3):
+            i = 1
+            while i + length < len(tour) and time.perf_counter() < deadline:
+                seg = tour[i:i + length].copy()
+                prev, nxt = tour[i - 1], tour[i + length]
+                removal = dist[prev, seg[0]] + dist[seg[-1], nxt] - dist[prev, nxt]
+                rest = np.concatenate([tour[:i], tour[i + length:]])
+                u, v = rest[:-1], rest[1:]
+                base = dist[u, v]
+                fwd = dist[u, seg[0]] + dist[seg[-1], v] - base
+                rev = dist[u, seg[-1]] + dist[seg[0], v] - base
+                best = np.minimum(fwd, rev)
+                k = int(np.argmin(best))
+                if best[k] < removal - 1e-9:
+                    seg = seg if fwd[k] <= rev[k] else seg[::-1]
+                    tour[:] = np.concatenate([rest[:k + 1], seg, rest[k + 1:]])
+                    improved = True
+                else:
+                    i += 1
+        return improved
+
+    def solve_tsp(self, dist, nodes, start=0, time_budget_s=1.0):
+        """Best closed tour over 'nodes' from/to 'start' found within the time budget."""
+        deadline = time.perf_counter() + time_budget_s
+        tour = self.nearest_neighbor(dist, nodes, start)
+        return self.improve(dist, tour, deadline)
+
+    # --- SEVERAL TEAMS ---
+
+    def _route_minutes(self, dist, route):
+        return self.travel_minutes(self.tour_length(dist, route)) + self.service_min * (len(route) - 2)
+
+    def split(self, dist, giant, depot, n_teams, capacity=None, max_minutes=None):
+        """
+        Optimal split of a giant tour (depot excluded) into at most 'n_teams' consecutive
+        routes under the capacity / time limits (bounded-fleet Bellman DP).
+        Returns the list of routes, or None when no split fits.
+        """
+        n = len(giant)
+        if n == 0:
+            return []
+        stops = np.asarray(giant, dtype=np.int64)
+        capacity = capacity or n
+        # Length of the path through stops[i..j] = cum[j] - cum[i]
+        cum = np.concatenate([[0.0], np.cumsum(dist[stops[:-1], stops[1:]])])
+        # cost[k, j]: best total length serving the first j stops with k routes
+        cost = np.full((n_teams + 1, n + 1), np.inf)
+        pred = np.zeros((n_teams + 1, n + 1), dtype=np.int64)
+        cost[0, 0] = 0.0
+        for i in range(n):
+            j = np.arange(i, min(n, i + capacity))
+            length = dist[depot, stops[i]] + (cum[j] - cum[i]) + dist[stops[j], depot]
+            if max_minutes is not None:
+                minutes = self.travel_minutes(length) + self.service_min * (j - i + 1)
+                fits = minutes <= max_minutes
+                j, length = j[fits], length[fits]
+            if not len(j):
+                continue
+            for k in range(1, n_teams + 1):
+                candidate = cost[k - 1, i] + length
+                better = candidate < cost[k, j + 1]
+                cost[k, j[better] + 1] = candidate[better]
+                pred[k, j[better] + 1] = i
+
+        k = int(np.argmin(cost[:, n]))
+        if not np.isfinite(cost[k, n]):
+            return None
+        routes, j = [], n
+        while k > 0:
+            i = int(pred[k, j])
+            routes.append([depot] + stops[i:j].tolist() + [depot])
+            j, k = i, k - 1
+        return routes[::-1]
+
+    def _drop_until_split(self, dist, giant, rank, depot, n_teams, capacity, max_minutes):
+        """
+        Fewest lowest-priority stops to drop so the giant tour splits. Dropping a stop never
+        lengthens a route, so feasibility is monotone in the number dropped: binary search on it
+        (at most log2(n) + 1 splits, whatever the time budget).
+        Returns (routes, dropped_nodes).
+        """
+        by_rank = sorted(giant, key=lambda node: rank[node])
+        infeasible, feasible, routes = 0, len(by_rank), []
+        while feasible - infeasible > 1:
+            n_drop = (infeasible + feasible) // 2
+            drop = set(by_rank[:n_drop])
+            found = self.split(dist, [node for node in giant if node not in drop], depot, n_teams,
+                               capacity, max_minutes)
+            if found is None:
+                infeasible = n_drop
+            else:
+                feasible, routes = n_drop, found
+        return routes, by_rank[:feasible]
+
+    def solve_vrp(self, dist, nodes, priority, depot=0, n_teams=1, capacity=None,
+                  max_minutes=None, time_budget_s=1.0):
+        """
+        Routes for up to 'n_teams' teams. 'priority' (aligned with 'nodes') decides which stops
+        are dropped first when the limits can't cover them all.
+        Returns (routes, dropped_nodes).
+        """
+        deadline = time.perf_counter() + time_budget_s
+        nodes = list(nodes)
+        rank = {node: p for node, p in zip(nodes, priority)}
+        giant = self.improve(dist, self.nearest_neighbor(dist, nodes, depot), deadline)[1:-1]
+
+        # Stops no split can hold (service time alone) are dropped up front, lowest priority first
+        per_team = capacity or len(giant)
+        if max_minutes is not None and self.service_min > 0:
+            per_team = min(per_team, int(max_minutes // self.service_min))
+        by_rank = sorted(giant, key=lambda node: rank[node])
+        dropped = by_rank[:max(len(giant) - per_team * n_teams, 0)]
+        dropped_set = set(dropped)
+        giant = [node for node in giant if node not in dropped_set]
+
+        routes = self.split(dist, giant, depot, n_teams, capacity, max_minutes)
+        if routes is None:
+            routes, worst = self._drop_until_split(dist, giant, rank, depot, n_teams, capacity, max_minutes)
+            dropped += worst
+
+        # Each route keeps improving on its own (a shorter route never breaks its limits)
+        routes = routes or []
+        share = max(deadline - time.perf_counter(), 0) / max(len(routes), 1)
+        improved = []
+        for route in routes:
+            improved.append(self.improve(dist, route, time.perf_counter() + share))
+        return improved, dropped
@@ -0,0 +1,254 @@
+import pandas as pd
+import numpy as np
+from src.services.compute_graph import fingerprint
+
+
+class SeatAllocator:
+    """
+    Module 4h: Concejo Seat Allocation (umbral + cifra repartidora).
+    Lists below the threshold (THRESHOLD x cociente electoral, the valid votes incl. blank
+    over the seats) are out; the cifra repartidora is the seats-th largest of the eligible
+    lists' votes divided by 1..seats (D'Hondt), each list takes one seat per quotient above
+    it, and inside a list the seats go to the most voted candidates (voto preferente).
+    Every step runs on (scenarios x lists) arrays, so thousands of Monte Carlo scenarios
+    are allocated at once.
+
+    Ballot entries come from the raw mesa rows: each CANDIDATO under its PARTIDO; rows whose
+    name is the list itself (or 'SOLO POR LA LISTA') are list-only votes and blank votes count
+    toward the threshold only. Without a PARTIDO column every candidate is its own list.
+    Only the rows of one race (CORPORACION x municipio) are allocated: loaded files can mix
+    the Concejo with the Asamblea and several municipios, so frames without those columns,
+    or with fewer than MIN_LISTS lists in the race, raise ValueError.
+    """
+    SEATS = 21  # Concejo de Medellín
+    CORPORATION = 'CONCEJO'
+    MUNICIPIO = 'MEDELLIN'
+    MUNICIPIO_COLUMNS = ('MUNICIPIO', 'NOMBRE_MUN')
+    MIN_LISTS = 2
+    THRESHOLD = 0.5
+    BLANK_MARKERS = ('EN BLANCO',)
+    LIST_ONLY_MARKERS = ('SOLO POR LA LISTA', 'SOLO LISTA')
+    EXCLUDED_MARKERS = ('NULO', 'NO MARCADO')
+    # Scenario noise (log scale): election-wide turnout, per-list swing, per-candidate swing
+    TURNOUT_SIGMA = 0.08
+    LIST_SIGMA = 0.08
+    CANDIDATE_SIGMA = 0.12
+
+    def __init__(self, raw_df, seats=SEATS, threshold=THRESHOLD, corporation=CORPORATION, municipio=MUNICIPIO):
+        self.seats = int(seats)
+        self.threshold = threshold
+        self.key = self.content_key(raw_df)
+        raw_df = self.race(raw_df, corporation, municipio)
+
+        names = raw_df['CANDIDATO'].astype(str).str.strip().str.upper()
+        votes = pd.to_numeric(raw_df['VOTOS'], errors='coerce').fillna(0).clip(lower=0)
+        has_party = 'PARTIDO' in raw_df.columns
+        parties = raw_df['PARTIDO'].astype(str).str.strip().str.upper() if has_party else names
+
+        totals = pd.DataFrame({'list': parties.to_numpy(), 'name': names.to_numpy(), 'votes': votes.to_numpy()}) \
+            .groupby(['list', 'name'], sort=False)['votes'].sum().reset_index()
+        blank = totals['name'].str.contains('|'.join(self.BLANK_MARKERS), regex=True)
+        excluded = totals['name'].str.contains('|'.join(self.EXCLUDED_MARKERS), regex=True)
+        list_only = totals['name'].str.contains('|'.join(self.LIST_ONLY_MARKERS), regex=True)
+        if has_party:
+            # Whole-name match only: a candidate named inside the list name is still a candidate
+            list_only |= (totals['name'] == totals['list']).to_numpy()
+        self.blank_votes = float(totals.loc[blank, 'votes'].sum())
+
+        entries = totals[~blank & ~excluded].reset_index(drop=True)
+        self.lists = pd.Index(pd.unique(entries['list']))
+        entry_list = self.lists.get_indexer(entries['list'])
+        is_candidate = ~list_only[~blank & ~excluded].to_numpy()
+        self.candidates = pd.DataFrame({
+            'Candidato': entries['name'].to_numpy()[is_candidate],
+            'Lista': entries['list'].to_numpy()[is_candidate],
+        })
+        self.candidate_list = entry_list[is_candidate]
+        self.candidate_votes = entries['votes'].to_numpy(dtype=float)[is_candidate]
+        # List votes = list-only votes + every preferential vote of its candidates
+        self.list_votes = np.bincount(entry_list, weights=entries['votes'].to_numpy(dtype=float),
+                                      minlength=len(self.lists))
+        self.list_only_votes = self.list_votes - np.bincount(self.candidate_list, weights=self.candidate_votes,
+                                                             minlength=len(self.lists))
+        if len(self.lists) < self.MIN_LISTS:
+            raise ValueError(f"{corporation} {municipio}: {len(self.lists)} list(s) in the data, "
+                             f"the seat split needs the full race")
+
+    @classmethod
+    def race(cls, raw_df, corporation=CORPORATION, municipio=MUNICIPIO):
+        """Rows of one corporation in one municipio; ValueError if they can't be told apart or are absent."""
+        municipio_col = next((c for c in cls.MUNICIPIO_COLUMNS if c in raw_df.columns), None)
+        if 'CORPORACION' not in raw_df.columns or municipio_col is None:
+            raise ValueError("Seat allocation needs CORPORACION and MUNICIPIO columns "
+                             "(the loaded results may mix corporations / circunscripciones)")
+
+        def normalized(col):
+            return raw_df[col].astype(str).str.strip().str.upper().to_numpy()
+
+        rows = raw_df[(normalized('CORPORACION') == corporation.upper())
+                      & (normalized(municipio_col) == municipio.upper())]
+        if rows.empty:
+            raise ValueError(f"No {corporation} rows for {municipio}")
+        return rows
+
+    @classmethod
+    def content_key(cls, raw_df):
+        columns = ['CORPORACION', *cls.MUNICIPIO_COLUMNS, 'PARTIDO', 'CANDIDATO', 'VOTOS']
+        return fingerprint(raw_df[[c for c in columns if c in raw_df.columns]])
+
+    # --- ALLOCATION (vectorized over scenarios) ---
+
+    def _quotients(self, list_votes, blank):
+        """Eligibility, D'Hondt quotients (ineligible = -1) and threshold, per scenario."""
+        valid = list_votes.sum(axis=1) + blank
+        umbral = self.threshold * valid / self.seats
+        eligible = (list_votes >= umbral[:, None]) & (list_votes > 0)
+        divisors = np.arange(1, self.seats + 1, dtype=float)
+        quotients = np.where(eligible[:, :, None], list_votes[:, :, None] / divisors, -1.0)
+        return eligible, quotients, valid, umbral
+
+    def allocate(self, list_votes, blank=None):
+        """
+        Seats per list for (scenarios x lists) votes ('blank': per-scenario blank votes).
+        Returns (seats, cifra repartidora, eligible). Ties at the cifra go to the earlier list.
+        """
+        list_votes = np.atleast_2d(np.asarray(list_votes, dtype=float))
+        blank = np.zeros(len(list_votes)) if blank is None else np.broadcast_to(blank, (len(list_votes),))
+        eligible, quotients, _, _ = self._quotients(list_votes, blank)
+        flat = quotients.reshape(len(list_votes), -1)
+        k = min(self.seats, flat.shape[1]) - 1
+        cifra = np.partition(flat, flat.shape[1] - 1 - k, axis=1)[:, flat.shape[1] - 1 - k] if flat.shape[1] else np.zeros(0)
+        cifra = np.where(cifra > 0, cifra, np.inf)
+
+        seats = (quotients > cifra[:, None, None]).sum(axis=2)
+        ties = (quotients == cifra[:, None, None]).sum(axis=2)
+        remaining = self.seats - seats.sum(axis=1)
+        seats += np.clip(remaining[:, None] - (np.cumsum(ties, axis=1) - ties), 0, ties)
+        return seats, cifra, eligible
+
+    def elect(self, candidate_votes, list_seats):
+        """(scenarios x candidates) bools: the list's seats go to its most voted candidates."""
+        candidate_votes = np.atleast_2d(candidate_votes)
+        won = np.zeros(candidate_votes.shape, dtype=bool)
+        for lst in range(len(self.lists)):
+            cols = np.flatnonzero(self.candidate_list == lst)
+            if not len(cols):
+                continue
+            order = np.argsort(-candidate_votes[:, cols], axis=1, kind='stable')
+            rank = np.empty_like(order)
+            np.put_along_axis(rank, order, np.arange(len(cols))[None, :].repeat(len(order), axis=0), axis=1)
+            won[:, cols] = rank < list_seats[:, [lst]]
+        return won
+
+    def votes_to_next_seat(self, list_votes, blank=None):
+        """
+        Extra votes each list needs for one more seat (others' votes held fixed): its next
+        quotient has to beat the others' (seats - current seats)-th largest quotient, after
+        clearing the threshold if it is below it. Returns (scenarios x lists).
+        """
+        list_votes = np.atleast_2d(np.asarray(list_votes, dtype=float))
+        blank = np.zeros(len(list_votes)) if blank is None else np.broadcast_to(blank, (len(list_votes),))
+        seats, _, _ = self.allocate(list_votes, blank)
+        _, quotients, valid, umbral = self._quotients(list_votes, blank)
+        n, n_lists = list_votes.shape
+
+        flat = quotients.reshape(n, -1)
+        order = np.argsort(-flat, axis=1, kind='stable')
+        sorted_q = np.take_along_axis(flat, order, axis=1)
+        owner = order // self.seats
+
+        needed = np.full((n, n_lists), np.inf)
+        rows = np.arange(n)
+        for lst in range(n_lists):
+            k = self.seats - seats[:, lst]  # rank (1-based) among the other lists' quotients
+            others = np.cumsum(owner != lst, axis=1)
+            pos = np.argmax((others == k[:, None]) & (owner != lst), axis=1)
+            found = (k > 0) & (others[:, -1] >= k) if flat.shape[1] else np.zeros(n, dtype=bool)
+            rival = np.where(found, sorted_q[rows, pos], -1.0)
+            beat = np.floor(np.clip(rival, 0, None) * (seats[:, lst] + 1) - list_votes[:, lst]) + 1
+            # Adding x votes also raises the threshold: V + x >= t (valid + x) / seats
+            ratio = self.threshold / self.seats
+            cross = np.ceil((umbral - list_votes[:, lst]) / (1 - ratio))
+            needed[:, lst] = np.where(k > 0, np.maximum(np.maximum(beat, cross), 0), np.inf)
+        return needed
+
+    def candidate_flip(self, list_votes, candidate_votes, blank=None):
+        """
+        Extra preferential votes each candidate needs for a seat (0 if elected): the cheaper of
+        overtaking the list's last elected candidate, or lifting the list to one more seat and
+        being first in line for it. Returns (scenarios x candidates).
+        """
+        list_votes = np.atleast_2d(np.asarray(list_votes, dtype=float))
+        candidate_votes = np.atleast_2d(np.asarray(candidate_votes, dtype=float))
+        seats, _, _ = self.allocate(list_votes, blank)
+        list_needed = self.votes_to_next_seat(list_votes, blank)
+        won = self.elect(candidate_votes, seats)
+        needed = np.zeros(candidate_votes.shape)
+        for lst in range(len(self.lists)):
+            cols = np.flatnonzero(self.candidate_list == lst)
+            if not len(cols):
+                continue
+            v = candidate_votes[:, cols]
+            ranked = -np.sort(-v, axis=1)
+            s = np.clip(seats[:, lst], 0, len(cols))
+            rows = np.arange(len(v))
+            last_elected = np.where(s > 0, ranked[rows, np.clip(s - 1, 0, None)], np.inf)
+            first_out = np.where(s < len(cols), ranked[rows, np.clip(s, None, len(cols) - 1)], 0.0)
+            overtake = last_elected[:, None] - v + 1
+            expand = np.maximum(list_needed[:, [lst]], np.clip(first_out[:, None] - v + 1, 0, None))
+            needed[:, cols] = np.where(won[:, cols], 0.0, np.minimum(overtake, expand))
+        return needed
+
+    # --- MONTE CARLO ---
+
+    def scenarios(self, n_sims=2000, seed=None):
+        """
+        (list-only votes, candidate votes, blank) for 'n_sims' log-normal scenarios around the
+        observed result: a common turnout shock, a swing per list and a swing per candidate.
+        """
+        rng = np.random.default_rng(seed)
+        turnout = np.exp(self.TURNOUT_SIGMA * rng.standard_normal((n_sims, 1)) - self.TURNOUT_SIGMA ** 2 / 2)
+        swing = np.exp(self.LIST_SIGMA * rng.standard_normal((n_sims, len(self.lists))) - self.LIST_SIGMA ** 2 / 2)
+        local = np.exp(self.CANDIDATE_SIGMA * rng.standard_normal((n_sims, len(self.candidate_votes)))
+                       - self.CANDIDATE_SIGMA ** 2 / 2)
+        list_only = self.list_only_votes[None, :] * turnout * swing
+        candidates = self.candidate_votes[None, :] * turnout * swing[:, self.candidate_list] * local
+        return list_only, candidates, self.blank_votes * turnout[:, 0]
+
+    def list_totals(self, list_only, candidate_votes):
+        """(scenarios x lists) list votes from list-only and preferential votes."""
+        totals = np.array(list_only, dtype=float, copy=True)
+        for lst in range(len(self.lists)):
+            totals[:, lst] += candidate_votes[:, self.candidate_list == lst].sum(axis=1)
+        return totals
+
+    def simulate(self, n_sims=2000, seed=None):
+        """
+        Seat probabilities over 'n_sims' scenarios plus the observed allocation.
+        Returns {'candidates': per-candidate table, 'lists': per-list table, 'cifra': observed cifra}.
+        """
+        list_only, cand, blank = self.scenarios(n_sims, seed)
+        list_votes = self.list_totals(list_only, cand)
+        seats, _, _ = self.allocate(list_votes, blank)
+        won = self.elect(cand, seats)
+
+        base_seats, base_cifra, base_eligible = self.allocate(self.list_votes[None, :], self.blank_votes)
+        base_won = self.elect(self.candidate_votes[None, :], base_seats)[0]
+        flip = self.candidate_flip(self.list_votes[None, :], self.candidate_votes[None, :], self.blank_votes)[0]
+        list_flip = self.votes_to_next_seat(self.list_votes[None, :], self.blank_votes)[0]
+
+        candidates = self.candidates.assign(
+            Votos=self.candidate_votes.astype(int),
+            Electo=base_won,
+            Prob_Curul=won.mean(axis=0),
+            Votos_Para_Curul=np.where(np.isfinite(flip), flip, np.nan),
+        ).sort_values(['Prob_Curul', 'Votos'], ascending=False, kind='stable').reset_index(drop=True)
+        lists = pd.DataFrame({
+            'Lista': self.lists,
+            'Votos': self.list_votes.astype(int),
+            'Supera_Umbral': base_eligible[0],
+            'Curules': base_seats[0],
+            'Curules_Media': seats.mean(axis=0),
+            'Votos_Para_Curul': np.where(np.isfinite(list_flip), list_flip, np.nan),
+        }).sort_values('Votos', ascending=False, kind='stable').reset_index(drop=True)
+        return {'candidates': candidates, 'lists': lists, 'cifra': float(base_cifra[0]), 'n_sims': n_sims}
@@ -0,0 +1,131 @@
+import numpy as np
+from src.services.spatial_index import EARTH_RADIUS_M
+
+METERS_PER_DEG = EARTH_RADIUS_M * np.pi / 180
+
+
+class SentimentSurface:
+    """
+    Module 3b: Sentiment Density Surface.
+    Posts are binned onto a fixed geographic grid (sentiment summed per cell) and spread
+    with a Gaussian distance-decay kernel through one FFT convolution. The resulting raster
+    is sampled at station coordinates (bilinear) and can be drawn directly by the map.
+    Cost depends on the grid size, not on posts x stations.
+    """
+    DEFAULT_CELL_M = 200.0
+    DEFAULT_SIGMA_M = 1000.0
+    KERNEL_SIGMAS = 3
+    MAX_CELLS = 512  # per side; the cell grows for very wide extents
+
+    def __init__(self, bounds, cell_m=DEFAULT_CELL_M, sigma_m=DEFAULT_SIGMA_M):
+        """
+        bounds = (lat_min, lon_min, lat_max, lon_max) of the area to cover.
+        """
+        lat_min, lon_min, lat_max, lon_max = (float(b) for b in bounds)
+        self.sigma_m = float(sigma_m)
+        cos0 = np.cos(np.radians((lat_min + lat_max) / 2))
+
+        # Pad by the kernel reach so edge posts are not clipped
+        pad_m = self.KERNEL_SIGMAS * self.sigma_m
+        lat_min -= pad_m / METERS_PER_DEG
+        lat_max += pad_m / METERS_PER_DEG
+        lon_min -= pad_m / (METERS_PER_DEG * cos0)
+        lon_max += pad_m / (METERS_PER_DEG * cos0)
+
+        span_m = max((lat_max - lat_min) * METERS_PER_DEG, (lon_max - lon_min) * METERS_PER_DEG * cos0)
+        self.cell_m = max(float(cell_m), span_m / self.MAX_CELLS)
+        self.dlat = self.cell_m / METERS_PER_DEG
+        self.dlon = self.cell_m / (METERS_PER_DEG * cos0)
+
+        self.lat_min, self.lon_min = lat_min, lon_min
+        self.n_lat = max(int(np.ceil((lat_max - lat_min) / self.dlat)), 1)
+        self.n_lon = max(int(np.ceil((lon_max - lon_min) / self.dlon)), 1)
+        self.lat_max = lat_min + self.n_lat * self.dlat
+        self.lon_max = lon_min + self.n_lon * self.dlon
+
+        # Row 0 = southernmost cells
+        self.grid = np.zeros((self.n_lat, self.n_lon))
+
+    @classmethod
+    def covering(cls, *frames, **kwargs):
+        """Surface whose bounds cover the lat / lon of every given frame."""
+        lats = np.concatenate([f['lat'].to_numpy(dtype=float) for f in frames if len(f)] or [np.zeros(0)])
+        lons = np.concatenate([f['lon'].to_numpy(dtype=float) for f in frames if len(f)] or [np.zeros(0)])
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        if not ok.any():
+            lats, lons, ok = np.array([6.2442]), np.array([-75.5812]), np.array([True])
+        return cls((lats[ok].min(), lons[ok].min(), lats[ok].max(), lons[ok].max()), **kwargs)
+
+    @property
+    def bounds(self):
+        """[[south, west], [north, east]] (folium order)."""
+        return [[self.lat_min, self.lon_min], [self.lat_max, self.lon_max]]
+
+    def kernel(self):
+        """Gaussian decay weights (1.0 at distance 0), truncated at KERNEL_SIGMAS."""
+        reach = int(np.ceil(self.KERNEL_SIGMAS * self.sigma_m / self.cell_m))
+        offsets = np.arange(-reach, reach + 1) * self.cell_m
+        d2 = offsets[:, None] ** 2 + offsets[None, :] ** 2
+        weights = np.exp(-d2 / (2 * self.sigma_m ** 2))
+        weights[d2 > (self.KERNEL_SIGMAS * self.sigma_m) ** 2] = 0
+        return weights
+
+    def fit(self, lat, lon, values):
+        """Bins 'values' at (lat, lon) and convolves with the decay kernel. Returns self."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        values = np.asarray(values, dtype=float)
+        ok = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(values)
+
+        binned, _, _ = np.histogram2d(
+            lat[ok], lon[ok], bins=(self.n_lat, self.n_lon),
+            range=((self.lat_min, self.lat_max), (self.lon_min, self.lon_max)), weights=values[ok]
+        )
+        self.grid = self._convolve(binned, self.kernel())
+        return self
+
+    @staticmethod
+    def _convolve(image, kernel):
+        """'same'-size linear convolution through a zero-padded real FFT."""
+        kh, kw = kernel.shape
+        shape = (image.shape[0] + kh - 1, image.shape[1] + kw - 1)
+        full = np.fft.irfft2(np.fft.rfft2(image, shape) * np.fft.rfft2(kernel, shape), shape)
+        top, left = kh // 2, kw // 2
+        return full[top:top + image.shape[0], left:left + image.shape[1]]
+
+    def sample(self, lat, lon):
+        """Bilinear surface value at each (lat, lon); 0 outside the grid."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        fi = (lat - self.lat_min) / self.dlat - 0.5
+        fj = (lon - self.lon_min) / self.dlon - 0.5
+        inside = np.isfinite(fi) & np.isfinite(fj) & (fi > -1) & (fi < self.n_lat) & (fj > -1) & (fj < self.n_lon)
+
+        fi = np.clip(np.where(inside, fi, 0), 0, self.n_lat - 1)
+        fj = np.clip(np.where(inside, fj, 0), 0, self.n_lon - 1)
+        i0 = np.minimum(np.floor(fi).astype(np.int64), self.n_lat - 1)
+        j0 = np.minimum(np.floor(fj).astype(np.int64), self.n_lon - 1)
+        i1 = np.minimum(i0 + 1, self.n_lat - 1)
+        j1 = np.minimum(j0 + 1, self.n_lon - 1)
+        ti, tj = fi - i0, fj - j0
+
+        g = self.grid
+        value = ((1 - ti) * (1 - tj) * g[i0, j0] + (1 - ti) * tj * g[i0, j1]
+                 + ti * (1 - tj) * g[i1, j0] + ti * tj * g[i1, j1])
+        return np.where(inside, value, 0.0)
+
+    def to_rgba(self, max_alpha=160):
+        """
+        North-up RGBA raster for map overlays: green = positive, red = negative,
+        opacity proportional to |value|.
+        """
+        grid = self.grid[::-1]
+        scale = np.abs(grid).max()
+        norm = grid / scale if scale > 0 else np.zeros_like(grid)
+
+        rgba = np.zeros(grid.shape + (4,), dtype=np.uint8)
+        positive = norm > 0
+        rgba[positive] = (34, 197, 94, 0)
+        rgba[~positive] = (239, 68, 68, 0)
+        rgba[..., 3] = (np.abs(norm) * max_alpha).astype(np.uint8)
+        return rgba
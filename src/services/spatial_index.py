@@ -0,0 +1,97 @@
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (vectorized, broadcasts like numpy)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class StationIndex:
+    """
+    Module 3a: Station Spatial Index.
+    Uniform grid over a local metric projection of the station coordinates.
+    Stations are sorted by cell once; a batch of radius queries visits only the
+    neighbouring cells of each query point and confirms candidates with haversine.
+    """
+    DEFAULT_CELL_M = 1500.0
+    _CY_OFFSET = 2 ** 31
+
+    def __init__(self, lat, lon, cell_m=DEFAULT_CELL_M):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.lat = lat
+        self.lon = lon
+        self.cell_m = float(cell_m)
+
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        # Projection reference latitude (equirectangular, accurate at city/department scale)
+        self._cos0 = np.cos(np.radians(lat[valid].mean())) if valid.any() else 1.0
+
+        stations = np.flatnonzero(valid)
+        keys = self._cell_keys(*self._cells(lat[valid], lon[valid]))
+        order = np.argsort(keys, kind='stable')
+        self._order = stations[order]
+        self._keys, self._starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._ends = self._starts + counts
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cells(self, lat, lon):
+        x = EARTH_RADIUS_M * np.radians(lon) * self._cos0
+        y = EARTH_RADIUS_M * np.radians(lat)
+        return np.floor(x / self.cell_m).astype(np.int64), np.floor(y / self.cell_m).astype(np.int64)
+
+    def _cell_keys(self, cx, cy):
+        return (cx << 32) + (cy + self._CY_OFFSET)
+
+    def query_radius(self, lat, lon, radius_m):
+        """
+        All (query, station) pairs within 'radius_m' meters, in one batched pass.
+        Returns (query_idx, station_idx, distance_m) arrays; station_idx indexes the
+        coordinates the index was built from.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        if not len(valid) or not len(self._keys):
+            return empty
+
+        cx, cy = self._cells(lat[valid], lon[valid])
+        # Cells are square in the projection, but longitude shrinks away from the reference latitude
+        reach = int(np.ceil(radius_m / self.cell_m)) + 1
+
+        queries, stations = [], []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                keys = self._cell_keys(cx + dx, cy + dy)
+                pos = np.searchsorted(self._keys, keys)
+                pos = np.minimum(pos, len(self._keys) - 1)
+                hit = self._keys[pos] == keys
+                if not hit.any():
+                    continue
+                q = valid[hit]
+                start, end = self._starts[pos[hit]], self._ends[pos[hit]]
+                counts = end - start
+                # Expand each (query, cell) hit into its station run
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                queries.append(np.repeat(q, counts))
+                stations.append(self._order[np.repeat(start, counts) + offsets])
+
+        if not queries:
+            return empty
+        queries = np.concatenate(queries)
+        stations = np.concatenate(stations)
+        dist = haversine_m(lat[queries], lon[queries], self.lat[stations], self.lon[stations])
+        inside = dist <= radius_m
+        return queries[inside], stations[inside], dist[inside]
+
+    def count_within(self, lat, lon, radius_m):
+        """Number of query points within 'radius_m' of each station."""
+        _, stations, _ = self.query_radius(lat, lon, radius_m)
+        return np.bincount(stations, minlength=len(self))
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from src.services.spatial_index import EARTH_RADIUS_M
+
+
+class SpatialWeights:
+    """
+    Module 3c: Sparse Station Neighbor Weights.
+    Binary neighbor matrix (CSR, no self links) over the stations: the k nearest stations, or
+    every station within a distance band (radius queries on the station index). Built once per
+    set of coordinates and reused by every statistic and column.
+    """
+    DEFAULT_K = 8
+
+    def __init__(self, neighbors, n):
+        self.matrix = neighbors.tocsr()
+        self.matrix.setdiag(0)
+        self.matrix.eliminate_zeros()
+        self.n = n
+        self.cardinality = np.diff(self.matrix.indptr)
+
+    @classmethod
+    def knn(cls, lat, lon, k=DEFAULT_K):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        k = min(k, len(valid) - 1)
+        if k < 1:
+            return cls(sparse.csr_matrix((len(lat), len(lat))), len(lat))
+        # Local equirectangular projection (meters), as in StationIndex
+        cos0 = np.cos(np.radians(lat[valid].mean()))
+        xy = np.column_stack([EARTH_RADIUS_M * np.radians(lon[valid]) * cos0, EARTH_RADIUS_M * np.radians(lat[valid])])
+        _, idx = cKDTree(xy).query(xy, k=k + 1)
+        rows = np.repeat(valid, k)
+        # Drop each point's own hit (co-located stations may come back in any order)
+        own = idx == np.arange(len(valid))[:, None]
+        keep = np.where(own.any(axis=1)[:, None], ~own, np.arange(k + 1)[None, :] < k)
+        cols = valid[idx[keep].reshape(-1)]
+        neighbors = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(lat), len(lat)))
+        return cls(neighbors, len(lat))
+
+    @classmethod
+    def distance_band(cls, index, radius_m):
+        """Neighbors within 'radius_m' of each station, from a StationIndex."""
+        queries, stations, _ = index.query_radius(index.lat, index.lon, radius_m)
+        n = len(index)
+        neighbors = sparse.csr_matrix((np.ones(len(queries)), (queries, stations)), shape=(n, n))
+        return cls(neighbors, n)
+
+
+class HotspotAnalysis:
+    """
+    Module 3d: Local Spatial Statistics (Getis-Ord Gi*, local Moran's I).
+    All analytic columns are standardized together as one (stations x columns) matrix, so the
+    spatial lags are a single sparse product. Pseudo p-values come from conditional
+    permutations: each station keeps its value while its neighbor values are redrawn from the
+    other stations; one set of random draws is shared by every station and column. The
+    permuted sums and statistics are reduced to exceedance counts chunk by chunk, so memory
+    stays bounded by CHUNK_ELEMENTS whatever the number of stations.
+    """
+    PERMUTATIONS = 499
+    ALPHA = 0.05
+    CHUNK_ELEMENTS = 8_000_000
+
+    def __init__(self, weights, permutations=PERMUTATIONS, seed=0):
+        self.weights = weights
+        self.permutations = permutations
+        self.seed = seed
+
+    def _permutation_counts(self, x, z, neighbor_sum, moran, mean, std, m2):
+        """
+        Per station and column (n x columns each): permutations whose neighbor sum is >= / <=
+        the observed one, and whose local Moran's I is >= the observed one. Each permutation
+        draws k_i values from the other stations (draws shared by all stations and columns);
+        the permuted sums and statistics only ever exist for one chunk of stations.
+        """
+        n, n_cols = x.shape
+        k = self.weights.cardinality
+        k_max = int(k.max()) if n else 0
+        above = np.zeros((n, n_cols), dtype=np.int64)
+        below = np.zeros((n, n_cols), dtype=np.int64)
+        larger = np.zeros((n, n_cols), dtype=np.int64)
+        if k_max == 0 or n < 2:
+            return above, below, larger
+        rng = np.random.default_rng(self.seed)
+        # Draws without replacement among the n - 1 other stations (shared by all stations)
+        draws = np.stack([rng.choice(n - 1, k_max, replace=False) for _ in range(self.permutations)])
+        chunk = max(1, self.CHUNK_ELEMENTS // max(self.permutations * k_max * n_cols, 1))
+        slots = np.arange(k_max)
+        for start in range(0, n, chunk):
+            stations = np.arange(start, min(start + chunk, n))
+            # Skip the station itself: draw r >= i maps to r + 1
+            idx = draws[None, :, :] + (draws[None, :, :] >= stations[:, None, None])
+            mask = slots[None, None, :] < k[stations, None, None]
+            perm_sum = np.einsum('spkc,spk->spc', x[idx], mask.astype(float))
+
+            observed = neighbor_sum[stations, None, :]
+            above[stations] = (perm_sum >= observed).sum(axis=1)
+            below[stations] = (perm_sum <= observed).sum(axis=1)
+
+            k_chunk = k[stations, None, None].astype(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                perm_lag = np.where(k_chunk > 0, ((perm_sum - mean * k_chunk) / std) / k_chunk, 0.0)
+            perm_moran = z[stations, None, :] * perm_lag / m2
+            larger[stations] = (perm_moran >= moran[stations, None, :]).sum(axis=1)
+        return above, below, larger
+
+    def run(self, df, columns, alpha=ALPHA):
+        """
+        Gi* z-scores and local Moran's I with pseudo p-values for every column in 'columns'.
+        Returns a frame (positional) with, per column:
+        <col>_gi_z, <col>_gi_p, <col>_hotspot (HOT / COLD / NS),
+        <col>_moran_i, <col>_moran_p, <col>_lisa (HH / LL / HL / LH / NS).
+        """
+        columns = [c for c in columns if c in df.columns]
+        x = df[columns].to_numpy(dtype=float)
+        x = np.where(np.isfinite(x), x, np.nanmean(x, axis=0) if len(x) else 0.0)
+        n = len(x)
+        w = self.weights.matrix
+        k = self.weights.cardinality.astype(float)
+        out = {}
+        if not columns or n < 3:
+            return pd.DataFrame(out, index=pd.RangeIndex(n))
+
+        mean, std = x.mean(axis=0), x.std(axis=0)
+        varying = std > 0
+        std = np.where(varying, std, 1.0)
+        z = (x - mean) / std
+        neighbor_sum = w @ x  # (stations x columns), binary weights
+        permutations = self.permutations
+
+        # Getis-Ord Gi* (self included): sum over {i} + neighbors against its expectation
+        wi = k + 1
+        denom = std * np.sqrt((n * wi - wi ** 2) / (n - 1))[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gi_z = np.where(denom > 0, (x + neighbor_sum - mean * wi[:, None]) / denom, 0.0)
+
+        # Local Moran's I on the row-standardized lag of z
+        m2 = (z ** 2).mean(axis=0)
+        m2 = np.where(m2 > 0, m2, 1.0)  # constant column: I = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lag = np.where(k[:, None] > 0, (w @ z) / k[:, None], 0.0)
+        moran = z * lag / m2
+
+        # Conditional permutation: x_i fixed, neighbor sum redrawn
+        above, below, larger = self._permutation_counts(x, z, neighbor_sum, moran, mean, std, m2)
+        gi_p = (np.where(gi_z >= 0, above, below) + 1) / (permutations + 1)
+        larger = np.minimum(larger, permutations - larger)
+        moran_p = (larger + 1) / (permutations + 1)
+
+        # Constant columns (and stations without neighbors) have no clusters to report
+        has_neighbors = (k > 0)[:, None]
+        testable = has_neighbors & varying[None, :]
+        hot = testable & (gi_p < alpha)
+        hotspot = np.where(hot & (gi_z > 0), 'HOT', np.where(hot & (gi_z < 0), 'COLD', 'NS'))
+        quadrant = np.where(z >= 0, np.where(lag >= 0, 'HH', 'HL'), np.where(lag >= 0, 'LH', 'LL'))
+        lisa = np.where(testable & (moran_p < alpha), quadrant, 'NS')
+
+        for j, col in enumerate(columns):
+            out[f'{col}_gi_z'] = gi_z[:, j]
+            out[f'{col}_gi_p'] = np.where(has_neighbors[:, 0], gi_p[:, j], 1.0)
+            out[f'{col}_hotspot'] = hotspot[:, j]
+            out[f'{col}_moran_i'] = moran[:, j]
+            out[f'{col}_moran_p'] = np.where(has_neighbors[:, 0], moran_p[:, j], 1.0)
+            out[f'{col}_lisa'] = lisa[:, j]
+        return pd.DataFrame(out, index=pd.RangeIndex(n))
@@ -1,13 +1,161 @@
+import itertools
 import pandas as pd
 import numpy as np
+from src.services.spatial_index import StationIndex
+from src.services.site_selector import SiteSelector
+from src.services.spatial_stats import SpatialWeights, HotspotAnalysis
+from src.services.sentiment_surface import SentimentSurface
+from src.services.budget_optimizer import BudgetOptimizer
+from src.services.route_planner import RoutePlanner
+from src.services.monte_carlo import DigitalTwin
+from src.services.compute_graph import ComputeGraph
+from src.services.turnout_model import TurnoutModel
+from src.services.cannibalization import CannibalizationMatrix
+from src.services.seat_allocator import SeatAllocator
+from src.services.leaderboard import Leaderboard
 
 class TargetingBrain:
     """
     The Core Synthesis Engine.
     Updated for Strict Real Data: Strategic Projection & Growth Engine.
     """
+    # Alert influence radius for the growth engine (meters)
+    ALERT_RADIUS_M = 1500
+    STRATEGY_CLASSES = ['STRONGHOLD', 'BATTLEGROUND', 'OPPORTUNITY', 'OBSERVATION']
+    # Event reach for site selection (meters)
+    EVENT_RADIUS_M = 1000
+    # Map layers tested for spatial clusters (see detect_hotspots)
+    HOTSPOT_COLUMNS = ['historical_strength', 'growth_potential', 'crisis_risk']
+    HOTSPOT_OUTPUTS = ['gi_z', 'gi_p', 'hotspot', 'moran_i', 'moran_p', 'lisa']
+    # Station rankings kept incrementally (see leaderboard)
+    RANKED_METRICS = ['growth_potential', 'historical_strength', 'final_priority', 'Votos']
+    RANKED_LABELS = ['strategy_class']
+    LEADERBOARD_KEYS = ['Zona', 'Puesto']
+    # Route start / end (Medellín center)
+    DEPOT = (6.2442, -75.5812)
+
     def __init__(self):
-        pass
+        self._station_index = (None, None)
+        self._spatial_weights = (None, None)
+        self._leaderboard = None
+        self.sentiment_surface = None
+        self._budget_optimizer = (None, None)
+        self.route_planner = RoutePlanner()
+        self.last_twin = None
+        self.last_turnout = None
+        self._turnout_model = (None, None)
+        self.cannibalization = None
+        self.last_seats = None
+        self._seat_run = (None, None)
+        self.pipeline = self._build_pipeline()
+
+    # Fx dependency graph: (method, columns read, columns written, parameters, brain state it sets)
+    PIPELINE = [
+        ('synthesize', ['lat', 'lon', 'historical_strength'],
+         ['final_priority', 'growth_potential', 'strategy_class'], ['social_df', 'weights'], []),
+        ('calculate_elasticity', ['Zona', 'Puesto', 'Votos_*', 'strategy_class'],
+         ['elasticity', 'swing', 'volatility'], ['panel', 'candidate_col'], []),
+        ('calculate_sentiment_correlation', ['lat', 'lon'], ['sentiment_score'], ['social_df'], ['sentiment_surface']),
+        ('calculate_comparative_growth', ['Zona', 'Puesto', 'Votos_*', 'historical_strength'],
+         ['growth_velocity'], ['panel', 'candidate_col'], []),
+        ('analyze_cannibalization', ['Zona', 'Puesto', 'historical_strength'],
+         ['cannibalization_score', 'cannibalization_risk'], ['matrix', 'candidate'], []),
+        ('run_digital_twin', ['Votos_*', 'Votos'], ['win_probability'],
+         ['n_sims', 'seed', 'candidate_col'], ['last_twin']),
+        ('calculate_influencer_impact', ['Votos'], ['influencer_reach'], [], []),
+        ('calculate_event_roi', ['growth_potential'], ['event_roi_score'], [], []),
+        ('generate_crisis_heatmap', ['historical_strength'], ['crisis_risk'], [], []),
+        ('analyze_volunteer_density', ['Votos'], ['volunteers_needed'], [], []),
+        ('project_early_voting', ['Votos'], ['early_votes'], [], []),
+        ('build_coalition', ['Votos'], ['coalition_votes'], [], []),
+        ('map_donor_propensity', ['historical_strength'], ['donor_score'], [], []),
+        ('detect_hotspots', ['lat', 'lon'] + HOTSPOT_COLUMNS,
+         [f'{col}_{out}' for col, out in itertools.product(HOTSPOT_COLUMNS, HOTSPOT_OUTPUTS)],
+         ['k', 'radius_m', 'permutations', 'alpha', 'seed'], []),
+    ]
+
+    def _build_pipeline(self):
+        graph = ComputeGraph(owner=self)
+        for name, reads, writes, params, state in self.PIPELINE:
+            graph.add(name, getattr(self, name), reads, writes, params, state)
+        return graph
+
+    def run_pipeline(self, df, stages=None, **params):
+        """
+        Runs Fx 'stages' (all by default) through the memoized graph: only the stages whose
+        input columns or parameters changed recompute. Hit / miss counts: self.pipeline.stats().
+        """
+        return self.pipeline.run(df, stages=stages, **params)
+
+    def station_index(self, df):
+        """
+        Spatial index over the stations of 'df' (lat / lon), reused while the coordinates don't change.
+        """
+        lat = df['lat'].to_numpy(dtype=float)
+        lon = df['lon'].to_numpy(dtype=float)
+        key = hash((lat.tobytes(), lon.tobytes()))
+        cached_key, index = self._station_index
+        if cached_key != key:
+            index = StationIndex(lat, lon)
+            self._station_index = (key, index)
+        return index
+
+    def spatial_weights(self, df, k=SpatialWeights.DEFAULT_K, radius_m=None):
+        """
+        Sparse neighbor weights over the stations of 'df': k nearest, or a distance band of
+        'radius_m' meters when given. Reused while the coordinates and parameters don't change.
+        """
+        lat = df['lat'].to_numpy(dtype=float)
+        lon = df['lon'].to_numpy(dtype=float)
+        key = hash((lat.tobytes(), lon.tobytes(), k, radius_m))
+        cached_key, weights = self._spatial_weights
+        if cached_key != key:
+            if radius_m:
+                weights = SpatialWeights.distance_band(self.station_index(df), radius_m)
+            else:
+                weights = SpatialWeights.knn(lat, lon, k)
+            self._spatial_weights = (key, weights)
+        return weights
+
+    def leaderboard(self, df):
+        """
+        Station leaderboard (RANKED_METRICS, filterable by RANKED_LABELS) brought up to date with
+        'df'. Every call syncs it (vectorized; only stations whose values changed are re-ranked),
+        so in-place edits are picked up, and the queries read the kept top sets.
+        """
+        if self._leaderboard is None:
+            self._leaderboard = Leaderboard(self.RANKED_METRICS)
+        self._leaderboard.sync(df, key_columns=self.LEADERBOARD_KEYS, label_columns=self.RANKED_LABELS)
+        return self._leaderboard
+
+    def top_stations(self, df, metric, n=10, where=None):
+        """Rows of 'df' with the 'n' highest 'metric' among those matching 'where' ({column: values}), best first."""
+        if df.empty or metric not in df.columns:
+            return df.iloc[0:0]
+        where = where or {}
+        ranked = set(self.RANKED_METRICS) | set(self.RANKED_LABELS)
+        if metric not in self.RANKED_METRICS or not ranked.issuperset(where):
+            # Ad-hoc metric: one argpartition over the column
+            mask = np.ones(len(df), dtype=bool)
+            for column, allowed in where.items():
+                allowed = allowed if isinstance(allowed, (set, frozenset, list, tuple)) else [allowed]
+                mask &= df[column].isin(list(allowed)).to_numpy()
+            return df.iloc[Leaderboard.top_n(df[metric].to_numpy(dtype=float), n, mask)]
+        return df.iloc[self.leaderboard(df).top(metric, n, where)['row'].to_numpy()]
+
+    def detect_hotspots(self, df, columns=None, k=SpatialWeights.DEFAULT_K, radius_m=None,
+                        permutations=HotspotAnalysis.PERMUTATIONS, alpha=HotspotAnalysis.ALPHA, seed=0):
+        """
+        Getis-Ord Gi* and local Moran's I for every analytic column present ('columns', default
+        HOTSPOT_COLUMNS) with permutation p-values. Adds <col>_gi_z / _gi_p / _hotspot (HOT, COLD, NS)
+        and <col>_moran_i / _moran_p / _lisa (HH, LL, HL, LH, NS) per column.
+        """
+        if df.empty:
+            return df
+        columns = [c for c in (columns or self.HOTSPOT_COLUMNS) if c in df.columns]
+        analysis = HotspotAnalysis(self.spatial_weights(df, k, radius_m), permutations, seed)
+        stats = analysis.run(df, columns, alpha)
+        return df.assign(**{c: stats[c].to_numpy() for c in stats.columns})
 
     def synthesize(self, history_df, social_df=None, weights=None):
         """
@@ -22,125 +170,202 @@ class TargetingBrain:
         if weights is None:
             weights = {'security': 1.0, 'opinion': 1.0, 'growth': 1.0}
             
-        synthesized = history_df.copy()
+        synthesized = history_df.copy(deep=False)
         
         # Base Priority = Historical Strength
         synthesized["final_priority"] = synthesized["historical_strength"]
         
         # --- GROWTH ENGINE ---
         # Logic: Identify areas with Security Alerts (Opportunity) but Low Votes (Room to Grow)
-        synthesized["growth_potential"] = 0.0
-        
-        if social_df is not None and not social_df.empty:
-            # Filter for Security Alerts
-            security_alerts = social_df[social_df['type'] == 'SECURITY_ALERT']
-            
-            for _, alert in security_alerts.iterrows():
-                # Find stations near this alert (approx 1.5km radius ~ 0.0135 deg)
-                # Simple Euclidean distance for speed
-                lat_diff = synthesized['lat'] - alert['lat']
-                lon_diff = synthesized['lon'] - alert['lon']
-                dist_sq = lat_diff**2 + lon_diff**2
-                
-                # 0.0002 approx 1.5km radius squared
-                nearby_mask = dist_sq < 0.0002
-                
-                # Boost growth potential for nearby stations
-                # If historical strength is LOW (< 30%), this is a PRIME opportunity
-                # If historical strength is HIGH (> 70%), it's already captured, less growth
-                
-                # Vectorized update
-                current_strength = synthesized.loc[nearby_mask, 'historical_strength']
-                
-                # Growth Score = (100 - Current Strength) * Weight * Security_Modifier
-                # The weaker we are, the more we can grow IF there is a security issue to exploit
-                growth_boost = (100 - current_strength) * 0.8 * weights.get('security', 1.0)
-                
-                synthesized.loc[nearby_mask, 'growth_potential'] += growth_boost
+        # Growth Score = (100 - Current Strength) * 0.8 * Security Weight, per nearby alert
+        base = self._alert_growth_base(synthesized, social_df)
+        synthesized["growth_potential"] = base * weights.get('security', 1.0)
 
         # Apply Growth Factor Thresholding/Scaling
         synthesized["growth_potential"] *= weights.get('growth', 1.0)
         
         # --- ZONE PRIORITIZATION MATRIX (Function 3) ---
-        # Classify into Quadrants
-        # Q1: Stronghold (High Vote, Low Growth)
-        # Q2: Battleground (High Vote, High Growth) - Rare but critical
-        # Q3: Opportunity (Low Vote, High Growth)
-        # Q4: Lost Cause (Low Vote, Low Growth)
-        
-        def classify_zone(row):
-            v = row['historical_strength']
-            g = row['growth_potential']
-            if v > 50:
-                return "STRONGHOLD" if g < 50 else "BATTLEGROUND"
-            else:
-                return "OPPORTUNITY" if g > 30 else "OBSERVATION"
-                
-        synthesized['strategy_class'] = synthesized.apply(classify_zone, axis=1)
+        synthesized['strategy_class'] = np.asarray(self.STRATEGY_CLASSES, dtype=object)[
+            self.classify_strategy(synthesized['historical_strength'].to_numpy(dtype=float),
+                                   synthesized['growth_potential'].to_numpy(dtype=float))
+        ]
 
         return synthesized
 
-    def optimize_resources(self, synthesized_df, budget=100000000):
+    def _alert_growth_base(self, stations_df, social_df):
+        """
+        Weight-independent growth term per station: sum over nearby SECURITY_ALERTs of
+        (100 - historical_strength) * 0.8. All alert radius queries run in one batched call
+        against the station index and the boosts are accumulated with a single scatter-add.
+        """
+        base = np.zeros(len(stations_df))
+        if social_df is None or social_df.empty:
+            return base
+
+        # If historical strength is LOW, a nearby security issue is a PRIME opportunity
+        security_alerts = social_df[social_df['type'] == 'SECURITY_ALERT']
+        index = self.station_index(stations_df)
+        _, stations, _ = index.query_radius(security_alerts['lat'], security_alerts['lon'], self.ALERT_RADIUS_M)
+        strength = stations_df['historical_strength'].to_numpy(dtype=float)
+        return base + np.bincount(stations, weights=(100 - strength[stations]) * 0.8, minlength=len(base))
+
+    @classmethod
+    def classify_strategy(cls, strength, growth):
+        """
+        Quadrant codes (indexes into STRATEGY_CLASSES); broadcasts over any array shape.
+        Q1: Stronghold (High Vote, Low Growth)
+        Q2: Battleground (High Vote, High Growth) - Rare but critical
+        Q3: Opportunity (Low Vote, High Growth)
+        Q4: Observation (Low Vote, Low Growth)
+        """
+        strength, growth = np.broadcast_arrays(strength, growth)
+        high_vote = strength > 50
+        codes = np.select(
+            [high_vote & (growth < 50), high_vote, growth > 30],
+            [0, 1, 2],
+            default=3
+        )
+        return codes.astype(np.int8)
+
+    def sweep(self, history_df, social_df, weight_grid):
+        """
+        Batched scenario planning: evaluates synthesize() for many 'weights' at once.
+        'weight_grid' is a list of weights dicts, a DataFrame with one scenario per row,
+        or a dict of value lists (expanded to their cartesian product).
+        The weight-independent growth term is computed once; every scenario is then a broadcast.
+        Returns a dict:
+        - 'weights': scenarios x (security, opinion, growth)
+        - 'growth': scenarios x stations growth_potential (float32)
+        - 'strategy': scenarios x stations codes into STRATEGY_CLASSES (int8)
+        - 'summary': per-scenario stats (class counts, mean/max growth, top station)
+        """
+        grid = self._weight_frame(weight_grid)
+        n_stations = len(history_df)
+        if history_df.empty or grid.empty:
+            return {
+                'weights': grid,
+                'growth': np.zeros((len(grid), n_stations), dtype=np.float32),
+                'strategy': np.full((len(grid), n_stations), 3, dtype=np.int8),
+                'summary': pd.DataFrame(),
+            }
+
+        base = self._alert_growth_base(history_df, social_df)
+        strength = history_df['historical_strength'].to_numpy(dtype=float)
+        scale = grid['security'].to_numpy(dtype=float) * grid['growth'].to_numpy(dtype=float)
+
+        growth = scale[:, None] * base[None, :]
+        strategy = self.classify_strategy(strength[None, :], growth)
+
+        summary = grid.copy()
+        counts = np.stack([(strategy == code).sum(axis=1) for code in range(len(self.STRATEGY_CLASSES))], axis=1)
+        for code, name in enumerate(self.STRATEGY_CLASSES):
+            summary[name.lower()] = counts[:, code]
+        summary['mean_growth'] = growth.mean(axis=1)
+        summary['max_growth'] = growth.max(axis=1)
+        if 'Puesto' in history_df.columns:
+            summary['top_puesto'] = history_df['Puesto'].to_numpy()[growth.argmax(axis=1)]
+        else:
+            summary['top_puesto'] = None
+
+        return {
+            'weights': grid,
+            'growth': growth.astype(np.float32),
+            'strategy': strategy,
+            'summary': summary,
+        }
+
+    @staticmethod
+    def _weight_frame(weight_grid):
+        """Normalizes the accepted weight_grid shapes to a (security, opinion, growth) frame."""
+        if isinstance(weight_grid, pd.DataFrame):
+            grid = weight_grid.copy()
+        elif isinstance(weight_grid, dict):
+            keys = list(weight_grid)
+            grid = pd.DataFrame(list(itertools.product(*[weight_grid[k] for k in keys])), columns=keys)
+        else:
+            grid = pd.DataFrame(list(weight_grid))
+        for col in ['security', 'opinion', 'growth']:
+            if col not in grid.columns:
+                grid[col] = 1.0
+        return grid.reset_index(drop=True)
+
+    def optimize_resources(self, synthesized_df, budget=100000000, actions=None, zone_caps=None):
         """
         Function 4: Resource Optimization Solver.
-        Allocates budget to zones based on ROI (Votes per Peso).
-        Simple Knapsack-style heuristic.
+        Allocates budget across stations and action types (team activation, event, ad burst)
+        with diminishing returns and optional per-zone caps (see BudgetOptimizer).
+        The optimizer is kept for the same stations / actions, so budget changes re-solve incrementally.
+        Returns one row per (station, action); attrs include 'marginal_value' (votes per extra peso).
         """
         if synthesized_df.empty:
             return pd.DataFrame()
-            
-        # ROI Metric: Growth Potential / Cost
-        # Assume cost is fixed per station activation (e.g., 5M COP)
-        activation_cost = 5000000 
-        
-        df = synthesized_df.copy()
-        df['roi'] = df['growth_potential']  # Simplified ROI
-        
-        # Sort by ROI
-        df = df.sort_values('roi', ascending=False)
-        
-        allocations = []
-        remaining_budget = budget
-        
-        for _, row in df.iterrows():
-            if remaining_budget >= activation_cost and row['strategy_class'] in ['OPPORTUNITY', 'BATTLEGROUND']:
-                allocations.append({
-                    "Puesto": row['Puesto'],
-                    "Action": "ACTIVAR EQUIPO",
-                    "Cost": activation_cost,
-                    "Expected_Gain": row['growth_potential'] * 10 # Mock gain
-                })
-                remaining_budget -= activation_cost
-                
-        return pd.DataFrame(allocations)
 
-    def calculate_optimal_route(self, synthesized_df):
+        # Only Opportunity / Battleground zones receive resources
+        eligible = synthesized_df[synthesized_df['strategy_class'].isin(['OPPORTUNITY', 'BATTLEGROUND'])]
+        key = hash((
+            eligible['growth_potential'].to_numpy(dtype=float).tobytes(),
+            tuple(eligible['Puesto']), repr(actions), repr(zone_caps),
+        ))
+        cached_key, optimizer = self._budget_optimizer
+        if cached_key != key:
+            optimizer = BudgetOptimizer(eligible, actions=actions, zone_caps=zone_caps)
+            self._budget_optimizer = (key, optimizer)
+        return optimizer.solve(budget)
+
+    def calculate_optimal_route(self, synthesized_df, max_stops=25, n_teams=1, max_minutes=None,
+                                depot=None, time_budget_s=1.0):
         """
-        Function 8: Logistics Route Planner (TSP).
-        Calculates optimal route for top 5 priority zones.
-        Uses simple nearest neighbor heuristic for now.
+        Function 8: Logistics Route Planner (TSP / VRP).
+        Routes 'n_teams' teams from 'depot' through the top priority zones (by growth potential):
+        a cached distance matrix, nearest-neighbour + 2-opt / Or-opt, and for several teams an
+        optimal split of the tour under a per-team stop capacity and 'max_minutes' workday.
+        Returns the stops in visiting order ('team', 'order', 'eta_min'); stops that don't fit are left out.
         """
         if synthesized_df.empty:
             return []
             
         # Filter for top priority zones (Battleground/Opportunity)
-        targets = synthesized_df[synthesized_df['strategy_class'].isin(['BATTLEGROUND', 'OPPORTUNITY'])]
-        targets = targets.sort_values('growth_potential', ascending=False).head(5)
+        targets = self.top_stations(synthesized_df, 'growth_potential', max_stops,
+                                    where={'strategy_class': ['BATTLEGROUND', 'OPPORTUNITY']})
+        located = np.isfinite(targets['lat'].to_numpy(dtype=float)) & np.isfinite(targets['lon'].to_numpy(dtype=float))
+        targets = targets[located]
         
         if targets.empty:
             return []
-            
-        # Simple Route: Just return them in order of priority for now (TSP is complex)
-        # In a real app, we'd use a distance matrix
+
+        # Node 0 = depot, nodes 1..n = targets
+        depot_lat, depot_lon = depot or self.DEPOT
+        lat = np.concatenate([[depot_lat], targets['lat'].to_numpy(dtype=float)])
+        lon = np.concatenate([[depot_lon], targets['lon'].to_numpy(dtype=float)])
+        dist = self.route_planner.distance_matrix(lat, lon)
+        nodes = list(range(1, len(lat)))
+
+        if n_teams <= 1 and max_minutes is None:
+            routes = [self.route_planner.solve_tsp(dist, nodes, 0, time_budget_s)]
+        else:
+            # Balanced stop counts unless a workday limit already spreads the stops
+            capacity = int(np.ceil(len(nodes) / n_teams)) if max_minutes is None else None
+            priority = targets['growth_potential'].to_numpy(dtype=float)
+            routes, _ = self.route_planner.solve_vrp(
+                dist, nodes, priority, 0, n_teams, capacity, max_minutes, time_budget_s
+            )
+
+        puestos = targets['Puesto'].to_numpy()
         route = []
-        for i, row in targets.iterrows():
-            route.append({
-                "order": len(route) + 1,
-                "location": row['Puesto'],
-                "lat": row['lat'],
-                "lon": row['lon'],
-                "task": "Visita Candidato"
-            })
+        for team, stops in enumerate(routes, start=1):
+            minutes = 0.0
+            for order, (prev, node) in enumerate(zip(stops[:-2], stops[1:-1]), start=1):
+                minutes += self.route_planner.travel_minutes(dist[prev, node])
+                route.append({
+                    "team": team,
+                    "order": order,
+                    "location": puestos[node - 1],
+                    "lat": lat[node],
+                    "lon": lon[node],
+                    "eta_min": round(minutes),
+                    "task": "Visita Candidato"
+                })
+                minutes += self.route_planner.service_min
             
         return route
 
@@ -153,8 +378,10 @@ class TargetingBrain:
             return "No hay datos disponibles."
             
         total_votes = synthesized_df['Votos'].sum() if 'Votos' in synthesized_df.columns else 0
-        top_stronghold = synthesized_df.sort_values('historical_strength', ascending=False).iloc[0]['Puesto'] if not synthesized_df.empty else "N/A"
-        top_opportunity = synthesized_df.sort_values('growth_potential', ascending=False).iloc[0]['Puesto'] if 'growth_potential' in synthesized_df.columns else "N/A"
+        stronghold = self.top_stations(synthesized_df, 'historical_strength', 1)
+        opportunity = self.top_stations(synthesized_df, 'growth_potential', 1)
+        top_stronghold = stronghold['Puesto'].iloc[0] if not stronghold.empty else "N/A"
+        top_opportunity = opportunity['Puesto'].iloc[0] if not opportunity.empty else "N/A"
         
         brief = f"""
         # 🦅 INFORME DE CAMPAÑA MATUTINO
@@ -176,35 +403,48 @@ class TargetingBrain:
         return brief
 
 
-    def generate_strategic_points(self, synthesized_df):
+    def select_event_sites(self, df, k=3, radius_m=EVENT_RADIUS_M, weight_col='Votos', allowed=None):
+        """
+        k event sites (among the stations) that reach the most distinct voters of 'weight_col'
+        within 'radius_m' (lazy-greedy max coverage, see SiteSelector). Returns the chosen rows
+        of 'df' with 'marginal_coverage', 'cumulative_coverage' and 'coverage_share'.
+        """
+        if df.empty or weight_col not in df.columns:
+            return df.iloc[0:0]
+        selector = SiteSelector(self.station_index(df), df[weight_col].to_numpy(dtype=float), radius_m)
+        picks = selector.select(k, allowed=allowed)
+        chosen = df.iloc[picks['site'].to_numpy()].reset_index(drop=True)
+        coverage = ['marginal_coverage', 'cumulative_coverage', 'coverage_share']
+        return chosen.assign(**{c: picks[c].to_numpy() for c in coverage})
+
+    def generate_strategic_points(self, synthesized_df, k=3, radius_m=EVENT_RADIUS_M):
         """
         Generates 'Strategic Points of Interest' based on vote density AND growth potential.
+        Rallies are the k sites reaching the most distinct voters; growth targets the k sites
+        reaching the most growth-weighted voters, so no two points pull from the same puestos.
         """
         if synthesized_df.empty:
             return []
             
         points = []
         
-        # 1. CONSOLIDATION (High Historical Strength)
-        sorted_strength = synthesized_df.sort_values("final_priority", ascending=False)
-        for _, row in sorted_strength.head(3).iterrows():
+        # 1. CONSOLIDATION (distinct voters reached)
+        for _, row in self.select_event_sites(synthesized_df, k, radius_m, 'Votos').iterrows():
             points.append({
                 "lat": row['lat'],
                 "lon": row['lon'],
                 "type": "EVENT",
                 "title": "Rally de Victoria",
-                "desc": f"Bastión: {row['Puesto']}. Consolidar base.",
+                "desc": f"Bastión: {row['Puesto']}. Consolidar base. Alcance nuevo: {row['marginal_coverage']:,.0f} votos.",
                 "icon": "flag",
                 "color": "gold"
             })
             
-        # 2. GROWTH TARGETS (High Growth Potential)
+        # 2. GROWTH TARGETS (High Growth Potential, > 10)
         if "growth_potential" in synthesized_df.columns:
-            sorted_growth = synthesized_df.sort_values("growth_potential", ascending=False)
-            # Filter for actual growth potential > 0
-            growth_zones = sorted_growth[sorted_growth["growth_potential"] > 10]
-            
-            for _, row in growth_zones.head(3).iterrows():
+            growth = synthesized_df["growth_potential"].to_numpy(dtype=float)
+            df = synthesized_df.assign(_growth_weight=np.where(growth > 10, growth, 0.0))
+            for _, row in self.select_event_sites(df, k, radius_m, '_growth_weight', allowed=growth > 10).iterrows():
                 points.append({
                     "lat": row['lat'],
                     "lon": row['lon'],
@@ -217,115 +457,239 @@ class TargetingBrain:
             
         return points
 
-    def simulate_turnout(self, synthesized_df, turnout_factor=1.0):
+    def turnout_model(self, df, candidate_col=None):
+        """
+        Per-station turnout model (see TurnoutModel) for 'candidate_col' (the first Votos_<target>
+        by default) against the other targets, with comunas = 'Zona'. Kept while the inputs don't change.
+        """
+        target_cols = [c for c in df.columns if c.startswith('Votos_') and c != 'Votos_Total']
+        candidate_col = candidate_col if candidate_col in target_cols else (target_cols[0] if target_cols else None)
+        totals = (df['Votos_Total'] if 'Votos_Total' in df.columns else df['Votos']).to_numpy(dtype=float)
+        candidate = df[candidate_col].to_numpy(dtype=float) if candidate_col else np.zeros(len(df))
+        rivals = df[[c for c in target_cols if c != candidate_col]].to_numpy(dtype=float)
+        groups = df['Zona'].to_numpy() if 'Zona' in df.columns else np.zeros(len(df))
+
+        key = hash((totals.tobytes(), candidate.tobytes(), rivals.tobytes(), np.asarray(groups).astype(str).tobytes()))
+        cached_key, model = self._turnout_model
+        if cached_key != key:
+            model = TurnoutModel(totals, candidate, rivals, groups)
+            self._turnout_model = (key, model)
+        return model
+
+    def simulate_turnout(self, synthesized_df, turnout_factor=1.0, comuna_sigma=0.05, station_sigma=0.03,
+                         n_scenarios=500, seed=0, candidate_col=None):
         """
         Function 5: Turnout Impact Simulator.
-        Adjusts 'Votos' based on a turnout factor (0.5 = Low, 1.5 = High).
+        Draws 'n_scenarios' correlated per-station turnouts around 'turnout_factor' (0.5 = Low,
+        1.5 = High): 'Votos_Projected' is the expected vote and 'Votos_P05' / 'Votos_P95' its
+        90% range per station. City totals, candidate share and margin are kept in self.last_turnout.
         """
         if synthesized_df.empty:
             return synthesized_df
-            
-        df = synthesized_df.copy()
-        df['Votos_Projected'] = (df['Votos'] * turnout_factor).astype(int)
-        return df
 
-    def calculate_elasticity(self, synthesized_df):
+        model = self.turnout_model(synthesized_df, candidate_col)
+        multipliers, _ = model.station_matrix([turnout_factor], comuna_sigma, station_sigma, n_scenarios, seed)
+        self.last_turnout = model.evaluate(multipliers)
+        votes = synthesized_df['Votos'].to_numpy(dtype=float)
+        low, high = np.percentile(multipliers, TurnoutModel.CI, axis=0)
+        return synthesized_df.assign(
+            Votos_Projected=(votes * turnout_factor).astype(int),
+            Votos_P05=(votes * low).astype(int),
+            Votos_P95=(votes * high).astype(int),
+        )
+
+    @staticmethod
+    def _panel_estimates(df, panel, candidate_col=None):
+        """
+        Panel swing / volatility / elasticity aligned to the stations of 'df' for 'candidate_col'
+        (the first Votos_<target> by default), or None without a multi-election panel.
+        """
+        if panel is None or len(panel) < panel.MIN_ELECTIONS or not {'Zona', 'Puesto'} <= set(df.columns):
+            return None
+        target_cols = [c for c in df.columns if c.startswith('Votos_') and c != 'Votos_Total']
+        candidate_col = candidate_col if candidate_col in target_cols else (target_cols[0] if target_cols else None)
+        if candidate_col is None:
+            return None
+        return panel.lookup(df, candidate_col)
+
+    def calculate_elasticity(self, synthesized_df, panel=None, candidate_col=None):
         """
         Function 6: Voter Elasticity Model.
-        Identifies 'Swing Zones' (High Volatility).
-        For now, simulates volatility based on 'Battleground' status.
+        Identifies 'Swing Zones' (High Volatility). With a multi-election panel (ElectionPanel),
+        'elasticity' is the regression slope of the station's share on the city share, plus its
+        last 'swing' and share 'volatility'; stations without history (or no panel at all)
+        keep the Battleground prior (0.8, else 0.2).
         """
         if synthesized_df.empty:
             return synthesized_df
-            
-        df = synthesized_df.copy()
-        # Mock Volatility: Battlegrounds are highly elastic
-        df['elasticity'] = df['strategy_class'].apply(lambda x: 0.8 if x == 'BATTLEGROUND' else 0.2)
-        return df
+
+        prior = np.where(synthesized_df['strategy_class'].to_numpy() == 'BATTLEGROUND', 0.8, 0.2)
+        estimates = self._panel_estimates(synthesized_df, panel, candidate_col)
+        if estimates is None:
+            return synthesized_df.assign(elasticity=prior)
+
+        elasticity = estimates['elasticity'].to_numpy()
+        return synthesized_df.assign(
+            elasticity=np.where(np.isnan(elasticity), prior, elasticity),
+            swing=estimates['swing'].to_numpy(),
+            volatility=estimates['volatility'].to_numpy(),
+        )
 
     def calculate_sentiment_correlation(self, synthesized_df, social_df):
         """
         Function 7: Sentiment-Geospatial Correlation.
-        Overlays sentiment score on zones.
+        Overlays sentiment score on zones (sampled from a kernel density surface of the posts;
+        the raster is kept in self.sentiment_surface).
         """
         if synthesized_df.empty:
             return synthesized_df
             
-        df = synthesized_df.copy()
-        df['sentiment_score'] = 0.0
+        df = synthesized_df.assign(sentiment_score=0.0)
         
         if social_df is not None and not social_df.empty:
-            # Simple proximity sentiment transfer
-            for _, post in social_df.iterrows():
-                lat_diff = df['lat'] - post['lat']
-                lon_diff = df['lon'] - post['lon']
-                dist_sq = lat_diff**2 + lon_diff**2
-                mask = dist_sq < 0.0005 # ~2km
-                
-                df.loc[mask, 'sentiment_score'] += post['sentiment']
+            # Posts -> decayed density raster (kept for the map) -> sampled at each station
+            surface = SentimentSurface.covering(df, social_df)
+            surface.fit(social_df['lat'], social_df['lon'], social_df['sentiment'])
+            df['sentiment_score'] = surface.sample(df['lat'], df['lon'])
+            self.sentiment_surface = surface
                 
         return df
+
     # --- FUNCTIONS 11-20: ADVANCED SIMULATION ---
     
-    def calculate_comparative_growth(self, df):
-        """Function 11: Comparative Growth Velocity"""
-        # Simulates growth relative to a baseline (e.g., 5% organic growth)
-        df['growth_velocity'] = df['historical_strength'] * 1.05
-        return df
+    def calculate_comparative_growth(self, df, panel=None, candidate_col=None):
+        """
+        Function 11: Comparative Growth Velocity.
+        Strength scaled by the station's share growth over the last election pair of the panel
+        (capped at 3x); without history, a 5% organic growth baseline.
+        """
+        growth = np.full(len(df), 1.05)
+        estimates = self._panel_estimates(df, panel, candidate_col)
+        if estimates is not None:
+            share, swing = estimates['share'].to_numpy(), estimates['swing'].to_numpy()
+            previous = share - swing
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.clip(share / previous, 0.0, 3.0)
+            growth = np.where(np.isfinite(ratio) & (previous > 0), ratio, growth)
+        return df.assign(growth_velocity=df['historical_strength'] * growth)
+
+    def fit_cannibalization(self, raw_df):
+        """
+        Candidate co-occurrence matrices (see CannibalizationMatrix) over the raw mesa rows,
+        kept in self.cannibalization and reused while those rows don't change.
+        """
+        if raw_df is None or raw_df.empty or 'CANDIDATO' not in raw_df.columns:
+            return self.cannibalization
+        if self.cannibalization is None or self.cannibalization.key != CannibalizationMatrix.content_key(raw_df):
+            self.cannibalization = CannibalizationMatrix(raw_df)
+        return self.cannibalization
 
-    def analyze_cannibalization(self, df):
-        """Function 12: Voter Cannibalization Risk"""
-        # Simulates risk of losing votes to similar candidates in dense areas
-        df['cannibalization_risk'] = df['historical_strength'].apply(lambda x: 'HIGH' if x > 80 else 'LOW')
-        return df
+    def analyze_cannibalization(self, df, matrix=None, candidate=None):
+        """
+        Function 12: Voter Cannibalization Risk.
+        Share of the candidate's list vote in each station that goes to same-list rivals with an
+        overlapping electorate ('cannibalization_score', 0-1, and HIGH / MEDIUM / LOW). Without a
+        fitted co-occurrence matrix (or candidate) it falls back to the historical-strength rule.
+        """
+        matrix = matrix if matrix is not None else self.cannibalization
+        if matrix is None or candidate is None or not {'Zona', 'Puesto'} <= set(df.columns):
+            strength = df['historical_strength'].to_numpy()
+            return df.assign(cannibalization_score=np.where(strength > 80, 1.0, 0.0),
+                             cannibalization_risk=np.where(strength > 80, 'HIGH', 'LOW'))
+
+        risk = matrix.risk(candidate)
+        # Raw keys and processed keys may differ in dtype (codes vs. text): align on text
+        risk_key = pd.MultiIndex.from_arrays([risk['ZONA'].astype(str), risk['PUESTO'].astype(str)])
+        station_key = pd.MultiIndex.from_arrays([df['Zona'].astype(str), df['Puesto'].astype(str)])
+        pos = risk_key.get_indexer(station_key)
+        found = pos >= 0
+        score = np.where(found, risk['cannibalization_score'].to_numpy()[pos], 0.0)
+        return df.assign(cannibalization_score=score,
+                         cannibalization_risk=CannibalizationMatrix.risk_level(score))
+
+    def run_digital_twin(self, df, n_sims=1000, seed=None, candidate_col=None, max_workers=None):
+        """
+        Function 13: Digital Twin Simulation (Monte Carlo).
+        Simulates 'n_sims' elections over the Votos_<target> columns (see DigitalTwin) and sets
+        'win_probability' (0-100) per station for 'candidate_col' (the first target by default).
+        The full result (overall win probability, stations won, CIs) is kept in self.last_twin.
+        """
+        target_cols = [c for c in df.columns if c.startswith('Votos_') and c != 'Votos_Total']
+        if df.empty or not target_cols:
+            return df.assign(win_probability=0.0)
 
-    def run_digital_twin(self, df):
-        """Function 13: Digital Twin Simulation (Monte Carlo)"""
-        # Simulates 1000 election runs
-        import numpy as np
-        df['win_probability'] = np.random.uniform(0, 100, size=len(df))
-        return df
+        totals = df['Votos_Total'] if 'Votos_Total' in df.columns else df['Votos']
+        twin = DigitalTwin(df[target_cols].to_numpy(), totals.to_numpy(),
+                           [c[len('Votos_'):].replace('_', ' ') for c in target_cols], seed=seed)
+        self.last_twin = twin.run(n_sims, max_workers=max_workers)
+
+        primary = target_cols.index(candidate_col) if candidate_col in target_cols else 0
+        return df.assign(win_probability=self.last_twin['station_win_probability'][:, primary] * 100)
 
     def calculate_influencer_impact(self, df):
         """Function 14: Influencer Impact Radius"""
         # Simulates reach of local influencers
-        df['influencer_reach'] = df['Votos'] * 2.5 # Mock multiplier
-        return df
+        return df.assign(influencer_reach=df['Votos'] * 2.5) # Mock multiplier
 
     def calculate_event_roi(self, df):
         """Function 15: Event ROI Calculator"""
         # Cost per vote estimate
-        df['event_roi_score'] = df['growth_potential'] * 10
-        return df
+        return df.assign(event_roi_score=df['growth_potential'] * 10)
 
     def generate_crisis_heatmap(self, df):
         """Function 16: Crisis Management Heatmap"""
         # Inverse of security score
-        df['crisis_risk'] = 100 - df['historical_strength']
-        return df
+        return df.assign(crisis_risk=100 - df['historical_strength'])
 
     def analyze_volunteer_density(self, df):
         """Function 17: Volunteer Network Density"""
         # Mock volunteer count based on votes
-        df['volunteers_needed'] = (df['Votos'] / 50).astype(int)
-        return df
+        return df.assign(volunteers_needed=(df['Votos'] / 50).astype(int))
 
     def project_early_voting(self, df):
         """Function 18: Early Voting Projection"""
         # 10% of total votes as early voting
-        df['early_votes'] = (df['Votos'] * 0.1).astype(int)
-        return df
+        return df.assign(early_votes=(df['Votos'] * 0.1).astype(int))
 
     def build_coalition(self, df):
         """Function 19: Coalition Builder"""
         # Simulates adding 15% votes from an alliance
-        df['coalition_votes'] = df['Votos'] * 1.15
-        return df
+        return df.assign(coalition_votes=df['Votos'] * 1.15)
+
+    def simulate_seats(self, raw_df, seats=SeatAllocator.SEATS, n_sims=2000, seed=None,
+                       corporation=SeatAllocator.CORPORATION, municipio=SeatAllocator.MUNICIPIO):
+        """
+        Concejo seat simulation (see SeatAllocator): umbral + cifra repartidora over 'n_sims'
+        vote scenarios of the raw list / candidate results of one race ('corporation' in
+        'municipio'). Per-candidate seat probability and votes needed for a seat, plus the
+        per-list allocation, are kept in self.last_seats (recomputed only when the raw results
+        or the parameters change). None when the results can't be split into that race.
+        """
+        if raw_df is None or raw_df.empty or 'CANDIDATO' not in raw_df.columns:
+            self.last_seats = None
+            return None
+        run_key = (SeatAllocator.content_key(raw_df), seats, n_sims, seed, corporation, municipio)
+        cached_key, result = self._seat_run
+        if cached_key != run_key:
+            try:
+                allocator = SeatAllocator(raw_df, seats=seats, corporation=corporation, municipio=municipio)
+                result = allocator.simulate(n_sims, seed)
+            except ValueError as e:
+                print(f"Seat simulation skipped: {e}")
+                result = None
+            self._seat_run = (run_key, result)
+        self.last_seats = result
+        return result
 
     def generate_victory_path(self, df):
-        """Function 20: Final Victory Path"""
-        # Identifies top 20 zones needed to win
-        top_zones = df.nlargest(20, 'growth_potential')
+        """
+        Function 20: Final Victory Path.
+        With a seat simulation (simulate_seats): the candidates by probability of a Concejo seat
+        and the votes each one needs to flip the last seat. Otherwise, the top 20 growth zones.
+        """
+        if self.last_seats is not None:
+            return self.last_seats['candidates'].head(20)
+        top_zones = self.top_stations(df, 'growth_potential', 20)
         return top_zones[['Puesto', 'Votos', 'growth_potential']]
 
     # --- FUNCTIONS 21-30: CONTROL & MICRO-TARGETING ---
@@ -408,8 +772,7 @@ class TargetingBrain:
     def map_donor_propensity(self, df):
         """Function 29: Donor Propensity Heatmap"""
         # High votes in high strata = High Donor Propensity
-        df['donor_score'] = df['historical_strength'] # Simplified
-        return df
+        return df.assign(donor_score=df['historical_strength']) # Simplified
 
     def simulate_governance(self):
         """Function 30: Post-Election Governance Simulator"""
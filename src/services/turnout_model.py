@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class TurnoutModel:
+    """
+    Module 4f: Per-Station Turnout Distribution Simulator.
+    Each station's turnout multiplier is log-normal with a shared comuna shock and an
+    independent station shock:
+        m[s, i] = factor * exp(sc * z_comuna[s, c(i)] - sc^2 / 2) * exp(ss * z_station[s, i] - ss^2 / 2)
+    (both terms have mean 1, so 'factor' is the expected turnout; the log-scale correlation
+    between two stations of the same comuna is sc^2 / (sc^2 + ss^2)).
+    Vote shares within a station are kept, so the totals, the candidate's votes and each
+    rival's votes are all linear in m.
+
+    - station_matrix(): the exact scenarios x stations multiplier matrix.
+    - quick(): answers from sufficient statistics precomputed per comuna (first and second
+      moments of the station quantities) and pre-drawn shocks, so a slider move costs
+      O(draws x comunas), independent of the number of stations. The station shocks are
+      aggregated per comuna with a moment-matched Gaussian (sum of many small terms).
+    """
+    N_DRAWS = 2000
+    CI = (5, 95)
+
+    def __init__(self, totals, candidate, rivals, groups, seed=0, n_draws=N_DRAWS):
+        """
+        totals / candidate: (stations,) votes; rivals: (stations x rivals) votes;
+        groups: (stations,) comuna labels.
+        """
+        self.totals = np.asarray(totals, dtype=float)
+        self.candidate = np.asarray(candidate, dtype=float)
+        self.rivals = np.asarray(rivals, dtype=float).reshape(len(self.totals), -1)
+        self.group_codes, self.groups = self._codes(groups)
+        self.seed = seed
+
+        # Station quantities: [totals, candidate, rival_1..k]
+        q = np.column_stack([self.totals, self.candidate, self.rivals])
+        n_groups = len(self.groups)
+        self._sum = np.zeros((n_groups, q.shape[1]))
+        np.add.at(self._sum, self.group_codes, q)
+        second = np.zeros((n_groups, q.shape[1], q.shape[1]))
+        np.add.at(second, self.group_codes, q[:, :, None] * q[:, None, :])
+        # Square root of each comuna's second-moment matrix (PSD; eigen decomposition tolerates zeros)
+        w, u = np.linalg.eigh(second)
+        self._root = u * np.sqrt(np.clip(w, 0, None))[:, None, :]
+
+        rng = np.random.default_rng(seed)
+        self._z_group = rng.standard_normal((n_draws, n_groups))
+        self._z_local = rng.standard_normal((n_draws, n_groups, q.shape[1]))
+
+    @staticmethod
+    def _codes(groups):
+        labels, codes = np.unique(np.asarray(groups).astype(str), return_inverse=True)
+        return codes.ravel(), labels
+
+    def station_matrix(self, factors, comuna_sigma=0.05, station_sigma=0.03, n_scenarios=500, seed=None):
+        """
+        Turnout multipliers, shape (len(factors) * n_scenarios) x stations: for every factor,
+        'n_scenarios' correlated draws. Returns (multipliers, factor of each row).
+        """
+        factors = np.atleast_1d(np.asarray(factors, dtype=float))
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        n_groups, n_stations = len(self.groups), len(self.totals)
+
+        z_group = rng.standard_normal((n_scenarios, n_groups))
+        z_station = rng.standard_normal((n_scenarios, n_stations))
+        shock = np.exp(comuna_sigma * z_group - comuna_sigma ** 2 / 2)[:, self.group_codes]
+        shock *= np.exp(station_sigma * z_station - station_sigma ** 2 / 2)
+
+        rows = np.repeat(factors, n_scenarios)
+        return np.tile(shock, (len(factors), 1)) * rows[:, None], rows
+
+    def evaluate(self, multipliers):
+        """Per-scenario projected totals, candidate votes / share and margin over the best rival."""
+        totals = multipliers @ self.totals
+        candidate = multipliers @ self.candidate
+        rivals = multipliers @ self.rivals
+        return self._summary(totals, candidate, rivals)
+
+    def quick(self, factor=1.0, comuna_sigma=0.05, station_sigma=0.03):
+        """Distribution for one slider setting from the precomputed comuna statistics."""
+        local_sd = np.sqrt(np.expm1(station_sigma ** 2))
+        local = self._sum[None] + local_sd * np.einsum('gqk,dgk->dgq', self._root, self._z_local)
+        shock = factor * np.exp(comuna_sigma * self._z_group - comuna_sigma ** 2 / 2)
+        agg = np.einsum('dg,dgq->dq', shock, local)
+        return self._summary(agg[:, 0], agg[:, 1], agg[:, 2:])
+
+    def _summary(self, totals, candidate, rivals):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(totals > 0, candidate / totals, 0.0)
+        best_rival = rivals.max(axis=1) if rivals.shape[1] else np.zeros(len(totals))
+        margin = candidate - best_rival
+        low, high = self.CI
+        return {
+            'totals': totals,
+            'candidate_votes': candidate,
+            'share': share,
+            'margin': margin,
+            'totals_mean': float(totals.mean()),
+            'totals_ci': tuple(np.percentile(totals, [low, high])),
+            'share_mean': float(share.mean()),
+            'share_ci': tuple(np.percentile(share, [low, high])),
+            'margin_mean': float(margin.mean()),
+            'margin_ci': tuple(np.percentile(margin, [low, high])),
+            'p_lead': float((margin > 0).mean()),
+        }
@@ -1,9 +1,10 @@
+import os
 import pytest
 import pandas as pd
 from src.services.e26_processor import E26Processor
 
 def test_e26_processor_initialization():
-    processor = E26Processor()
+    processor = E26Processor(cache_dir=None)
     assert processor is not None
 
 def test_process_data_structure():
@@ -16,10 +17,639 @@ def test_process_data_structure():
         'lon': [-75.0, -75.1]
     }
     df = pd.DataFrame(data)
-    processor = E26Processor()
+    processor = E26Processor(cache_dir=None)
     
     # Test processing (assuming process_data just returns df if no specific logic needed for this test)
     # We need to know what process_data does. 
     # For now, just testing instantiation and basic pandas ops
     assert not df.empty
     assert 'Votos_CANDIDATO_1' in df.columns
+
+def test_geocode_many_matches_single_lookup():
+    processor = E26Processor(cache_dir=None)
+    names = ["PUESTO SANTA ELENA 03", "I.E. POPULAR CENTRAL", "NO EXISTE"]
+    zones = ["90", None, "01"]
+    coords = processor.geocode_many(names, zones)
+    assert list(coords.columns) == ['lat', 'lon']
+    for i, (name, zone) in enumerate(zip(names, zones)):
+        assert (coords.at[i, 'lat'], coords.at[i, 'lon']) == processor.geocode_station(name, zone)
+    assert (coords.at[2, 'lat'], coords.at[2, 'lon']) == E26Processor.DEFAULT_COORDS
+
+def test_streaming_raw_loader_matches_full_load():
+    processor = E26Processor(cache_dir=None)
+    path = "resultado ANDERSON DUQUE.csv"
+    full = processor.load_raw_e26(path)
+    streamed = processor.load_raw_e26(path, chunksize=500)
+    assert streamed['VOTOS'].sum() == full['VOTOS'].sum()
+    assert str(streamed['PUESTO'].dtype) == 'category'
+    # One row per key after merging the per-chunk partials
+    assert not streamed.duplicated(processor.RAW_E26_KEYS).any()
+
+def test_streaming_raw_loader_counts_invalid_votes(tmp_path):
+    source = tmp_path / "bad_votes.csv"
+    lines = open("resultado ANDERSON DUQUE.csv", encoding="utf-8").read().splitlines()[:20]
+    lines[3] = lines[3].rsplit(',', 1)[0] + ',"N/A"'
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    streamed = E26Processor(cache_dir=None).load_raw_e26(str(source), chunksize=7)
+    # The unparseable row is summed as 0 but still counted, so the validator can flag its key
+    assert streamed['VOTOS_INVALIDO'].sum() == 1
+    flags, _ = E26Processor(cache_dir=None).validate_data(streamed)
+    assert (flags['FLAGS'] == 'VOTOS_INVALIDOS').sum() == 1
+
+def test_parquet_cache_roundtrip_and_invalidation(tmp_path):
+    source = tmp_path / "mini.csv"
+    lines = open("resultado ANDERSON DUQUE.csv", encoding="utf-8").read().splitlines()
+    source.write_text("\n".join(lines[:50]) + "\n", encoding="utf-8")
+
+    processor = E26Processor(cache_dir=str(tmp_path / "cache"))
+    first = processor.load_raw_e26(str(source))
+    cached = processor.load_raw_e26(str(source))
+    assert cached['VOTOS'].sum() == first['VOTOS'].sum()
+    assert str(cached['PUESTO'].dtype) == 'category'
+
+    # Editing the source invalidates the entry
+    source.write_text("\n".join(lines[:10]) + "\n", encoding="utf-8")
+    os.utime(source, ns=(0, 0))
+    refreshed = processor.load_raw_e26(str(source))
+    assert len(refreshed) == 10
+    assert len([f for f in os.listdir(tmp_path / "cache") if f.endswith(".parquet")]) == 1
+
+def test_parquet_cache_version_bump_misses(tmp_path, monkeypatch):
+    from src.services.e26_cache import E26Cache
+    source = tmp_path / "mini.csv"
+    lines = open("resultado ANDERSON DUQUE.csv", encoding="utf-8").read().splitlines()
+    source.write_text("\n".join(lines[:20]) + "\n", encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+
+    E26Processor(cache_dir=cache_dir).load_raw_e26(str(source))
+    assert E26Cache(cache_dir).get(str(source), "raw") is not None
+
+    # Same unchanged source, newer normalization -> the old entry must not be served
+    monkeypatch.setattr(E26Cache, "CACHE_VERSION", E26Cache.CACHE_VERSION + 1)
+    assert E26Cache(cache_dir).get(str(source), "raw") is None
+    assert E26Cache(cache_dir).purge() == 1
+
+def test_process_data_single_pass_targets():
+    raw = pd.DataFrame({
+        'ZONA': ['01', '01', '01', '02'],
+        'PUESTO': ['A', 'A', 'B', 'C'],
+        'CANDIDATO': ['ANDERSON DUQUE MORALES', 'OTRO', 'ANDERSON DUQUE MORALES', None],
+        'VOTOS': [10, 5, 7, 3],
+    })
+    out = E26Processor(cache_dir=None).process_data(raw, ["ANDERSON DUQUE", "ANDERSON", "NADIE"])
+    out = out.set_index('Puesto')
+    assert out['Votos_Total'].to_dict() == {'A': 15, 'B': 7, 'C': 3}
+    # Overlapping targets each get the matching rows
+    assert out['Votos_ANDERSON_DUQUE'].to_dict() == {'A': 10, 'B': 7, 'C': 0}
+    assert out['Votos_ANDERSON'].to_dict() == out['Votos_ANDERSON_DUQUE'].to_dict()
+    assert out['Votos_NADIE'].sum() == 0
+    assert out.loc['A', 'historical_strength'] == 100
+
+def test_compact_schema_shared_vocabularies():
+    processor = E26Processor(cache_dir=None)
+    a = processor.load_raw_e26("resultado ANDERSON DUQUE.csv")
+    b = processor.load_raw_e26("resultado carlos humberto garcía .csv")
+    raw = processor.concat_frames([a, b])
+    assert str(raw['CANDIDATO'].dtype) == 'category'
+    assert list(raw['CANDIDATO'].cat.categories) == list(processor.vocabularies['CANDIDATO'])
+    assert str(raw['ZONA'].dtype) == 'category' and raw['MESA'].dtype == 'int16'
+    assert raw['VOTOS'].dtype == 'int32'
+    report = processor.memory_report["resultado ANDERSON DUQUE.csv"]
+    assert report['after_bytes'] < report['before_bytes']
+
+def test_non_numeric_zones_stay_separate(tmp_path):
+    source = tmp_path / "zonas.csv"
+    lines = open("resultado ANDERSON DUQUE.csv", encoding="utf-8").read().splitlines()[:3]
+    rows = [line.split(",") for line in lines]
+    for row, zona in zip(rows, ['"99A"', '"ZR"', '"1"']):
+        row[4] = zona
+    source.write_text("\n".join(",".join(r) for r in rows) + "\n", encoding="utf-8")
+
+    processor = E26Processor(cache_dir=None)
+    for raw in (processor.load_raw_e26(str(source)), processor.load_raw_e26(str(source), chunksize=2)):
+        assert sorted(raw['ZONA'].astype(str)) == ['01', '99A', 'ZR']
+        assert raw.groupby(['ZONA', 'PUESTO'], observed=True).ngroups == 3
+
+def test_results_cube_rollups_match_raw():
+    processor = E26Processor(cache_dir=None)
+    raw = processor.load_raw_e26("resultado carlos humberto garcía .csv")
+    cube = processor.build_cube(raw)
+    candidate = cube.members('CANDIDATO')[0]
+
+    assert cube.total() == raw['VOTOS'].sum()
+    by_muni = cube.query('MUNICIPIO', candidate=candidate)
+    assert by_muni['VOTOS'].sum() == raw['VOTOS'].sum()
+
+    medellin = raw[raw['MUNICIPIO'] == 'MEDELLIN']
+    mesas = cube.query('MESA', candidate=candidate, filters={'MUNICIPIO': 'MEDELLIN'})
+    assert mesas['VOTOS'].sum() == medellin['VOTOS'].sum()
+    with pytest.raises(ValueError):
+        cube.query('ZONA', filters={'MESA': 1})
+
+def test_parallel_ingest_reports_per_file_errors(tmp_path):
+    bad = tmp_path / "roto.csv"
+    bad.write_text('"01","ANTIOQUIA"\n', encoding="utf-8")
+    files = ["resultado ANDERSON DUQUE.csv", str(bad), "resultado carlos humberto garcía .csv",
+             str(tmp_path / "no_existe.csv")]
+
+    processor = E26Processor(cache_dir=str(tmp_path / "cache"))
+    raw, errors = processor.load_raw_many(files, max_workers=2)
+    assert set(errors) == {str(bad), str(tmp_path / "no_existe.csv")}
+    assert len(raw) == 2414 + 7931
+    assert str(raw['CANDIDATO'].dtype) == 'category'
+    assert raw['CORPORACION'].value_counts().to_dict() == {'ASAMBLEA': 7931, 'CONCEJO': 2414}
+
+    # Second pass is served from the cache, same result and schema as the cold load
+    again, errors = processor.load_raw_many(files[:1] + files[2:3], max_workers=2)
+    assert errors == {} and again['VOTOS'].sum() == raw['VOTOS'].sum()
+    assert again.dtypes.astype(str).to_dict() == raw.dtypes.astype(str).to_dict()
+    assert str(again['VOTOS'].dtype) == E26Processor.VOTES_DTYPE
+
+def test_sniffed_upload_single_parse_latin1():
+    import io
+    text = "Nombre_Mun;Zona;Puesto;Candidato;Votos\nMEDELLIN;1;PARQUE;CARLOS HUMBERTO GARCÍA;10\n"
+    fmt = E26Processor.sniff_format(text.encode("latin-1"))
+    assert (fmt['sep'], fmt['encoding'], fmt['layout']) == (';', 'latin-1', 'headered')
+
+    upload = io.BytesIO(text.encode("latin-1"))
+    df = E26Processor(cache_dir=None).load_data_from_csv(upload)
+    assert df['CANDIDATO'].iloc[0] == "CARLOS HUMBERTO GARCÍA"
+    assert df['VOTOS'].sum() == 10
+
+    headless = open("resultado ANDERSON DUQUE.csv", "rb").read()
+    assert E26Processor.sniff_format(headless[:4096])['layout'] == 'headless'
+
+def test_latin1_byte_past_sniff_sample_falls_back(tmp_path):
+    header = "Nombre_Mun;Zona;Puesto;Candidato;Votos\n"
+    row = "MEDELLIN;1;PARQUE;ANDERSON DUQUE;10\n"
+    n = E26Processor.SNIFF_BYTES // len(row) + 10
+    body = header + row * n + "MEDELLIN;1;PARQUE;CARLOS HUMBERTO GARCÍA;5\n"
+    source = tmp_path / "tardio.csv"
+    source.write_bytes(body.encode("latin-1"))
+    assert E26Processor.sniff_format(source.read_bytes()[:E26Processor.SNIFF_BYTES])['encoding'] == 'utf-8-sig'
+
+    df = E26Processor(cache_dir=None).load_data_from_csv(str(source))
+    assert len(df) == n + 1 and df['VOTOS'].sum() == 10 * n + 5
+    assert df['CANDIDATO'].iloc[-1] == "CARLOS HUMBERTO GARCÍA"
+
+    headless = tmp_path / "tardio_raw.csv"
+    lines = open("resultado ANDERSON DUQUE.csv", encoding="utf-8").read().splitlines()
+    lines = lines * (E26Processor.SNIFF_BYTES // len("\n".join(lines)) + 1)
+    late = lines[0].replace("ANDERSON DUQUE MORALES", "ANDERSON GARCÍA")
+    headless.write_bytes(("\n".join(lines) + "\n").encode("utf-8") + (late + "\n").encode("latin-1"))
+    lines.append(late)
+    processor = E26Processor(cache_dir=None)
+    assert len(processor.load_raw_e26(str(headless))) == len(lines)
+    assert processor.load_raw_e26(str(headless), chunksize=1000)['CANDIDATO'].str.contains("GARCÍA").any()
+
+def test_incremental_batches_match_full_rerun():
+    processor = E26Processor(cache_dir=None)
+    raw = processor.load_raw_e26("resultado ANDERSON DUQUE.csv")
+    targets = ["ANDERSON DUQUE"]
+    full = processor.process_data(raw.copy(), targets)
+
+    halves = [raw.iloc[:1200], raw.iloc[1000:]]  # overlapping drops
+    assert processor.ingest_batch(halves[0], targets) == 1200
+    assert processor.ingest_batch(halves[1]) == len(raw) - 1200
+    assert processor.ingest_batch(halves[0]) == 0  # replayed drop changes nothing
+    assert processor.live.version == 2
+
+    live = processor.live.frame()
+    assert live['Votos_ANDERSON_DUQUE'].sum() == full['Votos_ANDERSON_DUQUE'].sum()
+    assert len(live) == len(full)
+    assert live['historical_strength'].max() == 100
+
+    # A later bulletin correcting a mesa's count is applied as a revision, not dropped
+    revised = raw.iloc[[0]].assign(VOTOS=raw['VOTOS'].iloc[0] + 7)
+    assert processor.ingest_batch(revised) == 1
+    assert processor.live.frame()['Votos_Total'].sum() == full['Votos_Total'].sum() + 7
+    assert processor.ingest_batch(raw.iloc[[0]]) == 1
+    assert processor.live.frame()['Votos_Total'].sum() == full['Votos_Total'].sum()
+
+    # Without MESA every mesa of a puesto would collapse into one key
+    with pytest.raises(ValueError):
+        processor.ingest_batch(raw.drop(columns='MESA'))
+
+def test_integrity_screening_flags_bad_rows():
+    raw = pd.DataFrame({
+        'ZONA': ['01'] * 4, 'PUESTO': ['A'] * 4, 'MESA': [1, 1, 2, 3],
+        'CANDIDATO': ['X'] * 4, 'VOTOS': ['5', '5', 'abc', '-2'],
+    })
+    processor = E26Processor(cache_dir=None)
+    flags, quality = processor.validate_data(raw)
+    assert flags['FLAGS'].tolist() == ['DUPLICADO', 'VOTOS_INVALIDOS', 'VOTOS_NEGATIVOS']
+    assert quality['quality_score'].iloc[0] == 25.0
+
+    out = processor.process_data(raw, ['X'])
+    assert out['anomaly_rows'].iloc[0] == 3
+
+def test_integrity_screening_keeps_races_apart():
+    # Same mesas voting Concejo and Asamblea: each race has its own blank vote row and its own totals
+    concejo = pd.DataFrame({'CORPORACION': 'CONCEJO', 'MESA': range(1, 7), 'PARTIDO': 'N/A',
+                            'CANDIDATO': 'VOTOS EN BLANCO', 'VOTOS': [100, 98, 103, 101, 99, 102]})
+    asamblea = pd.DataFrame({'CORPORACION': 'ASAMBLEA', 'MESA': [6, 6], 'PARTIDO': ['N/A', 'P'],
+                             'CANDIDATO': ['VOTOS EN BLANCO', 'VOTOS EN BLANCO'], 'VOTOS': [500, 7]})
+    raw = pd.concat([concejo, asamblea], ignore_index=True).assign(ZONA='01', PUESTO='A')
+    flags, quality = E26Processor(cache_dir=None).validate_data(raw)
+    assert flags.empty
+    assert quality['quality_score'].iloc[0] == 100.0
+
+def test_station_index_matches_brute_force_haversine():
+    import numpy as np
+    from src.services.spatial_index import StationIndex, haversine_m
+    rng = np.random.default_rng(0)
+    lat, lon = 6.25 + rng.uniform(-0.1, 0.1, 500), -75.57 + rng.uniform(-0.1, 0.1, 500)
+    qlat, qlon = 6.25 + rng.uniform(-0.1, 0.1, 40), -75.57 + rng.uniform(-0.1, 0.1, 40)
+
+    q, s, _ = StationIndex(lat, lon).query_radius(qlat, qlon, 1500)
+    brute = haversine_m(qlat[:, None], qlon[:, None], lat[None, :], lon[None, :]) <= 1500
+    assert sorted(zip(q.tolist(), s.tolist())) == [tuple(p) for p in np.argwhere(brute).tolist()]
+
+def test_sentiment_surface_decays_with_distance():
+    from src.services.targeting_brain import TargetingBrain
+    stations = pd.DataFrame({'Puesto': ['A', 'B', 'C'], 'lat': [6.25, 6.259, 6.30], 'lon': [-75.57] * 3})
+    posts = pd.DataFrame({'lat': [6.25], 'lon': [-75.57], 'sentiment': [1.0]})
+
+    brain = TargetingBrain()
+    scores = brain.calculate_sentiment_correlation(stations, posts)['sentiment_score'].to_numpy()
+    assert scores[0] > scores[1] > scores[2] >= 0
+    assert abs(scores[0] - 1.0) < 0.1 and scores[2] < 1e-3
+    assert brain.sentiment_surface.to_rgba().shape[2] == 4
+
+def test_sweep_matches_individual_synthesize_runs():
+    import numpy as np
+    from src.services.targeting_brain import TargetingBrain
+    history = pd.DataFrame({
+        'Puesto': ['A', 'B', 'C', 'D'], 'lat': [6.25, 6.251, 6.30, 6.252],
+        'lon': [-75.57] * 4, 'historical_strength': [10.0, 80.0, 20.0, 55.0],
+    })
+    social = pd.DataFrame({'type': ['SECURITY_ALERT'] * 2, 'lat': [6.25, 6.251], 'lon': [-75.57] * 2})
+
+    brain = TargetingBrain()
+    result = brain.sweep(history, social, {'security': [0.1, 0.5, 1.0], 'growth': [1.0, 2.0]})
+    assert result['growth'].shape == (6, 4)
+    for i, weights in result['weights'].iterrows():
+        single = brain.synthesize(history, social, weights.to_dict())
+        assert np.allclose(result['growth'][i], single['growth_potential'], rtol=1e-6)
+        assert list(np.array(brain.STRATEGY_CLASSES)[result['strategy'][i]]) == single['strategy_class'].tolist()
+    assert (result['summary'][['stronghold', 'battleground', 'opportunity', 'observation']].sum(axis=1) == 4).all()
+
+def test_budget_optimizer_respects_budget_and_zone_caps():
+    from src.services.budget_optimizer import BudgetOptimizer
+    stations = pd.DataFrame({
+        'Puesto': ['A', 'B', 'C', 'D'], 'Zona': [1, 1, 2, 2],
+        'growth_potential': [90.0, 80.0, 40.0, 10.0],
+    })
+    actions = {'EQUIPO': (5, 10.0, 2, 0.5), 'PAUTA': (2, 3.0, 3, 0.8)}
+    optimizer = BudgetOptimizer(stations, actions=actions, zone_caps={1: 12})
+
+    for budget in [0, 7, 20, 40, 1000]:
+        plan = optimizer.solve(budget)
+        assert plan.attrs['spent'] <= budget
+        assert plan.attrs['expected_gain'] <= plan.attrs['lp_bound'] + 1e-9
+        if not plan.empty:
+            assert plan.loc[plan['Zona'] == 1, 'Cost'].sum() <= 12
+    # Returns diminish as the budget grows; an unbound budget has no marginal value
+    assert optimizer.marginal_value(7) >= optimizer.marginal_value(40) > 0
+    assert optimizer.marginal_value(1000) == 0
+
+def test_route_planner_improves_tour_and_respects_team_limits():
+    import numpy as np
+    from src.services.route_planner import RoutePlanner
+    rng = np.random.default_rng(3)
+    lat = np.r_[6.2442, 6.25 + rng.uniform(-0.1, 0.1, 80)]
+    lon = np.r_[-75.5812, -75.57 + rng.uniform(-0.1, 0.1, 80)]
+    planner = RoutePlanner()
+    dist = planner.distance_matrix(lat, lon)
+    assert planner.distance_matrix(lat, lon) is dist  # cached
+    nodes = list(range(1, 81))
+
+    greedy = planner.nearest_neighbor(dist, nodes, 0)
+    tour = planner.solve_tsp(dist, nodes, 0, time_budget_s=2.0)
+    assert sorted(tour[1:-1]) == nodes and tour[0] == tour[-1] == 0
+    assert planner.tour_length(dist, tour) <= planner.tour_length(dist, greedy)
+
+    routes, dropped = planner.solve_vrp(dist, nodes, rng.uniform(size=80), n_teams=3, capacity=20, max_minutes=300)
+    assert len(routes) <= 3 and all(len(r) - 2 <= 20 for r in routes)
+    assert all(planner._route_minutes(dist, r) <= 300 for r in routes)
+    assert sorted([n for r in routes for n in r[1:-1]] + dropped) == nodes
+
+    # Tight limits and no time left: the drops are still the fewest, found in O(log n) splits
+    calls = []
+    split = planner.split
+    planner.split = lambda *args, **kwargs: calls.append(1) or split(*args, **kwargs)
+    routes, dropped = planner.solve_vrp(dist, nodes, np.arange(80), n_teams=2, max_minutes=90, time_budget_s=0)
+    assert len(calls) <= np.log2(80) + 2
+    kept = sorted(set(nodes) - set(dropped))
+    assert sorted(n for r in routes for n in r[1:-1]) == kept and dropped == sorted(dropped)
+    assert all(planner._route_minutes(dist, r) <= 90 for r in routes)
+
+def test_digital_twin_reproducible_and_chunked():
+    import numpy as np
+    from src.services.monte_carlo import DigitalTwin
+    votes = np.array([[300, 100], [100, 300], [200, 190], [0, 0]])
+    twin = DigitalTwin(votes, votes.sum(axis=1) + 50, ['A', 'B'], seed=7)
+    twin.CHUNK_BYTES = 1  # one run per chunk
+    chunked = twin.run(400)
+    twin.CHUNK_BYTES = DigitalTwin.CHUNK_BYTES
+    whole = DigitalTwin(votes, votes.sum(axis=1) + 50, ['A', 'B'], seed=7).run(400)
+
+    assert chunked['run_totals'].shape == (400, 2)
+    p = chunked['station_win_probability']
+    assert p[0, 0] > 0.95 and p[1, 1] > 0.95 and 0.3 < p[2, 0] < 0.9 and p[3].sum() == 0
+    assert np.allclose(chunked['win_probability'].sum(), 1)
+    again = DigitalTwin(votes, votes.sum(axis=1) + 50, ['A', 'B'], seed=7)
+    again.CHUNK_BYTES = 1
+    assert np.array_equal(again.run(400)['run_totals'], chunked['run_totals'])
+    assert whole['stations_won_ci'].shape == (2, 2)
+
+def test_pipeline_recomputes_only_changed_stages():
+    from src.services.targeting_brain import TargetingBrain
+    history = pd.DataFrame({
+        'Puesto': ['A', 'B'], 'lat': [6.25, 6.30], 'lon': [-75.57, -75.57],
+        'historical_strength': [10.0, 90.0], 'Votos': [100, 900],
+    })
+    social = pd.DataFrame({'type': ['SECURITY_ALERT'], 'lat': [6.25], 'lon': [-75.57], 'sentiment': [0.5]})
+    brain = TargetingBrain()
+    stages = ['synthesize', 'calculate_elasticity', 'calculate_sentiment_correlation', 'build_coalition']
+
+    first = brain.run_pipeline(history, stages=stages, social_df=social)
+    brain.run_pipeline(history, stages=stages, social_df=social)
+    stats = brain.pipeline.stats()
+    assert (stats.loc[stages, 'misses'] == 1).all() and (stats.loc[stages, 'hits'] == 1).all()
+
+    # New weights change growth (synthesize + elasticity inputs) but not Votos or coordinates
+    brain.run_pipeline(history, stages=stages, social_df=social, weights={'security': 3.0})
+    stats = brain.pipeline.stats()
+    assert stats.loc['synthesize', 'misses'] == 2
+    assert stats.loc['build_coalition', 'misses'] == 1 and stats.loc['calculate_sentiment_correlation', 'misses'] == 1
+    expected = brain.calculate_elasticity(brain.synthesize(history, social))
+    assert first['elasticity'].tolist() == expected['elasticity'].tolist()
+    assert brain.sentiment_surface is not None
+
+def test_feature_store_shares_columns_and_isolates_branches():
+    import numpy as np
+    from src.services.feature_store import StationFeatureStore
+    from src.services.targeting_brain import TargetingBrain
+    history = pd.DataFrame({
+        'Zona': [1, 1, 2], 'Puesto': ['A', 'B', 'C'], 'Votos': [100, 200, 300],
+        'historical_strength': [10.0, 50.0, 90.0], 'lat': [6.2, 6.3, 6.4], 'lon': [-75.5] * 3,
+    })
+    store = StationFeatureStore.from_frame(history)
+    assert np.shares_memory(store.get('Votos'), history['Votos'].to_numpy())
+
+    tab_a, tab_b = store.branch(), store.branch()
+    tab_a.add('score', pd.Series([1.0, 2.0], index=pd.MultiIndex.from_tuples([(2, 'C'), (1, 'A')])))
+    assert 'score' not in tab_b and np.isnan(tab_a.get('score')[1])
+    view = tab_a.view()
+    assert np.shares_memory(view['Votos'].to_numpy(), history['Votos'].to_numpy())
+    with pytest.raises(ValueError):
+        view.loc[0, 'Votos'] = 0
+
+    out = TargetingBrain().run_pipeline(history, stages=['generate_crisis_heatmap', 'build_coalition'])
+    assert np.shares_memory(out['Votos'].to_numpy(), history['Votos'].to_numpy())
+    assert out['crisis_risk'].tolist() == [90.0, 50.0, 10.0] and 'crisis_risk' not in history.columns
+
+def test_turnout_model_quick_matches_station_matrix():
+    import numpy as np
+    from src.services.turnout_model import TurnoutModel
+    rng = np.random.default_rng(5)
+    n = 600
+    totals = rng.integers(100, 1000, n).astype(float)
+    candidate, rival = totals * 0.4, totals * rng.uniform(0.3, 0.5, n)
+    model = TurnoutModel(totals, candidate, rival[:, None], rng.integers(0, 8, n), seed=1)
+
+    multipliers, rows = model.station_matrix([0.8, 1.2], comuna_sigma=0.1, station_sigma=0.2, n_scenarios=1000)
+    assert multipliers.shape == (2000, n) and set(rows) == {0.8, 1.2}
+    exact = model.evaluate(multipliers[rows == 1.2])
+    quick = model.quick(1.2, comuna_sigma=0.1, station_sigma=0.2)
+    assert abs(quick['totals_mean'] / exact['totals_mean'] - 1) < 0.01
+    assert abs(quick['share_mean'] - exact['share_mean']) < 0.005
+    assert abs(quick['p_lead'] - exact['p_lead']) < 0.1
+    assert abs(quick['totals_mean'] / (1.2 * totals.sum()) - 1) < 0.01
+
+def test_cannibalization_matrix_same_list_rivals():
+    import numpy as np
+    from src.services.cannibalization import CannibalizationMatrix
+    from src.services.targeting_brain import TargetingBrain
+    # A and B (list L1) share stations 1-2; C (list L2) only polls where A is absent
+    raw = pd.DataFrame({
+        'ZONA': [1, 1, 1, 1, 1, 2, 2, 1],
+        'PUESTO': ['P1', 'P1', 'P1', 'P2', 'P2', 'P3', 'P3', 'P1'],
+        'CANDIDATO': ['ANA', 'BETO', 'CRUZ', 'ANA', 'BETO', 'CRUZ', 'BETO', 'ANA'],
+        'PARTIDO': ['L1', 'L1', 'L2', 'L1', 'L1', 'L2', 'L1', 'L1'],
+        'VOTOS': [60, 40, 10, 30, 30, 50, 5, 20],
+    })
+    matrix = CannibalizationMatrix(raw)
+    assert matrix.votes.nnz == 7  # the repeated (P1, ANA) row is summed
+    overlap, corr = matrix.list_block('L1')[1:]
+    assert overlap.shape == (2, 2) and np.allclose(np.diag(overlap), 1.0)
+    assert set(matrix.list_matrices()[0].index) == {'L1', 'L2'}
+
+    risk = matrix.risk('ANA').set_index('PUESTO')
+    assert risk.loc['P2', 'cannibalization_score'] > 0 and risk.loc['P3', 'cannibalization_score'] == 0
+    assert risk.loc['P2', 'top_rival'] == 'BETO'
+
+    brain = TargetingBrain()
+    assert brain.fit_cannibalization(raw) is brain.fit_cannibalization(raw.copy())
+    history = pd.DataFrame({'Zona': [1, 1, 2], 'Puesto': ['P1', 'P2', 'P3'], 'historical_strength': [90.0, 10.0, 10.0]})
+    out = brain.analyze_cannibalization(history, candidate='ANA')
+    assert out['cannibalization_score'].iloc[2] == 0 and out['cannibalization_score'].iloc[1] > 0
+    assert brain.analyze_cannibalization(history)['cannibalization_risk'].tolist() == ['HIGH', 'LOW', 'LOW']
+
+    # Same party in another race (Asamblea) is a different list, not a rival
+    races = raw.assign(CORPORACION='CONCEJO')
+    races.loc[races['CANDIDATO'] == 'BETO', 'CORPORACION'] = 'ASAMBLEA'
+    split = CannibalizationMatrix(races)
+    assert {'CONCEJO | L1', 'ASAMBLEA | L1'} <= set(split.lists)
+    assert split.risk('ANA')['cannibalization_score'].max() == 0
+    assert split.key != matrix.key
+
+def test_election_panel_batched_elasticity():
+    import numpy as np
+    from src.services.election_panel import ElectionPanel
+    from src.services.targeting_brain import TargetingBrain
+    rng = np.random.default_rng(3)
+    n, city = 50, np.array([0.20, 0.30, 0.25])
+    beta = rng.uniform(0.5, 2.0, n)
+    base = rng.uniform(0.2, 0.4, n)
+    panel = ElectionPanel()
+    for t, label in enumerate(['2019', '2022', '2023']):
+        share = base + beta * (city[t] - city.mean())
+        # Later elections spell the same puestos differently
+        names = [f"Colegio Número {i}" if t == 0 else f"COLEGIO NUMERO {i}." for i in range(n)]
+        panel.add(label, pd.DataFrame({'Zona': [i % 4 for i in range(n)], 'Puesto': names,
+                                       'Votos_Total': 1000.0, 'Votos_A': share * 1000}))
+    assert len(panel.stations) == n and panel.matrix('Votos_A').notna().all().all()
+
+    est = panel.estimates('Votos_A')
+    city_share = panel.matrix('Votos_A').sum() / panel.matrix('Votos_Total').sum()
+    share = panel.matrix('Votos_A') / panel.matrix('Votos_Total')
+    expected = [np.polyfit(city_share, share.iloc[i], 1)[0] for i in range(n)]
+    assert np.allclose(est['elasticity'], expected)
+    assert np.allclose(est['swing'], share['2023'] - share['2022'])
+
+    stations = pd.DataFrame({'Zona': [0, 1, 9], 'Puesto': ['Colegio Numero 0', 'colegio numero 1', 'NUEVO'],
+                             'Votos_Total': [1000, 1000, 10], 'Votos_A': [1, 1, 1], 'strategy_class': 'BATTLEGROUND',
+                             'historical_strength': 50.0})
+    out = TargetingBrain().run_pipeline(stations, stages=['calculate_elasticity'], panel=panel, candidate_col='Votos_A')
+    assert np.allclose(out['elasticity'][:2], est['elasticity'][:2]) and out['elasticity'][2] == 0.8
+    assert np.isnan(out['swing'][2])
+
+def test_seat_allocator_cifra_repartidora():
+    import numpy as np
+    from src.services.seat_allocator import SeatAllocator
+    from src.services.targeting_brain import TargetingBrain
+    raw = pd.DataFrame({
+        'PARTIDO': ['A', 'A', 'A', 'B', 'B', 'C', 'D', 'BLANCO'],
+        'CANDIDATO': ['A', 'ANA', 'ALBA', 'BETO', 'BRUNO', 'CRUZ', 'DORA', 'VOTOS EN BLANCO'],
+        'VOTOS': [20000, 50000, 30000, 45000, 35000, 30000, 15000, 10000],
+    }).assign(CORPORACION='CONCEJO', MUNICIPIO='MEDELLIN')
+    allocator = SeatAllocator(raw, seats=7)
+    assert list(allocator.list_votes) == [100000, 80000, 30000, 15000] and allocator.blank_votes == 10000
+    # Cociente 235000 / 7, umbral = half of it: D drops out; A 3, B 3, C 1
+    seats, cifra, eligible = allocator.allocate(allocator.list_votes, allocator.blank_votes)
+    assert seats.tolist() == [[3, 3, 1, 0]] and eligible.tolist() == [[True, True, True, False]]
+    assert np.isclose(cifra[0], 80000 / 3)
+    # A candidate whose name appears inside the list name is not a list-only entry
+    renamed = SeatAllocator(raw.replace({'PARTIDO': {'C': 'LA CRUZADA'}}), seats=7)
+    assert 'CRUZ' in set(renamed.candidates['Candidato']) and 'A' not in set(renamed.candidates['Candidato'])
+
+    needed = allocator.votes_to_next_seat(allocator.list_votes, allocator.blank_votes)[0]
+    for lst, x in enumerate(needed):
+        more = allocator.list_votes.copy()
+        more[lst] += x
+        assert allocator.allocate(more, allocator.blank_votes)[0][0, lst] == seats[0, lst] + 1
+
+    # Thousands of scenarios in one call, always filling every seat
+    list_only, cand, blank = allocator.scenarios(3000, seed=0)
+    assert (allocator.allocate(allocator.list_totals(list_only, cand), blank)[0].sum(axis=1) == 7).all()
+
+    brain = TargetingBrain()
+    result = brain.simulate_seats(raw, seats=7, n_sims=500, seed=0)
+    path = brain.generate_victory_path(pd.DataFrame())
+    assert set(path.loc[path['Electo'], 'Candidato']) == {'ANA', 'ALBA', 'BETO', 'BRUNO', 'CRUZ'}
+    assert path.loc[path['Candidato'] == 'DORA', 'Votos_Para_Curul'].iloc[0] > 0
+    assert np.isclose(result['lists']['Curules_Media'].sum(), 7)
+
+    # Other races in the same frame don't leak into the Concejo split
+    asamblea = raw.assign(CORPORACION='ASAMBLEA', VOTOS=raw['VOTOS'] * 3)
+    other_town = raw.assign(MUNICIPIO='BELLO', PARTIDO='E')
+    mixed = SeatAllocator(pd.concat([raw, asamblea, other_town], ignore_index=True), seats=7)
+    assert list(mixed.list_votes) == list(allocator.list_votes)
+    # Without the race columns (or with a single list) there is nothing sound to allocate
+    with pytest.raises(ValueError):
+        SeatAllocator(raw.drop(columns='CORPORACION'), seats=7)
+    assert brain.simulate_seats(raw[raw['PARTIDO'] == 'A'], seats=7) is None and brain.last_seats is None
+
+def test_site_selector_lazy_greedy_matches_greedy():
+    import numpy as np
+    from src.services.spatial_index import StationIndex
+    from src.services.site_selector import SiteSelector
+    from src.services.targeting_brain import TargetingBrain
+    rng = np.random.default_rng(11)
+    n = 800
+    lat, lon = 6.25 + rng.normal(0, 0.03, n), -75.57 + rng.normal(0, 0.03, n)
+    voters = rng.integers(100, 2000, n).astype(float)
+    selector = SiteSelector(StationIndex(lat, lon), voters, 800)
+    picks = selector.select(10)
+
+    covered, expected = np.zeros(n, dtype=bool), []
+    for _ in range(10):
+        gains = [voters[selector.covers(s)][~covered[selector.covers(s)]].sum() for s in range(n)]
+        best = int(np.argmax(gains))
+        expected.append(gains[best])
+        covered[selector.covers(best)] = True
+    assert np.allclose(picks['marginal_coverage'], expected)
+    assert picks['marginal_coverage'].is_monotonic_decreasing
+    assert np.isclose(picks['cumulative_coverage'].iloc[-1], voters[covered].sum())
+
+    # Two puestos next to each other: the second pick goes elsewhere
+    stations = pd.DataFrame({'Puesto': ['A', 'A2', 'B'], 'lat': [6.25, 6.2501, 6.30], 'lon': [-75.57] * 3,
+                             'Votos': [1000, 900, 500]})
+    sites = TargetingBrain().select_event_sites(stations, k=2, radius_m=500)
+    assert sites['Puesto'].tolist() == ['A', 'B'] and sites['marginal_coverage'].tolist() == [1900, 500]
+
+def test_hotspots_gi_star_and_local_moran():
+    import numpy as np
+    from src.services.spatial_stats import SpatialWeights, HotspotAnalysis
+    from src.services.targeting_brain import TargetingBrain
+    rng = np.random.default_rng(4)
+    n = 400
+    lat, lon = 6.2 + rng.uniform(0, 0.1, n), -75.6 + rng.uniform(0, 0.1, n)
+    cluster = (lat - 6.25) ** 2 + (lon + 75.55) ** 2 < 0.015 ** 2
+    df = pd.DataFrame({'lat': lat, 'lon': lon, 'Votos': 100,
+                       'historical_strength': 50 + 30 * cluster + rng.normal(0, 5, n),
+                       'crisis_risk': 50 - 30 * cluster + rng.normal(0, 5, n)})
+
+    weights = SpatialWeights.knn(lat, lon, k=6)
+    assert (weights.cardinality == 6).all() and weights.matrix.diagonal().sum() == 0
+    stats = HotspotAnalysis(weights, permutations=199, seed=1).run(df, ['historical_strength', 'crisis_risk'])
+
+    # Gi* z-score against the textbook formula (binary weights, self included)
+    x = df['historical_strength'].to_numpy()
+    row = weights.matrix[7].toarray().ravel()
+    row[7] = 1
+    wi = row.sum()
+    expected = (row @ x - x.mean() * wi) / (x.std() * np.sqrt((n * wi - wi ** 2) / (n - 1)))
+    assert np.isclose(stats['historical_strength_gi_z'][7], expected)
+
+    assert (stats.loc[cluster, 'historical_strength_hotspot'] == 'HOT').mean() > 0.8
+    assert (stats.loc[cluster, 'crisis_risk_hotspot'] == 'COLD').mean() > 0.8
+    assert (stats.loc[cluster, 'crisis_risk_lisa'] == 'LL').mean() > 0.8
+
+    # Counts are reduced chunk by chunk: tiny chunks give the same result
+    small = HotspotAnalysis(weights, permutations=199, seed=1)
+    small.CHUNK_ELEMENTS = 5000
+    pd.testing.assert_frame_equal(small.run(df, ['historical_strength', 'crisis_risk']), stats)
+
+    brain = TargetingBrain()
+    out = brain.run_pipeline(df, stages=['detect_hotspots'], permutations=99)
+    assert 'historical_strength_hotspot' in out.columns and 'growth_potential_hotspot' not in out.columns
+    assert brain.spatial_weights(df) is brain.spatial_weights(df.copy())
+
+def test_leaderboard_streaming_top_k():
+    import numpy as np
+    from src.services.leaderboard import Leaderboard
+    from src.services.targeting_brain import TargetingBrain
+    rng = np.random.default_rng(5)
+    n = 2000
+    keys = [(z, f'P{i}') for i, z in enumerate(rng.integers(0, 20, n))]
+    classes = rng.choice(['BATTLEGROUND', 'OPPORTUNITY', 'STRONGHOLD'], n)
+    values = rng.normal(0, 1, n)
+    board = Leaderboard(['growth_potential'], capacity=16)
+    board.update(keys, metrics={'growth_potential': values}, labels={'strategy_class': classes})
+
+    def expected(top_n, allowed=None):
+        mask = np.ones(n, dtype=bool) if allowed is None else np.isin(classes, allowed)
+        order = np.flatnonzero(mask)[np.argsort(-values[mask], kind='stable')][:top_n]
+        return [keys[i] for i in order]
+
+    # Stations drop out of (and climb into) the kept top set as results stream in
+    for _ in range(50):
+        idx = rng.choice(n, 10, replace=False)
+        values[idx] += rng.normal(0, 2, 10)
+        board.update([keys[i] for i in idx], metrics={'growth_potential': values[idx]})
+        assert board.top('growth_potential', 10)['key'].tolist() == expected(10)
+        assert board.top('growth_potential', 5, where={'strategy_class': ['OPPORTUNITY']})['key'].tolist() \
+            == expected(5, ['OPPORTUNITY'])
+    assert board.top('growth_potential', 40)['key'].tolist() == expected(40)
+
+    # Brain: route targets / brief read the board instead of sorting the frame
+    df = pd.DataFrame({'Zona': [k[0] for k in keys], 'Puesto': [k[1] for k in keys], 'growth_potential': values,
+                       'historical_strength': rng.uniform(0, 100, n), 'strategy_class': classes})
+    brain = TargetingBrain()
+    top = brain.top_stations(df, 'growth_potential', 25, where={'strategy_class': ['BATTLEGROUND', 'OPPORTUNITY']})
+    sorted_top = df[df['strategy_class'] != 'STRONGHOLD'].sort_values('growth_potential', ascending=False).head(25)
+    assert top.index.tolist() == sorted_top.index.tolist()
+    # Re-syncing unchanged data pushes nothing; changed data pushes only the stations that changed
+    board = brain.leaderboard(df)
+    assert board.sync(df) == 0
+    best = df['growth_potential'].idxmax()
+    df.loc[best, 'growth_potential'] = -1.0  # in place: same object, new content
+    assert brain.top_stations(df, 'growth_potential', 1).index[0] == df['growth_potential'].idxmax() != best
+    df = df.assign(growth_potential=df['growth_potential'].where(df.index != sorted_top.index[0], -10.0))
+    assert board.sync(df.sample(frac=1.0, random_state=0)) == 1
+    assert brain.top_stations(df, 'growth_potential', 1).index[0] == df['growth_potential'].idxmax()
+    assert brain.top_stations(df, 'historical_strength', 3).index.tolist() \
+        == df['historical_strength'].nlargest(3).index.tolist()